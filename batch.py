@@ -0,0 +1,122 @@
+"""Bulk junction creation from a manifest.
+
+A manifest lists (source, parent, name) triples, as CSV (with or without a header row) or as JSON
+(a list of objects with those keys, or a list of 3-item lists). run_batch() validates every item
+up front, creates the valid ones on a worker pool and reports each result through a callback.
+It never touches the history itself: callers record all successes with one store update.
+"""
+import csv
+import json
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from link_backends import LINK_OK, LINK_EXISTS, LINK_INVALID_NAME, LINK_NOT_FOUND, LINK_FAILED
+
+BATCH_WORKERS = 8
+BATCH_CANCELLED = "cancelled"
+MANIFEST_FIELDS = ("source", "parent", "name")
+INVALID_NAME_CHARS = '<>:"/\\|?*'
+
+BatchItem = namedtuple("BatchItem", "index source parent name link")
+BatchResult = namedtuple("BatchResult", "item ok code message timestamp")
+
+
+class ManifestError(ValueError):
+    pass
+
+
+def load_manifest(path):
+    """Reads a CSV or JSON manifest into a list of BatchItems (in file order)."""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f: text = f.read()
+    if os.path.splitext(path)[1].lower() == ".json" or text.lstrip().startswith(("[", "{")): rows = _rows_from_json(text)
+    else: rows = _rows_from_csv(text)
+    items = []
+    for index, (source, parent, name) in enumerate(rows):
+        source, parent, name = (str(v).strip() if v is not None else "" for v in (source, parent, name))
+        link = os.path.normpath(os.path.join(parent, name)) if parent and name else ""
+        items.append(BatchItem(index, source, parent, name, link))
+    return items
+
+def _rows_from_json(text):
+    try: data = json.loads(text)
+    except ValueError as e: raise ManifestError(f"Invalid JSON manifest: {e}")
+    if isinstance(data, dict): data = data.get("items", [])
+    if not isinstance(data, list): raise ManifestError("JSON manifest must be a list of items.")
+    rows = []
+    for n, entry in enumerate(data, 1):
+        if isinstance(entry, dict): rows.append(tuple(entry.get(k) for k in MANIFEST_FIELDS))
+        elif isinstance(entry, (list, tuple)) and len(entry) == 3: rows.append(tuple(entry))
+        else: raise ManifestError(f"Manifest item {n}: expected {{source, parent, name}} or a 3-item list.")
+    return rows
+
+def _rows_from_csv(text):
+    rows = [row for row in csv.reader(text.splitlines()) if row and any(cell.strip() for cell in row)]
+    if rows and [cell.strip().lower() for cell in rows[0]][:3] == list(MANIFEST_FIELDS): rows = rows[1:]
+    for n, row in enumerate(rows, 1):
+        if len(row) < 3: raise ManifestError(f"CSV row {n}: expected source,parent,name.")
+    return [tuple(row[:3]) for row in rows]
+
+
+def validate_item(item, seen_links=None):
+    """Same checks as the Create button, plus duplicate links within one batch. Returns (code, message) or None."""
+    if not all([item.source, item.parent, item.name]): return (LINK_INVALID_NAME, "All fields required.")
+    if any(c in INVALID_NAME_CHARS for c in item.name) or item.name in (".", ".."): return (LINK_INVALID_NAME, "Link name invalid.")
+    if not os.path.isdir(item.source): return (LINK_NOT_FOUND, f"Source not found: {item.source}")
+    if not os.path.isdir(item.parent): return (LINK_NOT_FOUND, f"Link parent not found: {item.parent}")
+    if os.path.lexists(item.link): return (LINK_EXISTS, f"Path exists: {item.link}")
+    if seen_links is not None:
+        key = os.path.normcase(item.link)
+        if key in seen_links: return (LINK_EXISTS, f"Duplicate link in manifest: {item.link}")
+        seen_links.add(key)
+    return None
+
+def validate_manifest(items):
+    """Returns {item.index: (code, message)} for every item that can't be created."""
+    seen_links = set(); problems = {}
+    for item in items:
+        problem = validate_item(item, seen_links)
+        if problem: problems[item.index] = problem
+    return problems
+
+
+def run_batch(items, backend, workers=BATCH_WORKERS, on_result=None, cancel_event=None):
+    """Validates, then creates links in parallel. Calls on_result(result, done, total) from worker threads.
+
+    Returns results in manifest order. Items not started when cancel_event is set come back as BATCH_CANCELLED.
+    """
+    cancel_event = cancel_event or threading.Event()
+    problems = validate_manifest(items)
+    results = {}; total = len(items); done = 0; lock = threading.Lock()
+
+    def report(result):
+        nonlocal done
+        with lock:
+            results[result.item.index] = result; done += 1; count = done
+        if on_result: on_result(result, count, total)
+
+    for item in items:
+        if item.index in problems:
+            code, message = problems[item.index]; report(BatchResult(item, False, code, message, None))
+
+    def create(item):
+        if cancel_event.is_set(): return BatchResult(item, False, BATCH_CANCELLED, "Cancelled.", None)
+        try:
+            result = backend.create(item.link, item.source)
+            if not result.ok: return BatchResult(item, False, result.code, result.message, None)
+            if not os.path.lexists(item.link): return BatchResult(item, False, LINK_FAILED, f"{backend.name} reported success but the link is missing: {item.link}", None)
+            return BatchResult(item, True, result.code, result.message, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        except Exception as e: return BatchResult(item, False, LINK_FAILED, f"{type(e).__name__}: {e}", None)
+
+    pending = [item for item in items if item.index not in problems]
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending))), thread_name_prefix="LinkForgeBatch") as executor:
+            for future in as_completed([executor.submit(create, item) for item in pending]): report(future.result())
+    return [results[item.index] for item in items]
+
+
+def history_entries(results):
+    """History records for the successful results, ready for a single store update."""
+    return [{"source": r.item.source, "link": r.item.link, "timestamp": r.timestamp} for r in results if r.ok and r.code == LINK_OK]
@@ -0,0 +1,138 @@
+"""Micro-benchmark: keystroke-to-render cost of the command preview.
+
+Compares the old preview update (full Text rebuild and tooltip re-binding on every StringVar
+write) with JunctionApp's debounced one (one after_idle render per burst of writes, skipped when
+the command text is unchanged). Uses real Tk widgets when a display is available, otherwise
+lightweight stand-ins that count widget operations.
+
+    python benchmarks/bench_command_preview.py [--rounds N] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tkinter as tk
+import main
+from main import JunctionApp, format_command_preview
+
+
+class FakeVar:
+    def __init__(self, harness): self.value = ""; self.harness = harness; self.callbacks = []
+    def get(self): return self.value
+    def set(self, value):
+        self.value = value
+        for callback in self.callbacks: callback()
+    def trace_add(self, mode, callback): self.callbacks.append(callback)
+
+class FakeWidget:
+    def __init__(self, harness): self.harness = harness
+    def __getattr__(self, name):
+        def op(*args, **kwargs): self.harness.widget_ops += 1
+        return op
+
+class Harness:
+    """Just enough of JunctionApp for _schedule_command_preview/_update_command_preview."""
+    def __init__(self, root=None):
+        self.root = root; self.widget_ops = 0; self._idle = []
+        self._preview_job = None; self._preview_command = None; self._preview_complete = None
+        if root is not None:
+            self.source_dir_var, self.link_parent_dir_var, self.link_name_var = (tk.StringVar(root) for _ in range(3))
+            self.command_preview_text = tk.Text(root); self.copy_btn = tk.Button(root)
+        else:
+            self.source_dir_var, self.link_parent_dir_var, self.link_name_var = (FakeVar(self) for _ in range(3))
+            self.command_preview_text = FakeWidget(self); self.copy_btn = FakeWidget(self)
+
+    def after_idle(self, callback):
+        if self.root is not None: return self.root.after_idle(callback)
+        self._idle.append(callback); return len(self._idle)
+
+    def idle(self):
+        if self.root is not None: self.root.update_idletasks(); return
+        while self._idle: self._idle.pop(0)()
+
+    def _show_tooltip(self, event, text, sticky=False): pass
+    def create_tooltip(self, widget, text):
+        for _ in range(3): widget.bind("<Enter>", lambda e: None) # Original bound Enter, Leave and Button-1
+
+    def watch(self, callback):
+        for var in (self.source_dir_var, self.link_parent_dir_var, self.link_name_var):
+            var.trace_add("write", lambda *args: callback())
+
+
+def legacy_update(app):
+    """The pre-debounce _update_command_preview, kept here as the baseline."""
+    command = format_command_preview(app.source_dir_var.get(), app.link_parent_dir_var.get(), app.link_name_var.get())
+    app.command_preview_text.config(state=tk.NORMAL); app.command_preview_text.delete("1.0", tk.END); app.command_preview_text.insert("1.0", command); app.command_preview_text.config(state=tk.DISABLED)
+    if "<" in command or ">" in command: app.copy_btn.config(state=tk.DISABLED); app.copy_btn.bind("<Enter>", lambda e: None)
+    else: app.copy_btn.config(state=tk.NORMAL); app.create_tooltip(app.copy_btn, main.TOOLTIP_COPY)
+
+SCENARIOS = ("typing", "paste", "populate_from_history", "unchanged_writes")
+
+def scenarios(app):
+    """Each yields after a user-visible step; the event loop goes idle between steps."""
+    def typing():
+        for i in range(1, 41): app.link_name_var.set("GameLibrary"[: i % 11 + 1] + str(i)); yield
+    def paste():
+        for i in range(20):
+            app.source_dir_var.set(""); app.source_dir_var.set("C:\\Users\\Someone\\Documents\\Projects\\" + "Deep\\" * 20 + str(i)); yield
+    def populate():
+        for i in range(20):
+            app.source_dir_var.set(f"D:\\Data\\Src{i}"); app.link_parent_dir_var.set("C:\\Links"); app.link_name_var.set(f"Src{i}"); yield
+    def unchanged():
+        for _ in range(40): app.link_parent_dir_var.set(app.link_parent_dir_var.get()); yield
+    return {"typing": typing, "paste": paste, "populate_from_history": populate, "unchanged_writes": unchanged}
+
+
+def run(mode, scenario_name, rounds, root):
+    total = 0.0; steps = 0; renders = 0; ops = 0 # renders counts update calls, including ones skipped as unchanged
+    for _ in range(rounds):
+        app = Harness(root)
+        if mode == "before":
+            def render(app=app):
+                nonlocal renders; renders += 1; legacy_update(app)
+            app.watch(render)
+        else:
+            original = JunctionApp._update_command_preview
+            def render(app=app):
+                nonlocal renders; renders += 1; original(app)
+            app._update_command_preview = render
+            app.watch(lambda app=app: JunctionApp._schedule_command_preview(app))
+            JunctionApp._update_command_preview(app) # Initial render, as __init__ does
+        app.widget_ops = 0
+        step = scenarios(app)[scenario_name]()
+        while True:
+            start = time.perf_counter()
+            try: next(step)
+            except StopIteration: break
+            app.idle(); total += time.perf_counter() - start; steps += 1
+        ops += app.widget_ops
+        if root is not None:
+            app.command_preview_text.destroy(); app.copy_btn.destroy()
+    return {"us_per_step": round(total / steps * 1e6, 2), "updates_per_step": round(renders / steps, 2),
+            "widget_ops_per_step": round(ops / steps, 2) if root is None else None}
+
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    try: root = tk.Tk(); root.withdraw(); backend = "tk"
+    except tk.TclError: root = None; backend = "fake widgets (no display)"
+    report = {"backend": backend, "rounds": args.rounds, "scenarios": {}}
+    for name in SCENARIOS:
+        report["scenarios"][name] = {mode: run(mode, name, args.rounds, root) for mode in ("before", "after")}
+    if root is not None: root.destroy()
+    if args.json: print(json.dumps(report, indent=2)); return
+    print(f"Command preview benchmark ({backend}, {args.rounds} rounds)")
+    for name, modes in report["scenarios"].items():
+        b, a = modes["before"], modes["after"]
+        extra = f", widget ops {b['widget_ops_per_step']} -> {a['widget_ops_per_step']}" if b["widget_ops_per_step"] is not None else ""
+        print(f"  {name:<22} {b['us_per_step']:>8.1f} us -> {a['us_per_step']:>8.1f} us per step, updates {b['updates_per_step']} -> {a['updates_per_step']}{extra}")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,81 @@
+"""History export/import benchmark on a synthetic history (default 100k entries).
+
+Times, against a temporary JournaledHistoryStore:
+  * dump          - the old export: load() the whole history, then json.dump(indent=4) it in one go
+  * json/jsonl/csv/jsonl.gz - history_io.export_history streamed from iter_entries()
+  * jsonl+status  - JSON Lines with every link's status checked on EXPORT_WORKERS threads
+  * import        - the jsonl export read back into an empty store
+  * reimport      - the same file again, where every entry is a duplicate
+and reports the peak traced memory of each (tracemalloc, on a separate run), which is what "constant
+memory" means here. Imports also hold the set of links already in the history, and the journal store
+keeps its records in memory by design.
+
+    python benchmarks/bench_history_io.py [--entries 100000] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import history_io
+from history_records import to_json
+from history_store import JournaledHistoryStore
+from validity import check_junction_validity
+
+
+def make_store(root, name, entries=()):
+    store = JournaledHistoryStore(os.path.join(root, f"{name}.snapshot.json"), os.path.join(root, f"{name}.journal"))
+    store.open()
+    if entries: store.save(entries)
+    return store
+
+def measure(fn, setup=None):
+    """Timed on one run and traced on another: tracemalloc slows Python code down several times over."""
+    if setup: setup()
+    start = time.perf_counter(); result = fn(); seconds = time.perf_counter() - start
+    if setup: setup()
+    tracemalloc.start()
+    try: fn()
+    finally: peak = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+    return {"seconds": round(seconds, 3), "peak_mb": round(peak / 2**20, 1)}, result
+
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="linkforge-history-io-") as root:
+        source = make_store(root, "source", [{"link": f"{root}\\Links\\Group{i % 50}\\Game {i}", "source": f"{root}\\Library\\Group{i % 50}\\Game {i}",
+                                                "timestamp": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d} 12:{i % 60:02d}:00"} for i in range(args.entries)])
+        def dump():
+            with open(os.path.join(root, "dump.json"), 'w', encoding='utf-8') as f: json.dump(source.load(), f, indent=4, ensure_ascii=False, default=to_json)
+        results["dump"], _ = measure(dump)
+        for name, fmt, compress in (("json", "json", False), ("jsonl", "jsonl", False), ("csv", "csv", False), ("jsonl.gz", "jsonl", True)):
+            path = os.path.join(root, f"history.{name}")
+            results[name], _ = measure(lambda: history_io.export_history(source.iter_entries(), path, fmt, compress))
+            results[name]["file_kb"] = os.path.getsize(path) // 1024
+        results["jsonl+status"], report = measure(lambda: history_io.export_history(source.iter_entries(), os.path.join(root, "status.jsonl"), check=check_junction_validity))
+        stores = [make_store(root, "target")]
+        def fresh_target(): stores[0].close(); stores[0] = make_store(root, "target"); stores[0].save([])
+        items = lambda: history_io.read_history(os.path.join(root, "history.jsonl"))
+        run_import = lambda: history_io.import_history(items(), (entry.get("link", "") for entry in stores[0].iter_entries()),
+                                                       lambda entries: stores[0].extend(entries) or True)
+        results["import"], first = measure(run_import, setup=fresh_target)
+        results["reimport"], second = measure(run_import)
+        ok = report.written == args.entries and first.imported == args.entries and second.duplicates == args.entries and stores[0].count() == args.entries
+        stores[0].close(); source.close()
+    if args.json: print(json.dumps({"entries": args.entries, "ok": ok, "results": results}, indent=2)); return
+    print(f"History export/import benchmark ({args.entries} entries)")
+    for name, r in results.items():
+        print(f"  {name:<13} {r['seconds']:7.2f} s  peak {r['peak_mb']:7.1f} MB" + (f"  {r['file_kb']:>8} KB" if "file_kb" in r else ""))
+    print(f"  counts check out: {ok}")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,87 @@
+"""History record benchmark: plain entry dicts vs compact HistoryRecords at 100k entries.
+
+Reports for both representations:
+  * retained_kib   - Python memory held by the loaded history (tracemalloc, after parsing garbage is freed)
+  * build_ms       - from parsed JSON to the in-memory list (records: prefix interning + timestamp parsing)
+  * sort_ms        - ordering the whole history by creation time (string keys vs integer keys)
+  * access_ms      - reading link, source and timestamp of every entry (the adapter's cost)
+
+    python benchmarks/bench_history_records.py [--entries 100000] [--runs 5] [--json]
+"""
+import argparse
+import gc
+import json
+import operator
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from history_records import PathPool, RecordFactory
+
+LIBRARIES = ("D:\\SteamLibrary\\steamapps\\common\\", "E:\\Games\\Epic Games\\", "C:\\Users\\Someone\\Documents\\Projects\\Clients\\",
+             "\\\\nas\\share\\media\\archive\\2023\\", "F:\\Backups\\Workstation\\AppData\\Roaming\\")
+
+
+def synthetic_json(count):
+    """Serialized history shaped like a real one: a few libraries, many links under a few parent folders,
+    and most links named after the folder they point to (every fourth gets a name of its own)."""
+    entries = [{"source": f"{LIBRARIES[i % len(LIBRARIES)]}Title {i}",
+                "link": f"C:\\Links\\{('Games', 'Work', 'Media')[i % 3]}\\Title {i}{' (old)' if i % 4 == 0 else ''}",
+                "timestamp": f"20{18 + i % 7}-{i % 12 + 1:02d}-{i % 28 + 1:02d} {i % 24:02d}:{i // 24 % 60:02d}:{i % 60:02d}"}
+               for i in range(count)]
+    return json.dumps(entries)
+
+def build_dicts(text): return json.loads(text)
+def build_records(text): return RecordFactory(pool=PathPool()).make_all(json.loads(text))
+
+def retained_kib(build, text):
+    gc.collect(); tracemalloc.start()
+    try:
+        history = build(text); gc.collect()
+        current = tracemalloc.get_traced_memory()[0]
+        del history
+        return round(current / 1024, 1)
+    finally: tracemalloc.stop()
+
+def median_ms(fn, runs):
+    samples = []
+    for _ in range(runs):
+        gc.collect(); start = time.perf_counter(); fn(); samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 2)
+
+def access(entries):
+    for e in entries: e["link"]; e["source"]; e.get("timestamp", "")
+
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    text = synthetic_json(args.entries)
+    dicts = build_dicts(text); records = build_records(text)
+    assert [r.to_dict() for r in records] == dicts # Round trip is exact
+    report = {"entries": args.entries, "runs": args.runs, "dicts": {
+        "retained_kib": retained_kib(build_dicts, text),
+        "build_ms": median_ms(lambda: build_dicts(text), args.runs),
+        "sort_ms": median_ms(lambda: sorted(dicts, key=lambda e: e.get("timestamp", "")), args.runs),
+        "access_ms": median_ms(lambda: access(dicts), args.runs)}, "records": {
+        "retained_kib": retained_kib(build_records, text),
+        "build_ms": median_ms(lambda: build_records(text), args.runs),
+        "sort_ms": median_ms(lambda: sorted(records, key=operator.attrgetter("ts")), args.runs),
+        "access_ms": median_ms(lambda: access(records), args.runs)}}
+    report["memory_saved_pct"] = round(100 * (1 - report["records"]["retained_kib"] / report["dicts"]["retained_kib"]), 1)
+    if args.json: print(json.dumps(report, indent=2)); return
+    print(f"History records benchmark ({args.entries} entries, {args.runs} runs, medians)")
+    for kind in ("dicts", "records"):
+        r = report[kind]
+        print(f"  {kind:<8} retained {r['retained_kib'] / 1024:7.1f} MiB  build {r['build_ms']:8.1f} ms  sort {r['sort_ms']:7.1f} ms  access {r['access_ms']:7.1f} ms")
+    print(f"  memory saved: {report['memory_saved_pct']}%")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,64 @@
+"""Single-instance benchmark: what a relaunch costs when LinkForge is already open.
+
+Starts an InstanceServer on a private address (LINKFORGE_INSTANCE_ADDRESS) and times:
+  * round_trip      - instance.forward() in-process: connect, send, wait for the reply
+  * interpreter     - `python -c pass`, the floor for any launch
+  * forwarded       - a whole `python main.py --source ... --link ...` process that hands its request over and exits
+  * window_imports  - a `python -c "import main"` process: only the imports a window launch pays before it
+                      even builds the window, loads the history or probes for admin (a lower bound for a
+                      full start, which needs a display to measure)
+and checks each forwarded launch's request arrived intact. Run as a script, main.py is compiled on
+every launch (no .pyc for __main__), which is most of the gap between forwarded and interpreter.
+
+    python benchmarks/bench_instance.py [--runs 10] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import instance
+
+
+def median_ms(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter(); fn(); samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="linkforge-instance-") as tmp:
+        address = "\\\\.\\pipe\\LinkForge-bench-%d" % os.getpid() if os.name == 'nt' else os.path.join(tmp, "instance.sock")
+        env = dict(os.environ, LINKFORGE_INSTANCE_ADDRESS=address)
+        server = instance.InstanceServer(address).start()
+        try:
+            request = {"source": os.path.join(tmp, "Data"), "link": os.path.join(tmp, "Links", "Data"), "history": False}
+            report = {"runs": args.runs, "round_trip_ms": median_ms(lambda: instance.forward(request, address), args.runs)}
+            delivered = [server.requests.get_nowait() for _ in range(args.runs)]
+            def launch():
+                subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "--source", request["source"], "--link", request["link"]], env=env, check=True)
+                delivered.append(server.requests.get(timeout=5))
+            report["forwarded_ms"] = median_ms(launch, args.runs)
+            report["interpreter_ms"] = median_ms(lambda: subprocess.run([sys.executable, "-c", "pass"], check=True), args.runs)
+            report["window_imports_ms"] = median_ms(lambda: subprocess.run([sys.executable, "-c", "import main"], cwd=ROOT, env=env, check=True), args.runs)
+            report["requests_intact"] = len(delivered) == 2 * args.runs and all(r == request for r in delivered)
+        finally: server.close()
+    if args.json: print(json.dumps(report, indent=2)); return
+    print(f"Single-instance benchmark ({args.runs} runs, medians)")
+    for name in ("round_trip", "interpreter", "forwarded", "window_imports"): print(f"  {name:<15} {report[name + '_ms']:9.2f} ms")
+    print(f"  requests intact: {report['requests_intact']}")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,85 @@
+"""Relocate benchmark: moving a tree of many small files plus a few big ones.
+
+Times, on a fresh copy of the same synthetic tree each run:
+  * manual       - shutil.copytree then shutil.rmtree of the original: the move by hand this replaces
+                   (no verification, no checkpoint, no junction)
+  * relocate-1   - relocate() with one copy worker (copy + verify + swap)
+  * relocate-N   - relocate() with RELOCATE_WORKERS copy workers
+and reports throughput in MB/s and files/s. The temp directory decides what's measured: point
+--dir at the drive you care about (same-volume moves on tmpfs mostly measure syscall overhead).
+
+    python benchmarks/bench_relocate.py [--small 20000] [--big 4] [--big-mb 64] [--runs 3] [--dir PATH] [--json]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from link_backends import get_link_backend
+from relocate import RELOCATE_WORKERS, relocate
+
+SMALL_FILE_BYTES = 4096
+FILES_PER_DIR = 200
+
+
+def make_tree(root, small, big, big_mb):
+    block = os.urandom(SMALL_FILE_BYTES)
+    for i in range(small):
+        folder = os.path.join(root, f"d{i // FILES_PER_DIR}")
+        if i % FILES_PER_DIR == 0: os.makedirs(folder)
+        with open(os.path.join(folder, f"f{i}.dat"), 'wb') as f: f.write(block)
+    chunk = os.urandom(1024 * 1024)
+    for i in range(big):
+        with open(os.path.join(root, f"big{i}.bin"), 'wb') as f:
+            for _ in range(big_mb): f.write(chunk)
+    return small * SMALL_FILE_BYTES + big * big_mb * 1024 * 1024
+
+
+def time_runs(base, template, runs, move):
+    samples = []
+    for n in range(runs):
+        folder = os.path.join(base, f"src{n}"); destination = os.path.join(base, "moved", f"dst{n}")
+        shutil.copytree(template, folder); os.makedirs(os.path.dirname(destination), exist_ok=True)
+        start = time.perf_counter(); move(folder, destination); samples.append(time.perf_counter() - start)
+        shutil.rmtree(destination, ignore_errors=True); shutil.rmtree(folder, ignore_errors=True)
+        if os.path.lexists(folder): os.remove(folder) # The link relocate() left behind
+    return statistics.median(samples)
+
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--small", type=int, default=20000)
+    parser.add_argument("--big", type=int, default=4)
+    parser.add_argument("--big-mb", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--dir", help="where to build the trees (default: the system temp directory)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    backend = get_link_backend("auto" if os.name == 'nt' else "symlink")
+    def relocate_with(workers):
+        def move(folder, destination):
+            result = relocate(folder, destination, backend, workers=workers)
+            if not result.ok: raise SystemExit(f"relocate failed: {result.message}")
+        return move
+    with tempfile.TemporaryDirectory(prefix="linkforge-relocate-", dir=args.dir) as base:
+        template = os.path.join(base, "template"); os.makedirs(template)
+        total = make_tree(template, args.small, args.big, args.big_mb); files = args.small + args.big
+        def manual(folder, destination): shutil.copytree(folder, destination); shutil.rmtree(folder)
+        seconds = {"manual": time_runs(base, template, args.runs, manual),
+                   "relocate-1": time_runs(base, template, args.runs, relocate_with(1)),
+                   f"relocate-{RELOCATE_WORKERS}": time_runs(base, template, args.runs, relocate_with(RELOCATE_WORKERS))}
+    report = {"files": files, "bytes": total, "runs": args.runs,
+              "results": {name: {"seconds": round(s, 3), "mb_per_s": round(total / s / 2**20, 1), "files_per_s": round(files / s)} for name, s in seconds.items()}}
+    if args.json: print(json.dumps(report, indent=2)); return
+    print(f"Relocate benchmark ({files} files, {total / 2**20:.0f} MB, {args.runs} runs, medians)")
+    for name, r in report["results"].items():
+        print(f"  {name:<12} {r['seconds']:8.2f} s  {r['mb_per_s']:8.1f} MB/s  {r['files_per_s']:8} files/s")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,86 @@
+"""Size index benchmark: totalling many junction sources from scratch vs incrementally.
+
+Builds N synthetic source trees and times:
+  * walk        - a plain os.walk + lstat per file over every source (what working it out by hand costs)
+  * cold        - SizeIndex.refresh with an empty index (lists every folder, in parallel)
+  * warm        - SizeIndex.refresh again with nothing changed (one stat per folder, no listings)
+  * one_change  - after adding a file to one folder of one source (only that folder is listed again)
+and checks that every refresh agrees with the plain walk.
+
+    python benchmarks/bench_size_index.py [--sources 20] [--dirs 50] [--files 40] [--runs 3] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from size_index import SizeIndex
+
+
+def make_sources(root, sources, dirs, files):
+    paths = []; block = b"x" * 1000
+    for s in range(sources):
+        source = os.path.join(root, f"source{s}"); paths.append(source)
+        for d in range(dirs):
+            folder = os.path.join(source, f"group{d % 5}", f"dir{d}"); os.makedirs(folder)
+            for f in range(files):
+                with open(os.path.join(folder, f"file{f}.dat"), 'wb') as out: out.write(block * (1 + f % 7))
+    return paths
+
+def walk_total(paths):
+    total = 0
+    for source in paths:
+        for folder, _, names in os.walk(source):
+            for name in names: total += os.lstat(os.path.join(folder, name)).st_size
+    return total
+
+def timed(fn, runs, setup=None):
+    samples = []; result = None
+    for _ in range(runs):
+        if setup: setup()
+        start = time.perf_counter(); result = fn(); samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 2), result
+
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sources", type=int, default=20)
+    parser.add_argument("--dirs", type=int, default=50)
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="linkforge-sizes-") as root:
+        paths = make_sources(os.path.join(root, "data"), args.sources, args.dirs, args.files)
+        db = os.path.join(root, "sizes.sqlite3")
+        def fresh():
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db + suffix): os.remove(db + suffix)
+        def refresh():
+            index = SizeIndex(db)
+            try: listed = index.refresh(paths); return listed, sum(index.get(p).bytes for p in paths)
+            finally: index.close()
+        report = {"sources": args.sources, "folders": args.sources * (args.dirs + 6), "files": args.sources * args.dirs * args.files, "runs": args.runs}
+        report["walk_ms"], expected = timed(lambda: walk_total(paths), args.runs)
+        report["cold_ms"], (cold_listed, cold_total) = timed(refresh, args.runs, setup=fresh)
+        report["warm_ms"], (warm_listed, warm_total) = timed(refresh, args.runs)
+        changes = iter(range(args.runs))
+        def touch():
+            with open(os.path.join(paths[0], "group0", "dir0", f"new{next(changes)}.dat"), 'wb') as out: out.write(b"y" * 500)
+        report["one_change_ms"], (change_listed, change_total) = timed(refresh, args.runs, setup=touch)
+        report["listed"] = {"cold": cold_listed, "warm": warm_listed, "one_change": change_listed}
+        report["totals_match"] = cold_total == warm_total == expected and change_total == expected + 500 * args.runs
+    if args.json: print(json.dumps(report, indent=2)); return
+    print(f"Size index benchmark ({report['sources']} sources, {report['folders']} folders, {report['files']} files, {args.runs} runs, medians)")
+    print(f"  plain walk  {report['walk_ms']:9.1f} ms")
+    for name in ("cold", "warm", "one_change"):
+        print(f"  {name:<11} {report[name + '_ms']:9.1f} ms  ({report['listed'][name]} folders listed)")
+    print(f"  totals match the plain walk: {report['totals_match']}")
+
+
+if __name__ == "__main__":
+    main_bench()
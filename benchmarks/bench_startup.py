@@ -0,0 +1,106 @@
+"""Startup benchmark: time-to-first-paint of the main window.
+
+Launches main.py's JunctionApp in a fresh interpreter against a throwaway history of N entries
+and reports, from process launch:
+  * first_paint_ms    - the main window's first <Expose> (needs a display)
+  * history_ready_ms  - the History button showing the real count (loaded in the background)
+It also times, in-process, the work that used to sit on the critical path before the first
+paint (opening the history store), so runs without a display still say something useful.
+
+    python benchmarks/bench_startup.py [--entries 1000 10000] [--runs 5] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+CHILD = r'''
+import sys, time
+t0 = float(sys.argv[1])
+sys.path.insert(0, sys.argv[2])
+import main
+marks = {"import_ms": (time.time() - t0) * 1000}
+try: app = main.JunctionApp(running_as_admin=True)
+except Exception as e: print("NO_DISPLAY", type(e).__name__, e); sys.exit(0)
+marks["constructed_ms"] = (time.time() - t0) * 1000
+def expose(event):
+    if event.widget is app and "first_paint_ms" not in marks: marks["first_paint_ms"] = (time.time() - t0) * 1000
+app.bind("<Expose>", expose, add="+")
+def check():
+    if app.history_store is not None and "history_ready_ms" not in marks: marks["history_ready_ms"] = (time.time() - t0) * 1000
+    if "first_paint_ms" in marks and "history_ready_ms" in marks: print("MARKS", __import__("json").dumps(marks)); app.on_closing(); return
+    app.after(5, check)
+app.after(5, check)
+app.after(30000, app.on_closing)
+app.mainloop()
+'''
+
+
+def make_history(home, entries):
+    """Writes a snapshot store with `entries` synthetic records under the fake home directory."""
+    env = dict(os.environ, HOME=home, USERPROFILE=home)
+    script = ("import sys; sys.path.insert(0, sys.argv[1]); import core; "
+              "core.ensure_dir_exists(core.HISTORY_DIR); "
+              "core.get_history_store().save([{'source': f'D:\\\\Data\\\\Src{i}', 'link': f'C:\\\\Links\\\\L{i}', "
+              "'timestamp': f'2024-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}'} for i in range(int(sys.argv[2]))])")
+    subprocess.run([sys.executable, "-c", script, REPO, str(entries)], env=env, check=True)
+    return env
+
+
+def time_history_open(env, runs):
+    """What JunctionApp.__init__ used to do synchronously before the first paint."""
+    script = ("import sys, time; sys.path.insert(0, sys.argv[1]); import core; t = time.perf_counter(); "
+              "store = core.get_history_store(); store.count(); print((time.perf_counter() - t) * 1000)")
+    return [float(subprocess.run([sys.executable, "-c", script, REPO], env=env, capture_output=True, text=True, check=True).stdout)
+            for _ in range(runs)]
+
+
+def time_startup(env, runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", CHILD, repr(time.time()), REPO], env=env, capture_output=True, text=True, timeout=60).stdout
+        for line in out.splitlines():
+            if line.startswith("NO_DISPLAY"): return None, line[len("NO_DISPLAY "):]
+            if line.startswith("MARKS "): samples.append(json.loads(line[len("MARKS "):]))
+    return samples, None
+
+
+def summarize(values):
+    return {"median": round(statistics.median(values), 2), "min": round(min(values), 2), "max": round(max(values), 2)} if values else None
+
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[0, 1000, 10000, 100000])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    report = {"runs": args.runs, "sizes": {}}
+    for entries in args.entries:
+        with tempfile.TemporaryDirectory(prefix="linkforge-startup-") as home:
+            env = make_history(home, entries)
+            samples, skipped = time_startup(env, args.runs)
+            result = {"history_open_ms": summarize(time_history_open(env, args.runs))}
+            if samples is None: result["skipped"] = f"Tk unavailable: {skipped}"
+            else:
+                for key in ("import_ms", "constructed_ms", "first_paint_ms", "history_ready_ms"):
+                    result[key] = summarize([s[key] for s in samples if key in s])
+            report["sizes"][entries] = result
+    if args.json: print(json.dumps(report, indent=2)); return
+    print(f"Startup benchmark ({args.runs} runs, medians)")
+    for entries, r in report["sizes"].items():
+        line = f"  {entries:>7} entries: history open {r['history_open_ms']['median']:>8.1f} ms (off the critical path)"
+        if "skipped" in r: line += f"; first paint skipped ({r['skipped']})"
+        else: line += f"; first paint {r['first_paint_ms']['median']:.1f} ms, history ready {r['history_ready_ms']['median']:.1f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main_bench()
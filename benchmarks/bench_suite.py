@@ -0,0 +1,312 @@
+"""LinkForge benchmark suite: history I/O, validation throughput and history tree population.
+
+Everything runs in a temp directory on Linux (and Windows) with no real history touched:
+  * history_io  - synthetic histories of each size in both stores (journal, sqlite): save, cold
+                  open+load, count, first page, 100 appends, a 1000-entry extend, and the peak
+                  Python memory of a cold load (tracemalloc)
+  * validation  - a real symlink farm (junctions on Windows; capped by --farm-max) with some broken
+                  and some retargeted links: sequential checks/s, pooled cold checks/s, cached
+                  refresh (fingerprints only) and in-TTL hits
+  * tree        - HistoryWindow's virtualized population driven directly: open, 50 page scrolls,
+                  a jump to the middle and an incremental refresh, plus the old insert-everything
+                  population as a baseline (capped by --legacy-max). Uses a real ttk.Treeview when
+                  a display is available (e.g. under xvfb-run) and an op-counting stand-in otherwise.
+
+The report is JSON (-o FILE, or stdout with --json), tagged with the commit it ran on. Compare two
+reports with --compare OLD.json NEW.json; changes past --threshold are flagged.
+
+    python benchmarks/bench_suite.py [--sizes 1000 10000 100000] [--only history_io tree] [-o report.json]
+    python benchmarks/bench_suite.py --compare before.json after.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from history_store import JournaledHistoryStore, SQLiteHistoryStore
+from validity import ValidityCache, check_junction_validity
+
+SECTIONS = ("history_io", "validation", "tree")
+BROKEN_EVERY = 25       # Farm links whose source is removed
+RETARGETED_EVERY = 40   # Farm links pointing at the wrong source
+VISIBLE_ROWS = 20       # Rows on screen in the tree benchmark
+
+
+# --- Helpers ---
+def synthetic_entries(count, start=0):
+    return [{"source": f"D:\\Data\\Project{i % 500}\\Assets{i}", "link": f"C:\\Links\\Group{i % 50}\\Link{i}",
+             "timestamp": f"2024-{i // 86400 % 12 + 1:02d}-{i // 3600 % 28 + 1:02d} {i // 60 % 24:02d}:{i % 60:02d}:{i % 60:02d}"}
+            for i in range(start, start + count)]
+
+def timed_ms(fn):
+    gc.collect(); start = time.perf_counter(); result = fn(); return (time.perf_counter() - start) * 1000, result
+
+def median_ms(fn, runs, setup=None):
+    samples = []
+    for _ in range(runs):
+        if setup: setup()
+        samples.append(timed_ms(fn)[0])
+    return round(statistics.median(samples), 3)
+
+def peak_kib(fn):
+    gc.collect(); tracemalloc.start()
+    try: fn(); return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally: tracemalloc.stop()
+
+def per_second(count, ms):
+    return round(count / (ms / 1000), 1) if ms else None
+
+
+# --- History I/O ---
+def make_store(backend, root):
+    if backend == "sqlite": return SQLiteHistoryStore(os.path.join(root, "history.sqlite3"))
+    return JournaledHistoryStore(os.path.join(root, "history.snapshot.json"), os.path.join(root, "history.journal"))
+
+def bench_history_io(size, runs):
+    entries = synthetic_entries(size); results = {}
+    for backend in ("journal", "sqlite"):
+        with tempfile.TemporaryDirectory(prefix="linkforge-io-") as root:
+            store = make_store(backend, root); store.open()
+            r = {"save_ms": median_ms(lambda: store.save(entries), runs)}
+            store.close()
+            def cold_load():
+                s = make_store(backend, root); s.open(); s.load(); s.close()
+            def cold_open_count_page():
+                s = make_store(backend, root); s.open(); s.count(); s.page(0, 200); s.close()
+            r["cold_load_ms"] = median_ms(cold_load, runs)
+            r["cold_open_first_page_ms"] = median_ms(cold_open_count_page, runs)
+            r["cold_load_peak_kib"] = peak_kib(cold_load)
+            store = make_store(backend, root); store.open()
+            more = synthetic_entries(1100, start=size)
+            r["append_100_ms"] = timed_ms(lambda: [store.append(e) for e in more[:100]])[0]
+            r["extend_1000_ms"] = timed_ms(lambda: store.extend(more[100:]))[0]
+            r["count_ms"] = median_ms(store.count, runs)
+            store.close()
+            results[backend] = {k: round(v, 3) if isinstance(v, float) else v for k, v in r.items()}
+    return results
+
+
+# --- Validation ---
+def make_link(target, link):
+    if os.name == 'nt':
+        import _winapi
+        _winapi.CreateJunction(target, link)
+    else: os.symlink(target, link, target_is_directory=True)
+
+def make_farm(root, count):
+    """(link, recorded source) pairs over real links; some sources are removed, some links retargeted."""
+    pairs = []
+    os.makedirs(os.path.join(root, "links"))
+    for i in range(count):
+        source = os.path.join(root, "sources", f"S{i}"); os.makedirs(source)
+        link = os.path.join(root, "links", f"L{i}")
+        make_link(os.path.join(root, "sources", f"S{i - 1}") if i and i % RETARGETED_EVERY == 0 else source, link)
+        pairs.append((link, source))
+    for i in range(0, count, BROKEN_EVERY): os.rmdir(pairs[i][1])
+    return pairs
+
+def bench_validation(size, runs, farm_max, workers):
+    count = min(size, farm_max)
+    with tempfile.TemporaryDirectory(prefix="linkforge-farm-") as root:
+        pairs = make_farm(root, count)
+        r = {"links": count}
+        ms = median_ms(lambda: [check_junction_validity(*p) for p in pairs], runs); r["sequential_ms"] = ms; r["sequential_per_s"] = per_second(count, ms)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            def pooled(): return list(executor.map(lambda p: check_junction_validity(*p), pairs, chunksize=64))
+            ms = median_ms(pooled, runs); r["pooled_ms"] = ms; r["pooled_per_s"] = per_second(count, ms)
+        cache = ValidityCache(max_entries=count * 2)
+        ms, statuses = timed_ms(lambda: cache.check_many(pairs)); r["cache_cold_ms"] = round(ms, 3)
+        ms = median_ms(lambda: cache.check_many(pairs), runs, setup=cache.expire); r["cache_refresh_ms"] = ms; r["cache_refresh_per_s"] = per_second(count, ms)
+        ms = median_ms(lambda: cache.check_many(pairs), runs); r["cache_hot_ms"] = ms
+        codes = [code for code, _ in statuses]
+        r["found"] = {"valid": codes.count(0), "source_missing": codes.count(2), "target_mismatch": codes.count(5)}
+    return r
+
+
+# --- Tree population ---
+class CountingTree:
+    """Stand-in for ttk.Treeview that keeps items in order and counts calls that would hit Tcl."""
+    def __init__(self): self.ops = 0; self.items = {}; self.order = []; self._selection = (); self._focus = ""; self._n = 0
+    def insert(self, parent, index, iid=None, values=(), tags=()):
+        self.ops += 1
+        if iid is None: self._n += 1; iid = f"I{self._n:06d}"
+        self.items[iid] = (values, tags)
+        if index == 0: self.order.insert(0, iid)
+        else: self.order.append(iid)
+        return iid
+    def item(self, iid, values=None, tags=None):
+        self.ops += 1; old = self.items[iid]; self.items[iid] = (old[0] if values is None else values, old[1] if tags is None else tags)
+    def move(self, iid, parent, index):
+        self.ops += 1; self.order.remove(iid)
+        if index == 0: self.order.insert(0, iid)
+        else: self.order.append(iid)
+    def delete(self, *iids):
+        self.ops += 1
+        for iid in iids: self.order.remove(iid); del self.items[iid]
+    def get_children(self, item=""): self.ops += 1; return tuple(self.order)
+    def selection(self): return self._selection
+    def selection_set(self, items): self.ops += 1; self._selection = tuple(items)
+    def focus(self, iid=None):
+        if iid is None: return self._focus
+        self.ops += 1; self._focus = iid
+    def yview_moveto(self, fraction): self.ops += 1
+
+class CountingTkTree:
+    """Wraps a real ttk.Treeview so the same op counts are reported with a display."""
+    def __init__(self, tree): self.tree = tree; self.ops = 0
+    def __getattr__(self, name):
+        attr = getattr(self.tree, name)
+        if not callable(attr): return attr
+        def call(*args, **kwargs): self.ops += 1; return attr(*args, **kwargs)
+        return call
+    def selection(self): return self.tree.selection()
+    def focus(self, iid=None): return self.tree.focus() if iid is None else (setattr(self, "ops", self.ops + 1), self.tree.focus(iid))[1]
+
+class NullScrollbar:
+    def set(self, first, last): pass
+
+class NullValidator:
+    """Validation runs on its own pool in the app; it's benchmarked separately above."""
+    def submit(self, jobs): pass
+    def retain(self, keys): pass
+    def cancel(self): pass
+    def busy(self): return False
+
+class NullVar:
+    def get(self): return ""
+
+class ParentStub:
+    validity_watcher = None
+    def _update_status(self, message, color=None): pass
+
+def make_history_window(main, store, tree):
+    """A HistoryWindow with the state its __init__ sets up, minus the Toplevel and its other widgets."""
+    w = main.HistoryWindow.__new__(main.HistoryWindow)
+    w.parent_app = ParentStub(); w.history_store = store
+    w.paged_model = w.model = main.HistoryModel(store)
+    w.index = None; w._index_loading = False; w._index_generation = 0; w._index_job = None
+    w.sort_column, w.sort_descending = main.HISTORY_DEFAULT_SORT
+    w.filter_var = NullVar(); w._filter_job = None
+    w.top_index = 0; w.visible_rows = VISIBLE_ROWS; w.selected = set(); w.cursor = None
+    w.statuses = {}; w.status_epoch = 0; w.pool = []; w._rendered = {}; w._next_iid = 0; w.placeholder = None
+    w.validator = NullValidator(); w._poll_job = None; w.sizes = None
+    w.tree = tree; w.vsb = NullScrollbar()
+    w.after = lambda ms, callback: None; w.after_cancel = lambda job: None
+    return w
+
+def tk_root():
+    try:
+        import tkinter as tk
+        root = tk.Tk(); root.withdraw(); return root
+    except Exception: return None
+
+def bench_tree(size, runs, legacy_max, root):
+    import main
+    from tkinter import ttk
+    entries = synthetic_entries(size)
+    with tempfile.TemporaryDirectory(prefix="linkforge-tree-") as tmp:
+        store = make_store("journal", tmp); store.open(); store.save(entries)
+        def new_tree(): return CountingTkTree(ttk.Treeview(root, columns=("status", "link", "source", "created"), show="headings")) if root else CountingTree()
+        r = {"mode": "tk" if root else "counting"}
+        w = make_history_window(main, store, new_tree())
+        ms, _ = timed_ms(w.refresh_list); r["open_ms"] = round(ms, 3); r["open_tree_ops"] = w.tree.ops
+        w.tree.ops = 0
+        ms, _ = timed_ms(lambda: [w._scroll_to(w.top_index + VISIBLE_ROWS) for _ in range(50)]); r["scroll_50_pages_ms"] = round(ms, 3); r["scroll_50_pages_tree_ops"] = w.tree.ops
+        w.tree.ops = 0
+        ms, _ = timed_ms(lambda: w._scroll_to(size // 2)); r["jump_ms"] = round(ms, 3); r["jump_tree_ops"] = w.tree.ops
+        w.tree.ops = 0
+        r["refresh_ms"] = median_ms(w.refresh_list, runs); r["refresh_tree_ops"] = w.tree.ops // max(1, runs)
+        r["open_peak_kib"] = peak_kib(lambda: make_history_window(main, store, new_tree()).refresh_list())
+        if size <= legacy_max:
+            tree = new_tree()
+            def legacy_populate(): # What refresh_list did before virtualization: every row inserted up front
+                for e in store.load(): tree.insert("", "end", values=("Checking…", e.get("link"), e.get("source"), e.get("timestamp")))
+            ms, _ = timed_ms(legacy_populate); r["legacy_populate_ms"] = round(ms, 3); r["legacy_populate_tree_ops"] = tree.ops
+        if root: root.update()
+        store.close()
+    return r
+
+
+# --- Report ---
+def git_commit():
+    try: return subprocess.run(["git", "-C", REPO, "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError): return None
+
+def run_suite(args):
+    report = {"commit": git_commit(), "created": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+              "platform": platform.platform(), "sizes": args.sizes, "runs": args.runs, "results": {}}
+    root = tk_root() if "tree" in args.only else None
+    for size in args.sizes:
+        results = report["results"][str(size)] = {}
+        if "history_io" in args.only: results["history_io"] = bench_history_io(size, args.runs)
+        if "validation" in args.only: results["validation"] = bench_validation(size, args.runs, args.farm_max, args.workers)
+        if "tree" in args.only: results["tree"] = bench_tree(size, args.runs, args.legacy_max, root)
+        print(f"  {size} entries done", file=sys.stderr)
+    if root: root.destroy()
+    return report
+
+def flatten(data, prefix=""):
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict): flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool): flat[prefix + key] = value
+    return flat
+
+def compare(old_path, new_path, threshold):
+    """Prints metrics that moved by more than `threshold` (a fraction). Lower is better except for */s rates."""
+    with open(old_path, encoding="utf-8") as f: old = json.load(f)
+    with open(new_path, encoding="utf-8") as f: new = json.load(f)
+    old_flat = flatten(old["results"]); new_flat = flatten(new["results"]); regressions = 0
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    for key in sorted(old_flat.keys() & new_flat.keys()):
+        before, after = old_flat[key], new_flat[key]
+        if not before: continue
+        change = (after - before) / before
+        if abs(change) < threshold: continue
+        worse = change < 0 if key.endswith("_per_s") else change > 0
+        regressions += worse
+        print(f"  {'WORSE ' if worse else 'better'} {key}: {before:g} -> {after:g} ({change:+.0%})")
+    return 1 if regressions else 0
+
+def print_summary(report):
+    for size, sections in report["results"].items():
+        print(f"{size} entries:")
+        for section, values in sections.items():
+            print(f"  {section}: " + ", ".join(f"{k}={v}" for k, v in flatten(values).items()))
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--only", nargs="+", choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--farm-max", type=int, default=10000, help="most real links created for the validation section")
+    parser.add_argument("--legacy-max", type=int, default=10000, help="largest size the insert-everything baseline runs at")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("-o", "--output", help="write the JSON report here")
+    parser.add_argument("--json", action="store_true", help="print the JSON report on stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two reports instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+    if args.compare: return compare(*args.compare, args.threshold)
+    report = run_suite(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+    if args.json: print(json.dumps(report, indent=2))
+    elif not args.output: print_summary(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_bench())
@@ -0,0 +1,99 @@
+"""Target resolution benchmark: what reading each link's real target adds to a history refresh.
+
+Creates N real links in a temp directory (junctions on Windows, symlinks elsewhere), a few of
+them pointing somewhere other than their recorded source, and times a full pass over all of
+them with:
+  * legacy      - the old check (lexists + lstat + isdir, no target)
+  * resolve     - resolve_junction (lstat + stat + readlink), no cache
+  * refresh     - ValidityCache.check_many after expire(): the per-row work of a history refresh
+                  without a watcher (each row re-fingerprinted; no readlink unless something changed)
+  * hot         - ValidityCache.check_many within the TTL: the batched lookup_many() the history
+                  window does before handing the remaining rows to its validation pool
+It also checks that every retargeted link comes out as "Target Mismatch".
+
+    python benchmarks/bench_target_resolution.py [--entries 1000 10000] [--runs 5] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from validity import ValidityCache, is_link_stat, resolve_junction
+
+MISMATCH_EVERY = 20 # Every Nth link points at the wrong source
+
+
+def legacy_check(link_path, source_path):
+    if not os.path.lexists(link_path): return (1, "Link Missing")
+    if not is_link_stat(os.lstat(link_path)): return (3, "Exists, Not Link/Junction")
+    if not os.path.isdir(source_path): return (2, "Source Missing/Invalid")
+    return (0, "Valid")
+
+
+def make_link(target, link):
+    if os.name == 'nt':
+        import _winapi
+        _winapi.CreateJunction(target, link) # No admin or developer mode needed, unlike symlinks
+    else: os.symlink(target, link, target_is_directory=True)
+
+
+def make_links(root, entries):
+    """Returns (link, recorded source) pairs; every MISMATCH_EVERY-th link points at a different source."""
+    sources = os.path.join(root, "sources"); links = os.path.join(root, "links")
+    os.makedirs(links); pairs = []
+    for i in range(entries):
+        source = os.path.join(sources, f"S{i}"); os.makedirs(source)
+        link = os.path.join(links, f"L{i}")
+        make_link(os.path.join(sources, f"S{i - 1}") if i and i % MISMATCH_EVERY == 0 else source, link)
+        pairs.append((link, source))
+    return pairs
+
+
+def time_pass(fn, runs, setup=None):
+    samples = []
+    for _ in range(runs):
+        if setup: setup()
+        start = time.perf_counter(); fn(); samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def bench_size(entries, runs):
+    with tempfile.TemporaryDirectory(prefix="linkforge-targets-") as root:
+        pairs = make_links(root, entries)
+        results = {}
+        results["legacy"] = time_pass(lambda: [legacy_check(*p) for p in pairs], runs)
+        results["resolve"] = time_pass(lambda: [resolve_junction(*p) for p in pairs], runs)
+        cache = ValidityCache(max_entries=entries * 2); statuses = cache.check_many(pairs) # Warm: the first refresh resolves everything
+        results["refresh"] = time_pass(lambda: cache.check_many(pairs), runs, setup=cache.expire)
+        results["hot"] = time_pass(lambda: cache.check_many(pairs), runs)
+        expected = sum(1 for i in range(entries) if i and i % MISMATCH_EVERY == 0)
+        found = sum(1 for code, _ in statuses if code == 5)
+        report = {name: {"median_ms": round(statistics.median(s), 2), "us_per_link": round(statistics.median(s) * 1000 / max(1, entries), 2)}
+                  for name, s in results.items()}
+        report["mismatches"] = {"expected": expected, "found": found}
+        return report
+
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    report = {"runs": args.runs, "sizes": {entries: bench_size(entries, args.runs) for entries in args.entries}}
+    if args.json: print(json.dumps(report, indent=2)); return
+    print(f"Target resolution benchmark ({args.runs} runs, medians)")
+    for entries, r in report["sizes"].items():
+        print(f"  {entries:>7} links:" + "".join(f"  {name} {r[name]['median_ms']:.1f} ms ({r[name]['us_per_link']:.1f} us/link)"
+                                               for name in ("legacy", "resolve", "refresh", "hot")))
+        print(f"           mismatches found {r['mismatches']['found']}/{r['mismatches']['expected']}")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,156 @@
+"""Tk-free core shared by the GUI (main.py) and the headless CLI (linkforge.py).
+
+Holds the app/history paths and settings, the history store accessors and the shared validity
+cache. Nothing here may import tkinter: the CLI relies on that to start in milliseconds.
+"""
+import os
+import sys
+import threading
+
+import instrument
+from history_store import JournaledHistoryStore, SQLiteHistoryStore
+from validity import ValidityCache, start_watcher
+
+# --- Constants ---
+APP_NAME = "LinkForge"
+APP_AUTHOR = "JunctionApp" # For AppData path
+
+# History File
+HISTORY_DIR = os.path.join(os.path.expanduser("~"), "AppData", "Local", APP_AUTHOR, APP_NAME)
+HISTORY_FILE = os.path.join(HISTORY_DIR, "history.json") # Legacy single-file history, migrated on first load
+HISTORY_SNAPSHOT_FILE = os.path.join(HISTORY_DIR, "history.snapshot.json")
+HISTORY_JOURNAL_FILE = os.path.join(HISTORY_DIR, "history.journal")
+HISTORY_DB_FILE = os.path.join(HISTORY_DIR, "history.sqlite3")
+HEALTH_LOG_FILE = os.path.join(HISTORY_DIR, "health.jsonl") # Status transitions seen by the health monitor
+TRACE_FILE = os.path.join(HISTORY_DIR, "trace.jsonl") # Written only with LINKFORGE_INSTRUMENT=trace
+RELOCATE_DIR = os.path.join(HISTORY_DIR, "relocate") # Checkpoints of unfinished relocate-and-link moves
+SIZE_INDEX_FILE = os.path.join(HISTORY_DIR, "sizes.sqlite3") # Per-folder sizes under the tracked sources (size_index.py)
+HISTORY_BACKEND = os.environ.get("LINKFORGE_HISTORY_BACKEND", "journal").lower() # "journal" or "sqlite"
+LINK_BACKEND = os.environ.get("LINKFORGE_LINK_BACKEND", "auto").lower() # "auto", "junction", "symlink" or "mklink"
+VALIDITY_WATCH_MODE = os.environ.get("LINKFORGE_VALIDITY_WATCH", "off").lower() # "off", "poll", "native" or "auto"
+INSTRUMENT_MODE = os.environ.get("LINKFORGE_INSTRUMENT", "off").lower() # "off", "on" or "trace" (see instrument.py)
+HEALTH_MONITOR = os.environ.get("LINKFORGE_HEALTH_MONITOR", "off").lower() in ("1", "on", "true", "yes") # GUI background monitor
+
+# --- Helper Functions ---
+def is_admin():
+    try:
+        import ctypes # Only needed here and for elevation; keeps CLI startup lean
+        return ctypes.windll.shell32.IsUserAnAdmin() != 0
+    except Exception:
+        return False
+
+def ensure_dir_exists(dir_path):
+    if not os.path.exists(dir_path):
+        try: os.makedirs(dir_path)
+        except OSError as e: print(f"Error creating dir {dir_path}: {e}", file=sys.stderr); return False
+    return True
+
+def resource_path(relative_path):
+    """ Get absolute path to resource, works for dev and for PyInstaller """
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        # _MEIPASS not defined, running in normal Python environment
+        base_path = os.path.abspath(".") # Or os.path.dirname(__file__)
+
+    return os.path.join(base_path, relative_path)
+
+_history_store = None
+_history_store_lock = threading.Lock() # The GUI opens the store on a background thread at startup
+
+def get_history_store():
+    global _history_store
+    if _history_store is not None: return _history_store
+    with _history_store_lock:
+        if _history_store is not None: return _history_store
+        journal_store = JournaledHistoryStore(HISTORY_SNAPSHOT_FILE, HISTORY_JOURNAL_FILE, legacy_path=HISTORY_FILE)
+        store = SQLiteHistoryStore(HISTORY_DB_FILE, migrate_from=journal_store) if HISTORY_BACKEND == "sqlite" else journal_store
+        try: ensure_dir_exists(HISTORY_DIR); store.open()
+        except Exception as e:
+            print(f"Error opening history store ({HISTORY_BACKEND}): {e}", file=sys.stderr)
+            if store is not journal_store:
+                store = journal_store
+                try: store.open()
+                except Exception as e2: print(f"Error opening fallback history store: {e2}", file=sys.stderr)
+        _history_store = store
+    return _history_store
+
+def close_history_store():
+    global _history_store
+    with _history_store_lock:
+        if _history_store is not None: _history_store.close(); _history_store = None
+
+_size_index = None
+_size_index_lock = threading.Lock()
+
+def get_size_index():
+    """The shared SizeIndex, opened on first use (None if it can't be opened)."""
+    global _size_index
+    with _size_index_lock:
+        if _size_index is None and ensure_dir_exists(HISTORY_DIR):
+            from size_index import SizeIndex # Only the size column and `sizes` command pay for it
+            try: _size_index = SizeIndex(SIZE_INDEX_FILE)
+            except Exception as e: print(f"Error opening size index {SIZE_INDEX_FILE}: {e}", file=sys.stderr)
+        return _size_index
+
+def close_size_index():
+    global _size_index
+    with _size_index_lock:
+        if _size_index is not None: _size_index.close(); _size_index = None
+
+def load_history():
+    try:
+        with instrument.span("history.load"): return get_history_store().load()
+    except Exception as e: print(f"Error loading history: {e}", file=sys.stderr); return []
+
+def iter_history():
+    """History entries in order, streamed from the store (exports; see history_io.py)."""
+    return get_history_store().iter_entries()
+
+def save_history(history_list):
+    if not ensure_dir_exists(HISTORY_DIR): return False
+    try:
+        with instrument.span("history.save", entries=len(history_list)): get_history_store().save(history_list)
+        return True
+    except Exception as e: print(f"Error saving history: {e}", file=sys.stderr); return False
+
+def extend_history(entries):
+    if not entries: return True
+    if not ensure_dir_exists(HISTORY_DIR): return False
+    try:
+        with instrument.span("history.extend", entries=len(entries)): get_history_store().extend(entries)
+        return True
+    except Exception as e: print(f"Error extending history: {e}", file=sys.stderr); return False
+
+def append_history(entry):
+    if not ensure_dir_exists(HISTORY_DIR): return False
+    try:
+        with instrument.span("history.append"): get_history_store().append(entry)
+        return True
+    except Exception as e: print(f"Error appending history: {e}", file=sys.stderr); return False
+
+if INSTRUMENT_MODE == "trace": ensure_dir_exists(HISTORY_DIR)
+instrument.configure(INSTRUMENT_MODE, TRACE_FILE)
+
+# Shared by every history view; LinkForge invalidates it itself whenever it creates a link.
+validity_cache = ValidityCache()
+_validity_watcher = None
+
+def start_validity_watcher():
+    global _validity_watcher
+    if _validity_watcher is None and VALIDITY_WATCH_MODE != "off":
+        # Watched entries are dropped as soon as they change, so the TTL no longer needs to be short.
+        _validity_watcher = start_watcher(validity_cache, mode=VALIDITY_WATCH_MODE); validity_cache.ttl = float("inf")
+    return _validity_watcher
+
+def create_health_monitor(on_transition=None, log_path=HEALTH_LOG_FILE, **options):
+    from health import HealthMonitor # Only the monitor's users pay for it
+    if log_path: ensure_dir_exists(os.path.dirname(log_path))
+    return HealthMonitor(load_history, on_transition=on_transition, log_path=log_path, cache=validity_cache, **options)
+
+def create_operation_queue(on_event=None):
+    from operations import OperationQueue
+    from link_backends import get_link_backend
+    return OperationQueue(get_link_backend(LINK_BACKEND), record=append_history, on_event=on_event, invalidate=validity_cache.invalidate,
+                          checkpoint_dir=RELOCATE_DIR)
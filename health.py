@@ -0,0 +1,178 @@
+"""Background health monitor for tracked junctions.
+
+HealthMonitor re-runs check_junction_validity over the history on a schedule instead of waiting
+for someone to open the history window. Each link has its own interval: links that are broken or
+just changed are re-checked after HEALTH_MIN_INTERVAL, stable ones back off by doubling up to
+HEALTH_MAX_INTERVAL (HEALTH_NETWORK_MAX_INTERVAL for UNC / mapped network paths, which break
+more often). Checks are drawn from a due-time heap at no more than HEALTH_CHECKS_PER_SECOND, so a
+large history is spread out over time rather than checked in one burst.
+
+Status changes are kept as Transition records (and appended to a JSONL log when a path is given);
+on_transition is called from the monitor thread, so GUI callers must hand them over to Tk.
+"""
+import heapq
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+from validity import check_junction_validity
+
+HEALTH_TICK = 1.0                   # Seconds between scheduler wake-ups
+HEALTH_CHECKS_PER_SECOND = 20       # I/O budget: validity checks per second, at most
+HEALTH_MIN_INTERVAL = 30.0          # Broken or recently changed links
+HEALTH_BASE_INTERVAL = 300.0        # First interval for a link that checks out fine
+HEALTH_MAX_INTERVAL = 3600.0        # Stable local links back off to this
+HEALTH_NETWORK_MAX_INTERVAL = 600.0 # Stable links that touch a network path back off to this
+HEALTH_RELOAD_INTERVAL = 120.0      # Seconds between re-reads of the tracked set
+HEALTH_JITTER = 0.1                 # +/- fraction applied to every interval so links don't re-align
+HEALTH_TRANSITION_LOG_SIZE = 500    # Transitions kept in memory
+
+Transition = namedtuple("Transition", "link source old_code old_text new_code new_text timestamp")
+
+def is_regression(transition):
+    return transition.old_code == 0 and transition.new_code != 0
+
+
+_drive_types = {}
+
+def is_network_path(path):
+    """UNC paths, and on Windows paths on a mapped network drive (drive type looked up once per drive)."""
+    if path.startswith(("\\\\", "//")): return True
+    if os.name != 'nt': return False
+    drive = os.path.splitdrive(path)[0].upper()
+    if not drive: return False
+    if drive not in _drive_types:
+        try:
+            import ctypes
+            _drive_types[drive] = ctypes.windll.kernel32.GetDriveTypeW(drive + "\\") == 4 # DRIVE_REMOTE
+        except Exception: _drive_types[drive] = False
+    return _drive_types[drive]
+
+
+class _Tracked:
+    __slots__ = ("link", "source", "due", "interval", "code", "text", "network", "checked_at")
+    def __init__(self, link, source, due):
+        self.link = link; self.source = source; self.due = due; self.interval = 0.0
+        self.code = None; self.text = None; self.checked_at = None
+        self.network = is_network_path(link) or is_network_path(source)
+
+
+class HealthMonitor:
+    def __init__(self, load_entries, check=check_junction_validity, on_transition=None, log_path=None, cache=None,
+                 checks_per_second=HEALTH_CHECKS_PER_SECOND, tick=HEALTH_TICK, reload_interval=HEALTH_RELOAD_INTERVAL, clock=time.monotonic):
+        self.load_entries = load_entries; self.check = check; self.on_transition = on_transition
+        self.log_path = log_path; self.cache = cache; self.checks_per_second = checks_per_second
+        self.tick = tick; self.reload_interval = reload_interval; self.clock = clock
+        self.transitions = deque(maxlen=HEALTH_TRANSITION_LOG_SIZE)
+        self.checks_done = 0
+        self._tracked = {}      # (link, source) -> _Tracked
+        self._heap = []         # (due, seq, key); stale items are skipped when popped
+        self._seq = 0
+        self._next_reload = None
+        self._reload_requested = threading.Event()
+        self._stop = threading.Event(); self._thread = None
+
+    # --- Tracked set ---
+    def request_reload(self):
+        """Called when the history changes; the next tick re-reads it."""
+        self._reload_requested.set()
+
+    def sync(self, entries, now=None):
+        """Starts tracking new (link, source) pairs and drops ones no longer in the history.
+        New pairs are staggered at the check budget so a fresh start doesn't check everything at once."""
+        now = self.clock() if now is None else now
+        wanted = {}
+        for entry in entries:
+            link = entry.get("link"); source = entry.get("source")
+            if link and source and link != "N/A" and source != "N/A": wanted[(link, source)] = None
+        for key in [key for key in self._tracked if key not in wanted]: del self._tracked[key]
+        spacing = 1.0 / max(1, self.checks_per_second); offset = 0.0
+        for key in wanted:
+            if key in self._tracked: continue
+            tracked = self._tracked[key] = _Tracked(key[0], key[1], now + offset); offset += spacing
+            self._push(key, tracked.due)
+        self._next_reload = now + self.reload_interval
+
+    def _push(self, key, due):
+        self._seq += 1; heapq.heappush(self._heap, (due, self._seq, key))
+
+    def _next_interval(self, tracked, changed):
+        if changed or tracked.code != 0: interval = HEALTH_MIN_INTERVAL
+        elif not tracked.interval or tracked.interval < HEALTH_BASE_INTERVAL: interval = HEALTH_BASE_INTERVAL
+        else: interval = min(tracked.interval * 2, HEALTH_NETWORK_MAX_INTERVAL if tracked.network else HEALTH_MAX_INTERVAL)
+        tracked.interval = interval
+        return interval * random.uniform(1 - HEALTH_JITTER, 1 + HEALTH_JITTER)
+
+    # --- Checking ---
+    def run_once(self, now=None):
+        """One scheduler tick: reloads the tracked set if due, then checks up to one tick's budget of due links.
+        Returns the transitions seen in this tick."""
+        now = self.clock() if now is None else now
+        if self._next_reload is None or now >= self._next_reload or self._reload_requested.is_set():
+            self._reload_requested.clear(); self.sync(self.load_entries(), now)
+        budget = max(1, int(self.checks_per_second * self.tick)); seen = []
+        heap = self._heap
+        while heap and budget and heap[0][0] <= now:
+            due, _, key = heapq.heappop(heap)
+            tracked = self._tracked.get(key)
+            if tracked is None or tracked.due != due: continue # Dropped from the history, or rescheduled
+            budget -= 1
+            transition = self._check(tracked)
+            if transition: seen.append(transition)
+            tracked.due = now + self._next_interval(tracked, transition is not None); self._push(key, tracked.due)
+        return seen
+
+    def _check(self, tracked):
+        try: code, text = self.check(tracked.link, tracked.source)
+        except Exception as e: code, text = 4, "Error"; print(f"Health check error for {tracked.link}: {e}", file=sys.stderr)
+        self.checks_done += 1
+        old_code, old_text = tracked.code, tracked.text
+        tracked.code, tracked.text = code, text; tracked.checked_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if old_code is None or old_code == code: return None # First look only sets the baseline
+        transition = Transition(tracked.link, tracked.source, old_code, old_text, code, text, tracked.checked_at)
+        self.transitions.append(transition)
+        if self.cache is not None: self.cache.invalidate(link_path=tracked.link) # Don't let views serve the old answer
+        self._log(transition)
+        if self.on_transition:
+            try: self.on_transition(transition)
+            except Exception as e: print(f"Health transition handler error: {e}", file=sys.stderr)
+        return transition
+
+    def _log(self, transition):
+        if not self.log_path: return
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as f: f.write(json.dumps(dict(transition._asdict(), regression=is_regression(transition)), ensure_ascii=False) + "\n")
+        except OSError as e: print(f"Error writing health log: {e}", file=sys.stderr)
+
+    def status(self):
+        """Counts of tracked links by last status code (None = not checked yet)."""
+        counts = {}
+        for tracked in list(self._tracked.values()): counts[tracked.code] = counts.get(tracked.code, 0) + 1
+        return counts
+
+    def broken(self):
+        return [(t.link, t.source, t.code, t.text) for t in list(self._tracked.values()) if t.code not in (None, 0)]
+
+    # --- Service loop ---
+    def run_forever(self, stop_event=None):
+        """Runs ticks until stop_event (or stop()) is set. This is the whole headless service loop."""
+        stop_event = stop_event or self._stop
+        while not stop_event.is_set():
+            started = self.clock()
+            try: self.run_once(started)
+            except Exception as e: print(f"Health monitor error: {e}", file=sys.stderr)
+            stop_event.wait(max(0.0, self.tick - (self.clock() - started)))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run_forever, name="LinkForgeHealthMonitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,113 @@
+"""Search and sort index over the history, used by the history window's filter box and column sort.
+
+Every link and source path is split into lowercase words (path components, further split on
+spaces, dots, dashes and underscores). A query matches an entry when each of its words is the
+start of some word in the entry's link or source, so "ste lib" finds "D:\\Steam Library". Words
+are kept in a sorted list next to a word -> entry-id posting map, which turns a prefix into a
+bisect range instead of a scan over every entry. Sort orders are computed once per column and
+reused for every query.
+"""
+import bisect
+import os
+import re
+from collections import OrderedDict
+
+from history_records import sort_time
+
+WORD_SPLIT = re.compile(r"[\\/:\s._\-]+")
+TERM_CACHE_SIZE = 64   # Recent query words remembered with their matches (typing re-uses the previous ones)
+
+
+def path_words(path):
+    return {word for word in WORD_SPLIT.split(path.lower()) if word}
+
+def query_terms(query):
+    return sorted({word for word in WORD_SPLIT.split(query.lower()) if word}, key=len, reverse=True)
+
+
+class HistoryIndex:
+    def __init__(self, entries=()):
+        self.entries = []
+        self._postings = {}          # word -> list of entry ids
+        self._words = None           # Sorted list of all words
+        self._orders = {}            # column -> entry ids sorted ascending by that column's key
+        self._ranks = {}             # column -> {entry id: position in _orders[column]}
+        self._term_cache = OrderedDict()
+        for entry in entries: self._index(entry)
+        self._words = sorted(self._postings) # Built here so it's paid for off the Tk thread
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _index(self, entry):
+        entry_id = len(self.entries); self.entries.append(entry)
+        postings = self._postings; new_words = []
+        for word in path_words(entry.get("link", "")) | path_words(entry.get("source", "")):
+            ids = postings.get(word)
+            if ids is None: postings[word] = [entry_id]; new_words.append(word)
+            else: ids.append(entry_id)
+        return entry_id, new_words
+
+    def add(self, entry):
+        """Indexes one more entry. Sort orders and cached matches are dropped and rebuilt on demand."""
+        entry_id, new_words = self._index(entry)
+        for word in new_words: bisect.insort(self._words, word)
+        self._orders.clear(); self._ranks.clear(); self._term_cache.clear()
+        return entry_id
+
+    # --- Matching ---
+    def _term_matches(self, term):
+        cached = self._term_cache.get(term)
+        if cached is not None: self._term_cache.move_to_end(term); return cached
+        words = self._words; postings = self._postings
+        start = bisect.bisect_left(words, term)
+        stop = bisect.bisect_left(words, term + "\uffff", start)
+        matches = set().union(*map(postings.__getitem__, words[start:stop]))
+        self._term_cache[term] = matches
+        if len(self._term_cache) > TERM_CACHE_SIZE: self._term_cache.popitem(last=False)
+        return matches
+
+    def match(self, query):
+        """Entry ids matching every word of `query` (None for an empty query, meaning "everything")."""
+        terms = query_terms(query)
+        if not terms: return None
+        sets = sorted((self._term_matches(term) for term in terms), key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            result &= other
+            if not result: break
+        return result
+
+    # --- Sorting ---
+    def _sort_key(self, column):
+        if column == "created": return lambda i: sort_time(self.entries[i]) # Integers for records: no string comparison
+        field = "link" if column == "link" else "source"
+        return lambda i: os.path.normcase(self.entries[i].get(field, ""))
+
+    def order(self, column):
+        """Entry ids sorted ascending by `column` (ties keep history order); computed once per column."""
+        ids = self._orders.get(column)
+        if ids is None: ids = self._orders[column] = sorted(range(len(self.entries)), key=self._sort_key(column))
+        return ids
+
+    def rank(self, column):
+        ranks = self._ranks.get(column)
+        if ranks is None:
+            ranks = self._ranks[column] = {entry_id: position for position, entry_id in enumerate(self.order(column))}
+        return ranks
+
+    def view(self, query="", column="created", descending=True, key=None):
+        """Entry ids matching `query`, sorted by `column`.
+
+        `key` optionally maps an entry id to a sort key that isn't cacheable (the window's live
+        validation status); the cached column order then only breaks ties.
+        """
+        matches = self.match(query)
+        if key is not None:
+            ids = self.order(column) if matches is None else sorted(matches, key=self.rank(column).__getitem__)
+            ids = sorted(ids, key=key)
+        elif matches is None: ids = list(self.order(column))
+        elif len(matches) * 8 < len(self.entries): ids = sorted(matches, key=self.rank(column).__getitem__)
+        else: ids = [i for i in self.order(column) if i in matches]
+        if descending: ids.reverse()
+        return ids
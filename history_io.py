@@ -0,0 +1,234 @@
+"""Streaming history export and import.
+
+export_history() writes entries one at a time as JSON Lines, CSV or the classic JSON array, any of
+them optionally gzip-compressed. Entries come straight from the store's iter_entries(), so memory
+stays flat however long the history is. With check=..., every entry's validity is worked out on a
+worker pool a bounded window ahead of the writer and embedded as status/status_code. Files are
+written to a temp name and renamed into place, so a failed or cancelled export never leaves half
+a file (or clobbers the previous one).
+
+read_history() reads the same formats back as a generator (the JSON array too, object by object),
+and import_history() keeps only usable entries whose link isn't in the history yet, or earlier in
+the file, compared by normalized path, handing them to the store in batches. Like scan and batch,
+nothing here touches the history itself: callers pass the known links and an extend() function.
+"""
+import csv
+import gzip
+import json
+import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import instrument
+from history_records import HistoryRecord
+
+FORMATS = ("jsonl", "csv", "json")
+FORMAT_EXTENSIONS = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv", ".json": "json"}
+CSV_FIELDS = ("link", "source", "timestamp")
+STATUS_FIELDS = ("status", "status_code") # Embedded by export; never stored by import (statuses are re-checked, not trusted)
+EXPORT_WORKERS = 8
+EXPORT_CHUNK = 256    # Entries per validation task
+EXPORT_WINDOW = 32    # Validation tasks in flight ahead of the writer
+WRITE_BATCH = 1000    # Lines joined per write() and per on_progress call
+IMPORT_BATCH = 5000   # Entries per extend(): one journal record / transaction each
+READ_CHUNK = 1 << 16  # Characters read at a time from a JSON array
+GZIP_LEVEL = 6        # Most of level 9's ratio at a fraction of its time
+
+ExportReport = namedtuple("ExportReport", "written invalid cancelled") # invalid: entries whose embedded status wasn't valid
+ImportReport = namedtuple("ImportReport", "read imported duplicates skipped saved cancelled")
+
+
+class HistoryFormatError(ValueError):
+    pass
+
+
+def link_key(path):
+    return os.path.normcase(os.path.normpath(path))
+
+def detect_format(path, fmt=None, compress=None):
+    """(format, gzipped) from the explicit choices, else from the file name: history.jsonl, history.csv.gz, ..."""
+    name = os.path.basename(path or "").lower(); gzipped = name.endswith(".gz")
+    if gzipped: name = name[:-3]
+    if fmt is None: fmt = FORMAT_EXTENSIONS.get(os.path.splitext(name)[1])
+    if fmt not in FORMATS: raise HistoryFormatError(f"can't tell the format of {path}: use .jsonl, .csv or .json (optionally .gz), or give it")
+    return fmt, gzipped if compress is None else compress
+
+def open_text(path, mode, compress):
+    """Text file for "r" or "w", gzip-compressed or not. Reading skips a UTF-8 BOM (spreadsheet CSVs)."""
+    encoding = "utf-8-sig" if mode == "r" else "utf-8"
+    if compress: return gzip.open(path, mode + "t", encoding=encoding, newline="", compresslevel=GZIP_LEVEL)
+    return open(path, mode, encoding=encoding, newline="")
+
+
+# --- Export ---
+def with_status(entries, check, workers=EXPORT_WORKERS, cancel_event=None):
+    """Yields (entry, (code, text)) in order. check(link, source) runs on a pool in chunks, at most
+    EXPORT_WINDOW chunks ahead, so only a bounded slice of the history is ever held."""
+    def check_chunk(chunk): return [check(entry.get("link", "N/A"), entry.get("source", "N/A")) for entry in chunk]
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="LinkForgeExport") as executor:
+        pending = deque(); chunk = []
+        def drain(keep):
+            while len(pending) > keep:
+                chunk, future = pending.popleft()
+                yield from zip(chunk, future.result())
+        for entry in entries:
+            if cancel_event is not None and cancel_event.is_set(): break
+            chunk.append(entry)
+            if len(chunk) == EXPORT_CHUNK:
+                pending.append((chunk, executor.submit(check_chunk, chunk))); chunk = []
+                yield from drain(EXPORT_WINDOW)
+        if chunk: pending.append((chunk, executor.submit(check_chunk, chunk)))
+        yield from drain(0)
+
+def _as_dict(entry, status=None):
+    data = entry.to_dict() if type(entry) is HistoryRecord else dict(entry)
+    if status is not None: data["status"] = status[1]; data["status_code"] = status[0]
+    return data
+
+def _json_array_item(encode):
+    return lambda data: "    " + encode(data).replace("\n", "\n    ") # Same layout as json.dump(entries, indent=4)
+
+def _lines(rows, fmt, with_status_fields):
+    """Serialized lines (with their newline) for (entry, status) pairs, one per entry."""
+    if fmt == "csv":
+        fields = CSV_FIELDS + (STATUS_FIELDS if with_status_fields else ())
+        class Line: # csv.writer wants a file; this one just hands back each formatted row
+            def write(self, text): self.text = text
+        line = Line(); writer = csv.writer(line, lineterminator="\n")
+        writer.writerow(fields); yield line.text
+        for entry, status in rows:
+            data = _as_dict(entry, status); writer.writerow([data.get(field, "") for field in fields]); yield line.text
+        return
+    if fmt == "jsonl":
+        encode = json.JSONEncoder(ensure_ascii=False).encode # One encoder, C speed; json.dumps(..., ensure_ascii=False) builds one per call
+        for entry, status in rows: yield encode(_as_dict(entry, status)) + "\n"
+        return
+    item = _json_array_item(json.JSONEncoder(ensure_ascii=False, indent=4).encode); first = True
+    for entry, status in rows:
+        yield ("[\n" if first else ",\n") + item(_as_dict(entry, status)); first = False
+    yield "[]\n" if first else "\n]\n"
+
+@instrument.timed("history.export")
+def export_history(entries, output, fmt="jsonl", compress=False, check=None, workers=EXPORT_WORKERS, on_progress=None, cancel_event=None):
+    """Writes `entries` (any iterable, read once) to `output`: a path, or an open text file such as
+    stdout (not compressed, written as it goes). check(link, source) -> (code, text) embeds statuses.
+    on_progress(written) is called every WRITE_BATCH entries from the calling thread."""
+    rows = with_status(entries, check, workers, cancel_event) if check else ((entry, None) for entry in entries)
+    written = 0; invalid = 0; cancelled = False
+    def counted(rows):
+        nonlocal written, invalid
+        for row in rows:
+            if row[1] is not None and row[1][0] != 0: invalid += 1
+            written += 1; yield row
+    is_path = isinstance(output, (str, os.PathLike))
+    target = f"{output}.tmp" if is_path else None
+    f = open_text(target, "w", compress) if is_path else output
+    try:
+        batch = []
+        for line in _lines(counted(rows), fmt, check is not None):
+            batch.append(line)
+            if len(batch) >= WRITE_BATCH:
+                f.write("".join(batch)); batch = []
+                if on_progress: on_progress(written)
+                if cancel_event is not None and cancel_event.is_set(): cancelled = True; break
+        if not cancelled and cancel_event is not None and cancel_event.is_set(): cancelled = True # Stopped inside with_status
+        if not cancelled: f.write("".join(batch))
+    except BaseException:
+        if is_path: f.close(); _remove(target)
+        raise
+    if is_path:
+        f.close()
+        if cancelled: _remove(target)
+        else: os.replace(target, output)
+    if on_progress and not cancelled: on_progress(written)
+    return ExportReport(written, invalid, cancelled)
+
+def _remove(path):
+    try: os.remove(path)
+    except OSError: pass
+
+
+# --- Import ---
+def _iter_json_array(f):
+    """Objects of a top-level JSON array, decoded one at a time from READ_CHUNK reads (json.load would parse it whole)."""
+    decoder = json.JSONDecoder(); buffer = f.read(READ_CHUNK).lstrip(); eof = False
+    if not buffer.startswith("["): raise HistoryFormatError("not a JSON array")
+    pos = 1; expect_item = True
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n": pos += 1
+        if pos >= len(buffer) or (not eof and len(buffer) - pos < 2):
+            if eof: raise HistoryFormatError("JSON array ends early")
+            more = f.read(READ_CHUNK); eof = not more; buffer = buffer[pos:] + more; pos = 0; continue
+        char = buffer[pos]
+        if char == "]": return
+        if char == ",":
+            if expect_item: raise HistoryFormatError("misplaced ',' in JSON array")
+            pos += 1; expect_item = True; continue
+        if not expect_item: raise HistoryFormatError("missing ',' in JSON array")
+        try: value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof: raise HistoryFormatError("bad JSON in array")
+            more = f.read(READ_CHUNK); eof = not more; buffer = buffer[pos:] + more; pos = 0; continue # Item split across reads
+        if end == len(buffer) and not eof and isinstance(value, (int, float)): # A number may go on in the next read
+            more = f.read(READ_CHUNK); eof = not more; buffer = buffer[pos:] + more; pos = 0; continue
+        yield value; pos = end; expect_item = False
+
+def read_history(path, fmt=None, compress=None):
+    """Yields one raw item per entry in an export (or any file in these formats): a dict, or None for a
+    line that couldn't be parsed. Raises HistoryFormatError/OSError if the file can't be read at all."""
+    fmt, compress = detect_format(path, fmt, compress)
+    with open_text(path, "r", compress) as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            if not reader.fieldnames or "link" not in reader.fieldnames or "source" not in reader.fieldnames:
+                raise HistoryFormatError("CSV needs a header row with link and source columns")
+            for row in reader: yield {k: v for k, v in row.items() if k is not None and v not in (None, "")} # Missing cells and surplus columns
+        elif fmt == "jsonl":
+            for line in f:
+                if not line.strip(): continue
+                try: yield json.loads(line)
+                except ValueError: yield None
+        else:
+            try: yield from _iter_json_array(f)
+            except ValueError as e: raise HistoryFormatError(str(e)) from None
+
+def clean_entry(raw, now=None):
+    """The history entry to store for an imported item, or None without a usable link and source.
+    Embedded statuses are dropped; a missing timestamp becomes the import time."""
+    if not isinstance(raw, dict): return None
+    link = raw.get("link"); source = raw.get("source")
+    if not isinstance(link, str) or not isinstance(source, str) or not link.strip() or not source.strip(): return None
+    entry = {key: value for key, value in raw.items() if key not in STATUS_FIELDS}
+    entry["link"] = link.strip(); entry["source"] = source.strip()
+    if not entry.get("timestamp"): entry["timestamp"] = now or time.strftime("%Y-%m-%d %H:%M:%S")
+    return entry
+
+@instrument.timed("history.import")
+def import_history(items, known_links, extend=None, batch_size=IMPORT_BATCH, on_progress=None, cancel_event=None):
+    """Adds the items (from read_history) whose link isn't in `known_links` or earlier in `items`.
+    extend(entries) -> bool stores one batch; without it nothing is stored (a dry run: `imported`
+    then counts what would have been). Stops at the
+    first batch that can't be saved. on_progress(ImportReport) follows every batch."""
+    seen = {link_key(link) for link in known_links}
+    now = time.strftime("%Y-%m-%d %H:%M:%S"); batch = []
+    read = imported = duplicates = skipped = 0; saved = True; cancelled = False
+    def flush():
+        nonlocal imported, saved
+        if extend is not None and batch: saved = bool(extend(list(batch)))
+        if saved: imported += len(batch)
+        batch.clear()
+        if on_progress: on_progress(ImportReport(read, imported, duplicates, skipped, saved, cancelled))
+    for raw in items:
+        read += 1
+        entry = clean_entry(raw, now)
+        if entry is None: skipped += 1; continue
+        key = link_key(entry["link"])
+        if key in seen: duplicates += 1; continue
+        seen.add(key); batch.append(entry)
+        if len(batch) >= batch_size:
+            flush()
+            if not saved: break
+            if cancel_event is not None and cancel_event.is_set(): cancelled = True; break
+    if saved and not cancelled: flush()
+    return ImportReport(read, imported, duplicates, skipped, saved, cancelled)
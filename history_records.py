@@ -0,0 +1,168 @@
+"""Compact in-memory history records.
+
+A history entry used to be a dict holding full link, source and timestamp strings. Large histories
+repeat the same long folders thousands of times ("D:\\SteamLibrary\\steamapps\\common\\..."), so a
+HistoryRecord keeps each path as an interned parent-folder prefix plus its own name, and the
+timestamp as an integer (YYYYMMDDHHMMSS, so sorting never compares strings). Records use
+__slots__ and carry a stable integer id from the store that made them.
+
+Records are read-only Mappings, so entry["link"], entry.get("source") and dict(entry) keep working
+everywhere a dict did; to_json() is the json.dump(default=...) hook that writes them back out.
+A link or source that is missing or isn't a string (a hand-edited or damaged file) reads as "N/A";
+the original value (or its absence) is kept in `extra` and written back out unchanged.
+"""
+import sys
+from collections.abc import Mapping
+
+_TIMESTAMP_SEPARATORS = str.maketrans("", "", "-: ")
+_ABSENT = object() # In extra: the entry had no link/source key at all, so to_dict() leaves it out
+
+
+def parse_timestamp(text):
+    """"YYYY-MM-DD HH:MM:SS" -> YYYYMMDDHHMMSS as an int, or None if `text` isn't in exactly that form."""
+    if type(text) is not str or len(text) != 19 or text[4:17:3] != "-- ::": return None # Separators at 4, 7, 10, 13, 16
+    digits = text.translate(_TIMESTAMP_SEPARATORS)
+    return int(digits) if len(digits) == 14 and digits.isascii() and digits.isdigit() else None
+
+def format_timestamp(value):
+    digits = f"{value:014d}"
+    return f"{digits[0:4]}-{digits[4:6]}-{digits[6:8]} {digits[8:10]}:{digits[10:12]}:{digits[12:14]}"
+
+
+class PathPool:
+    """Interns folder prefixes: every path is stored as (shared prefix object, own name).
+    RecordFactory inlines split() for speed; keep the two in step.
+    The prefix keeps its trailing separator so prefix + name gives back the exact original string."""
+    def __init__(self):
+        self._prefixes = {}
+
+    def split(self, path):
+        cut = max(path.rfind("\\"), path.rfind("/")) + 1
+        if not cut: return "", path
+        prefix = path[:cut]
+        return self._prefixes.setdefault(prefix, prefix), path[cut:]
+
+    def __len__(self):
+        return len(self._prefixes)
+
+
+class HistoryRecord(Mapping):
+    # ts is the parsed timestamp, or -1 when it's missing or not in the usual form; the original text
+    # is then kept verbatim in `extra` (extra holds every key besides link/source/parsed timestamp,
+    # plus link/source themselves when they weren't strings, or _ABSENT when there were none).
+    __slots__ = ("id", "_link_dir", "_link_name", "_source_dir", "_source_name", "ts", "extra")
+
+    # --- Dict-style access ---
+    def __getitem__(self, key):
+        if key == "link": return self._link_dir + self._link_name
+        if key == "source": return self._source_dir + self._source_name
+        if key == "timestamp" and self.ts >= 0: return format_timestamp(self.ts)
+        if self.extra is not None: return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None): # Mapping.get goes through try/except; this is the hot path for callers
+        if key == "link": return self._link_dir + self._link_name
+        if key == "source": return self._source_dir + self._source_name
+        if key == "timestamp" and self.ts >= 0: return format_timestamp(self.ts)
+        return default if self.extra is None else self.extra.get(key, default)
+
+    def __contains__(self, key):
+        return key == "link" or key == "source" or (key == "timestamp" and self.ts >= 0) or (self.extra is not None and key in self.extra)
+
+    def __iter__(self):
+        yield "source"; yield "link"
+        if self.ts >= 0: yield "timestamp"
+        if self.extra is not None: yield from (key for key in self.extra if key != "link" and key != "source")
+
+    def __len__(self):
+        if not self.extra: return 2 + (self.ts >= 0)
+        return 2 + (self.ts >= 0) + len(self.extra) - ("link" in self.extra) - ("source" in self.extra)
+
+    def to_dict(self):
+        entry = {"source": self._source_dir + self._source_name, "link": self._link_dir + self._link_name}
+        if self.ts >= 0: entry["timestamp"] = format_timestamp(self.ts)
+        if self.extra is not None:
+            entry.update(self.extra)
+            if entry["link"] is _ABSENT: del entry["link"]
+            if entry["source"] is _ABSENT: del entry["source"]
+        return entry
+
+    def __repr__(self):
+        return f"HistoryRecord(id={self.id}, {self.to_dict()!r})"
+
+    # Faster than the Mapping defaults for the hot fields
+    @property
+    def link(self): return self._link_dir + self._link_name
+    @property
+    def source(self): return self._source_dir + self._source_name
+
+
+
+class RecordFactory:
+    """Turns entry dicts into HistoryRecords with sequential ids, sharing one PathPool."""
+    def __init__(self, pool=None, first_id=0):
+        self.pool = pool if pool is not None else shared_pool
+        self.next_id = first_id
+
+    def make(self, entry, record_id=None):
+        if type(entry) is HistoryRecord: return entry # Already compact; keep its id
+        if record_id is None: record_id = self.next_id; self.next_id += 1
+        return self._make(entry, record_id, self.pool._prefixes.setdefault)
+
+    @staticmethod
+    def _make(entry, record_id, intern, new=object.__new__, Record=HistoryRecord):
+        # Inlined PathPool.split and parse_timestamp: this runs once per entry on every history load.
+        record = new(Record); record.id = record_id
+        path = entry.get("link")
+        if type(path) is not str: return RecordFactory._make_odd(entry, record_id, intern)
+        cut = max(path.rfind("\\"), path.rfind("/")) + 1; prefix = path[:cut]
+        record._link_dir = intern(prefix, prefix); record._link_name = path[cut:]
+        path = entry.get("source")
+        if type(path) is not str: return RecordFactory._make_odd(entry, record_id, intern)
+        cut = max(path.rfind("\\"), path.rfind("/")) + 1; prefix = path[:cut]
+        record._source_dir = intern(prefix, prefix); name = path[cut:]
+        record._source_name = record._link_name if name == record._link_name else name # Links are usually named after their source folder
+        ts = parse_timestamp(entry.get("timestamp"))
+        record.ts = -1 if ts is None else ts
+        if len(entry) > 3 or ts is None: # Anything we can't rebuild from the slots goes to extra, verbatim
+            extra = {k: v for k, v in entry.items() if k != "link" and k != "source" and (k != "timestamp" or ts is None)}
+            record.extra = extra or None
+        else: record.extra = None
+        return record
+
+    @staticmethod
+    def _make_odd(entry, record_id, intern):
+        """A link or source that is missing or isn't a string (None, a number, ...): "N/A" stands in for it,
+        and the original (or _ABSENT) stays in extra so to_dict() writes it back exactly as it was."""
+        originals = {key: entry.get(key, _ABSENT) for key in ("link", "source") if type(entry.get(key)) is not str}
+        stand_in = dict(entry); stand_in.update((key, "N/A") for key in originals)
+        record = RecordFactory._make(stand_in, record_id, intern)
+        record.extra = {**(record.extra or {}), **originals}
+        return record
+
+    def make_all(self, entries):
+        make = self._make; intern = self.pool._prefixes.setdefault; first = self.next_id
+        if type(entries) is not list: entries = list(entries) # Read twice if anything in it is unusable
+        try: records = [entry if type(entry) is HistoryRecord else make(entry, first + i, intern) for i, entry in enumerate(entries)]
+        except AttributeError: # Something that isn't an entry at all: keep the rest rather than losing the whole history
+            usable = [entry for entry in entries if isinstance(entry, Mapping)]
+            print(f"Skipping {len(entries) - len(usable)} unreadable history entries", file=sys.stderr)
+            records = [entry if type(entry) is HistoryRecord else make(entry, first + i, intern) for i, entry in enumerate(usable)]
+        self.next_id = first + len(records)
+        return records
+
+
+shared_pool = PathPool() # One pool for the whole process, so the store, index and views share prefixes
+
+
+def to_json(value):
+    """json.dump(..., default=to_json): writes records as the plain dicts they stand for."""
+    if isinstance(value, HistoryRecord): return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def sort_time(entry):
+    """Integer timestamp key for a record or a plain entry dict (-1 when missing or unparsable, so those sort oldest).
+    For lists known to hold only records, key=operator.attrgetter("ts") is the same thing at C speed."""
+    if type(entry) is HistoryRecord: return entry.ts
+    value = parse_timestamp(entry.get("timestamp"))
+    return -1 if value is None else value
@@ -0,0 +1,337 @@
+"""History storage backends for LinkForge.
+
+Both stores hand out compact, read-only HistoryRecords (see history_records.py) rather than dicts.
+The default JournaledHistoryStore keeps history in two files:
+  * a snapshot (JSON object with the full entry list and the last folded-in sequence number),
+    always replaced atomically (temp file + fsync + rename), and
+  * an append-only journal of JSON lines, one record per change since the snapshot.
+
+Appending a new junction costs one short write + fsync no matter how big the history is.
+Every COMPACT_EVERY records the journal is folded into a fresh snapshot and truncated.
+A crash can at worst lose the record being written (a torn last line is ignored on replay);
+it can never truncate the existing history. A snapshot that can't be read anyway (damaged by
+something else) is moved aside as <snapshot>.corrupt-<time> and the store carries on from the
+legacy file and the journal, so it still opens and takes new entries.
+
+SQLiteHistoryStore is an optional indexed backend for very large histories; both stores share
+the open/load/count/page/iter_entries/append/extend/save/close interface.
+"""
+import json
+import operator
+import os
+import sys
+import threading
+import time
+
+from history_records import RecordFactory, to_json
+
+SNAPSHOT_VERSION = 1
+COMPACT_EVERY = 500  # Journal records before they're folded into the snapshot
+ITER_BATCH = 2000    # Rows per query when SQLiteHistoryStore.iter_entries streams the table
+
+
+def _fsync_dir(dir_path):
+    # Makes the rename itself durable. Not possible (or needed) on Windows.
+    if os.name == 'nt': return
+    try:
+        fd = os.open(dir_path, os.O_RDONLY)
+        try: os.fsync(fd)
+        finally: os.close(fd)
+    except OSError: pass
+
+
+def atomic_write_json(path, data, indent=None):
+    """Writes `data` as JSON to `path` via a temp file, fsync and rename, so readers see old or new, never half."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(data, indent=indent, default=to_json)) # One-shot dumps runs the C encoder; json.dump never does
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(os.path.dirname(os.path.abspath(path)))
+
+
+_timestamp_key = operator.attrgetter("ts") # Entries are HistoryRecords by the time they're sorted: integer keys
+
+
+class JournaledHistoryStore:
+    def __init__(self, snapshot_path, journal_path, legacy_path=None, compact_every=COMPACT_EVERY):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.legacy_path = legacy_path  # Old single-file history.json, read once as migration input
+        self.compact_every = compact_every
+        self.entries = []        # HistoryRecords, in the order they were added
+        self.records = RecordFactory()
+        self.seq = 0             # Sequence number of the last applied record
+        self.journal_records = 0 # Records currently in the journal file
+        self._journal_file = None
+        self._sorted = None  # Entries ordered oldest first for page(); rebuilt lazily after out-of-order changes
+        self._opened = False
+        self._lock = threading.RLock()
+
+    # --- Reading ---
+    def open(self):
+        """(Re)builds the in-memory history from snapshot + journal, migrating the legacy file if needed."""
+        with self._lock:
+            self._close_journal()
+            entries, seq = self._read_snapshot()
+            migrated = False
+            if entries is None:
+                entries, seq = self._read_legacy(), 0
+                migrated = self.legacy_path is not None and os.path.exists(self.legacy_path)
+            self.records = RecordFactory() # Ids follow history order, so re-reading gives every entry the same id again
+            self.entries, self.seq = self.records.make_all(entries), seq
+            self.journal_records = self._replay_journal()
+            self._sorted = None; self._opened = True
+            if migrated or self.journal_records >= self.compact_every: self.compact()
+
+    def load(self):
+        """Returns a copy of the full entry list. Disk is only read the first time; every write goes through
+        this store, so the in-memory list is current after that. Call open() to re-read it explicitly."""
+        with self._lock:
+            if not self._opened: self.open()
+            return list(self.entries)
+
+    def count(self):
+        with self._lock:
+            if not self._opened: self.open()
+            return len(self.entries)
+
+    def iter_entries(self):
+        """Entries in history order as of the call, for streaming export. The records are in memory already;
+        only the list of references is copied, so appends during the export don't disturb it."""
+        with self._lock:
+            if not self._opened: self.open()
+            entries = list(self.entries)
+        return iter(entries)
+
+    def page(self, offset, limit):
+        """Returns up to `limit` entries, newest first, starting at `offset`."""
+        with self._lock:
+            if not self._opened: self.open()
+            if self._sorted is None: self._sorted = sorted(self.entries, key=_timestamp_key)
+            stop = len(self._sorted) - offset # _sorted is oldest first, so pages are read from the end
+            if stop <= 0: return []
+            return self._sorted[max(0, stop - limit):stop][::-1]
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.snapshot_path): return (None, 0)
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f: data = json.load(f)
+            if isinstance(data, list): return (data, 0) # Tolerate a bare array
+            entries = data.get("entries", [])
+            return (entries if isinstance(entries, list) else [], int(data.get("seq", 0)))
+        except (ValueError, OSError, AttributeError, TypeError) as e: # Truncated, not JSON, or not a snapshot object
+            if not self._set_aside_snapshot(e): raise # Left in place, a later compact() would overwrite it
+            return (None, 0)
+
+    def _set_aside_snapshot(self, error):
+        # Kept for recovery by hand; with the snapshot gone, open() falls back to the legacy file plus the whole journal.
+        aside = stem = f"{self.snapshot_path}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}"; n = 1
+        while os.path.exists(aside): aside = f"{stem}-{n}"; n += 1 # Never replace an earlier one
+        try: os.replace(self.snapshot_path, aside)
+        except OSError as e: print(f"Unreadable history snapshot {self.snapshot_path} ({error}) could not be moved aside: {e}", file=sys.stderr); return False
+        print(f"Unreadable history snapshot {self.snapshot_path} ({error}); moved it to {aside}", file=sys.stderr)
+        return True
+
+    def _read_legacy(self):
+        if not self.legacy_path or not os.path.exists(self.legacy_path): return []
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f: history = json.load(f)
+            return history if isinstance(history, list) else []
+        except Exception as e: print(f"Error reading legacy history {self.legacy_path}: {e}", file=sys.stderr); return []
+
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path): return 0
+        applied = 0
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip(): continue
+                try: record = json.loads(line)
+                except ValueError: print(f"Skipping torn journal record at line {line_no}", file=sys.stderr); continue
+                seq = record.get("seq", 0)
+                if seq <= self.seq: continue # Already folded into the snapshot (crash between compact steps)
+                self._apply(record); self.seq = seq; applied += 1
+        return applied
+
+    def _apply(self, record):
+        op = record.get("op")
+        if op == "add": self.entries.extend(self.records.make_all([record.get("entry")])) # make_all skips an unusable entry
+        elif op == "extend": self.entries.extend(self.records.make_all(record.get("entries", [])))
+        elif op == "replace": self.entries = self.records.make_all(record.get("entries", []))
+        else: print(f"Unknown journal op: {op}", file=sys.stderr)
+
+    # --- Writing ---
+    def append(self, entry):
+        """Durably records one new history entry. Cost is independent of history size."""
+        with self._lock:
+            if not self._opened: self.open()
+            self._write_record({"op": "add", "entry": entry})
+            entry = self.records.make(entry); self.entries.append(entry)
+            # New links are normally the newest, so the sorted view can usually just grow at the end.
+            if self._sorted is not None:
+                if not self._sorted or _timestamp_key(entry) >= _timestamp_key(self._sorted[-1]): self._sorted.append(entry)
+                else: self._sorted = None
+            if self.journal_records >= self.compact_every: self.compact()
+
+    def extend(self, entries):
+        """Durably records a batch of entries as one journal record (one write + fsync for the whole batch)."""
+        entries = list(entries)
+        if not entries: return
+        with self._lock:
+            if not self._opened: self.open()
+            self._write_record({"op": "extend", "entries": entries})
+            entries = self.records.make_all(entries); self.entries.extend(entries)
+            if self._sorted is not None:
+                newest = _timestamp_key(self._sorted[-1]) if self._sorted else -1
+                if all(_timestamp_key(e) >= newest for e in entries): self._sorted.extend(sorted(entries, key=_timestamp_key))
+                else: self._sorted = None
+            if self.journal_records >= self.compact_every: self.compact()
+
+    def save(self, entries):
+        """Replaces the whole history (e.g. after an edit or import) with a fresh snapshot."""
+        with self._lock:
+            self.records = RecordFactory(); self.entries = self.records.make_all(entries); self._sorted = None; self._opened = True
+            self.seq += 1
+            self.compact()
+
+    def compact(self):
+        """Folds the journal into a new snapshot, then truncates the journal."""
+        with self._lock:
+            snapshot_dir = os.path.dirname(os.path.abspath(self.snapshot_path))
+            os.makedirs(snapshot_dir, exist_ok=True)
+            atomic_write_json(self.snapshot_path, {"version": SNAPSHOT_VERSION, "seq": self.seq, "entries": self.entries})
+            # If we crash right here the journal still holds records <= seq; replay skips them.
+            self._close_journal()
+            with open(self.journal_path, 'w', encoding='utf-8') as f: f.flush(); os.fsync(f.fileno())
+            self.journal_records = 0
+
+    def _write_record(self, record):
+        if self._journal_file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+            self._journal_file = open(self.journal_path, 'a', encoding='utf-8')
+            if self._journal_file.tell() > 0 and not self._ends_with_newline(): self._journal_file.write("\n") # Fence off a torn tail
+        record["seq"] = self.seq + 1
+        self._journal_file.write(json.dumps(record, separators=(',', ':'), default=to_json) + "\n")
+        self._journal_file.flush(); os.fsync(self._journal_file.fileno())
+        self.seq += 1; self.journal_records += 1
+
+    def _ends_with_newline(self):
+        with open(self.journal_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _close_journal(self):
+        if self._journal_file is not None:
+            try: self._journal_file.close()
+            except OSError: pass
+            self._journal_file = None
+
+    def close(self):
+        with self._lock: self._close_journal()
+
+
+# --- SQLite Backend ---
+HISTORY_COLUMNS = ("link", "source", "timestamp")
+
+class SQLiteHistoryStore:
+    """Optional indexed history backend for very large histories.
+
+    Same interface as JournaledHistoryStore, but count() and page() are answered by indexed
+    queries, so nothing has to be held in memory and opening the history window costs the same
+    at 100 rows as at 100k. Keys other than link/source/timestamp are kept as JSON in `extra`.
+    """
+    def __init__(self, db_path, migrate_from=None):
+        self.db_path = db_path
+        self.records = RecordFactory()
+        self.migrate_from = migrate_from  # Store whose contents seed an empty database (e.g. JournaledHistoryStore)
+        self.conn = None
+        self._lock = threading.RLock()
+
+    def open(self):
+        with self._lock:
+            if self.conn is not None: return
+            import sqlite3 # Only paid for when this backend is selected
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            with self.conn:
+                self.conn.execute("CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY AUTOINCREMENT, link TEXT NOT NULL, source TEXT NOT NULL, timestamp TEXT NOT NULL, extra TEXT)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_link ON history(link)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_source ON history(source)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp, id)")
+                self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            migrated = self.conn.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone()
+            if not migrated: self._migrate()
+
+    def _migrate(self):
+        entries = []
+        if self.migrate_from is not None:
+            try: entries = self.migrate_from.load()
+            except Exception as e: print(f"Error reading history for SQLite migration: {e}", file=sys.stderr)
+        with self.conn:
+            self.conn.executemany("INSERT INTO history (link, source, timestamp, extra) VALUES (?, ?, ?, ?)", (self._to_row(e) for e in entries))
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', ?)", (str(len(entries)),))
+
+    @staticmethod
+    def _to_row(entry):
+        extra = {k: v for k, v in entry.items() if k not in HISTORY_COLUMNS}
+        return (entry.get("link", "N/A"), entry.get("source", "N/A"), entry.get("timestamp", ""), json.dumps(extra) if extra else None)
+
+    def _from_row(self, row):
+        row_id, link, source, timestamp, extra = row
+        entry = json.loads(extra) if extra else {}
+        entry.update(link=link, source=source, timestamp=timestamp)
+        return self.records.make(entry, record_id=row_id) # The rowid is the record's stable id
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            if self.conn is None: self.open()
+            return self.conn.execute(sql, params).fetchall()
+
+    def load(self):
+        return [self._from_row(r) for r in self._query("SELECT id, link, source, timestamp, extra FROM history ORDER BY id")]
+
+    def count(self):
+        return self._query("SELECT COUNT(*) FROM history")[0][0]
+
+    def page(self, offset, limit):
+        """Returns up to `limit` entries, newest first, starting at `offset` (served from idx_history_timestamp)."""
+        rows = self._query("SELECT id, link, source, timestamp, extra FROM history ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?", (limit, offset))
+        return [self._from_row(r) for r in rows]
+
+    def iter_entries(self, batch_size=ITER_BATCH):
+        """Entries in history order, fetched `batch_size` rows at a time by rowid, so memory stays flat at any table size."""
+        last_id = 0
+        while True:
+            rows = self._query("SELECT id, link, source, timestamp, extra FROM history WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size))
+            for row in rows: yield self._from_row(row)
+            if len(rows) < batch_size: return
+            last_id = rows[-1][0]
+
+    def find_by_link(self, link):
+        return [self._from_row(r) for r in self._query("SELECT id, link, source, timestamp, extra FROM history WHERE link = ? ORDER BY id", (link,))]
+
+    def find_by_source(self, source):
+        return [self._from_row(r) for r in self._query("SELECT id, link, source, timestamp, extra FROM history WHERE source = ? ORDER BY id", (source,))]
+
+    def append(self, entry):
+        with self._lock:
+            if self.conn is None: self.open()
+            with self.conn: self.conn.execute("INSERT INTO history (link, source, timestamp, extra) VALUES (?, ?, ?, ?)", self._to_row(entry))
+
+    def extend(self, entries):
+        with self._lock:
+            if self.conn is None: self.open()
+            with self.conn: self.conn.executemany("INSERT INTO history (link, source, timestamp, extra) VALUES (?, ?, ?, ?)", (self._to_row(e) for e in entries))
+
+    def save(self, entries):
+        with self._lock:
+            if self.conn is None: self.open()
+            with self.conn:
+                self.conn.execute("DELETE FROM history")
+                self.conn.executemany("INSERT INTO history (link, source, timestamp, extra) VALUES (?, ?, ?, ?)", (self._to_row(e) for e in entries))
+
+    def close(self):
+        with self._lock:
+            if self.conn is not None: self.conn.close(); self.conn = None
@@ -0,0 +1,267 @@
+"""Single-instance mode: a second GUI launch hands its arguments to the LinkForge window already open.
+
+The running instance listens on a per-user local channel, a named pipe on Windows and a Unix socket
+elsewhere. A new launch first tries to deliver its request there and exits if that works, which
+costs an interpreter start and one round trip instead of the admin probe, the history load and
+building the window. main.py does this before importing tkinter, core or anything else heavy, so
+keep this module's imports to the standard library.
+
+A request is one line of JSON, {"source": ..., "link": ..., "history": bool}, answered with
+"ok <pid>". If delivery fails for any reason (no instance, a socket left by a crash, an elevated
+instance this user can't open), the launch just starts a window of its own.
+"""
+import errno
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import namedtuple
+
+INSTANCE_ADDRESS = os.environ.get("LINKFORGE_INSTANCE_ADDRESS") # Overrides the per-user pipe/socket (benchmarks, tests)
+FORWARD_TIMEOUT = 2.0 # Seconds a launch waits on the running instance before starting its own window
+REQUEST_TIMEOUT = 1.0 # Seconds the server waits for a connected client to send its line
+MAX_REQUEST_BYTES = 64 * 1024
+ERROR_PIPE_BUSY = 231 # Windows: the pipe is between two clients
+
+LaunchArgs = namedtuple("LaunchArgs", "request new_instance")
+
+
+def instance_address():
+    if INSTANCE_ADDRESS: return INSTANCE_ADDRESS
+    user = os.environ.get("USERNAME") or os.environ.get("USER") or "user"
+    if os.name == 'nt': return "\\\\.\\pipe\\LinkForge-" + user
+    return os.path.join(os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp", f"linkforge-{os.getuid()}.sock")
+
+def parse_launch_args(argv):
+    """The GUI's own options (main.py without a CLI command). Paths are made absolute here, because
+    the instance that ends up applying them may have a different working directory."""
+    import argparse
+    parser = argparse.ArgumentParser(prog="main.py", description="LinkForge window. Use `main.py <command> --help` for the command line.")
+    parser.add_argument("--source", help="prefill Source (the existing folder the link points to)")
+    parser.add_argument("--link", help="prefill Link Parent and Link Name from the full path of the link to create")
+    parser.add_argument("--history", action="store_true", help="open the history window")
+    parser.add_argument("--new-instance", action="store_true", help="start a separate window even if LinkForge is already open")
+    args = parser.parse_args(argv)
+    request = {"source": os.path.abspath(args.source) if args.source else None,
+               "link": os.path.abspath(args.link) if args.link else None, "history": args.history}
+    return LaunchArgs(request, args.new_instance)
+
+def clean_request(request):
+    """Only the known keys, with the expected types; None for anything else."""
+    if not isinstance(request, dict): return None
+    text = lambda key: request.get(key) if isinstance(request.get(key), str) and request.get(key) else None
+    return {"source": text("source"), "link": text("link"), "history": request.get("history") is True}
+
+
+# --- Client ---
+def forward(request, address=None, timeout=FORWARD_TIMEOUT):
+    """Delivers `request` to the running instance. True if it was accepted."""
+    address = address or instance_address()
+    data = json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n"
+    try: reply = (_pipe_round_trip if os.name == 'nt' else _socket_round_trip)(address, data, timeout)
+    except OSError: return False
+    if not reply.startswith(b"ok"): return False
+    if os.name == 'nt':
+        try:
+            import ctypes # Windows only lets the instance come to the front if the launch that has focus says so
+            ctypes.windll.user32.AllowSetForegroundWindow(int(reply.split()[1]))
+        except Exception: pass
+    return True
+
+def forward_or_serve(request, address=None):
+    """Hands `request` to the running instance, or becomes it. Returns (forwarded, server): exit if
+    forwarded; otherwise server is the started InstanceServer, or None if neither worked."""
+    address = address or instance_address()
+    for _ in range(2): # A launch racing this one can claim the address between the two steps
+        if forward(request, address): return True, None
+        try: return False, InstanceServer(address).start()
+        except OSError: continue
+    return False, None # Held by an instance we can't reach (e.g. elevated): run standalone
+
+def _socket_round_trip(address, data, timeout):
+    import socket
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout); sock.connect(address); sock.sendall(data)
+        return _read_line(sock.recv, 64)
+
+def _pipe_round_trip(address, data, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        try: pipe = open(address, "r+b", buffering=0); break
+        except OSError as e:
+            if getattr(e, "winerror", None) != ERROR_PIPE_BUSY or time.monotonic() > deadline: raise
+            time.sleep(0.01)
+    with pipe:
+        pipe.write(data)
+        return _read_line(pipe.read, 64)
+
+def _read_line(read, limit):
+    data = b""
+    while b"\n" not in data and len(data) < limit:
+        chunk = read(limit - len(data))
+        if not chunk: break
+        data += chunk
+    return data
+
+def _knock(address):
+    """Connects and hangs up: wakes a server blocked in accept."""
+    try:
+        if os.name == 'nt': open(address, "r+b", buffering=0).close()
+        else:
+            import socket
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock: sock.settimeout(REQUEST_TIMEOUT); sock.connect(address)
+        return True
+    except OSError: return False
+
+
+# --- Server ---
+class InstanceServer:
+    """Accepts launch requests on a daemon thread and queues them in `requests` for the Tk thread to drain.
+    on_request(), if set, is called on that thread after each request is queued and answered (to wake the Tk thread)."""
+    def __init__(self, address=None, requests=None, on_request=None):
+        self.address = address or instance_address(); self.requests = requests if requests is not None else queue.Queue()
+        self.on_request = on_request
+        self._notify_lock = threading.Lock(); self._notifying = False # Inside on_request, which may be waiting on the Tk thread
+        self._channel = None; self._thread = None; self._closed = False
+
+    def start(self):
+        """Claims the address; raises OSError if another instance holds it."""
+        self._channel = _PipeChannel(self.address) if os.name == 'nt' else _SocketChannel(self.address)
+        self._thread = threading.Thread(target=self._serve, name="LinkForgeInstance", daemon=True); self._thread.start()
+        return self
+
+    def _serve(self):
+        while not self._closed:
+            try: connection = self._channel.accept()
+            except OSError as e:
+                if self._closed: break
+                print(f"Error accepting launch request: {e}", file=sys.stderr); time.sleep(0.1); continue
+            try:
+                if self._closed: break
+                request = clean_request(json.loads(connection.read_line(MAX_REQUEST_BYTES) or b"null"))
+                if request is not None: self.requests.put(request); connection.reply(b"ok %d\n" % os.getpid())
+            except (OSError, ValueError): request = None # A knock, a client that gave up, or garbage: nothing to do
+            finally: connection.close()
+            if request is None: continue
+            with self._notify_lock:
+                on_request = None if self._closed else self.on_request; self._notifying = on_request is not None
+            if on_request is None: continue
+            try: on_request()
+            except Exception as e: print(f"Error handing over launch request: {e}", file=sys.stderr)
+            finally: self._notifying = False
+        self._channel.close()
+
+    def close(self):
+        """Stops listening, so the next launch (or an elevated relaunch) becomes the instance."""
+        if self._channel is None or self._closed: return
+        with self._notify_lock: self._closed = True; self.on_request = None; notifying = self._notifying
+        # on_request may be blocked until the Tk thread, likely the one calling this, gets back to its event
+        # loop, so don't wait for it: the thread sees _closed once that call returns and exits.
+        if notifying: self._channel.close(); return
+        _knock(self.address)
+        self._thread.join(REQUEST_TIMEOUT)
+        if self._thread.is_alive(): self._channel.close() # Stuck on a silent client; the daemon thread goes with the process
+
+
+class _SocketConnection:
+    def __init__(self, sock): self._sock = sock; sock.settimeout(REQUEST_TIMEOUT)
+    def read_line(self, limit): return _read_line(self._sock.recv, limit)
+    def reply(self, data): self._sock.sendall(data)
+    def close(self): self._sock.close()
+
+
+class _SocketChannel:
+    def __init__(self, address):
+        import socket
+        self.address = address; self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            try: self._sock.bind(address)
+            except OSError as e:
+                if e.errno != errno.EADDRINUSE or _knock(address): raise
+                os.unlink(address); self._sock.bind(address) # Left behind by an instance that didn't shut down cleanly
+            os.chmod(address, 0o600); self._sock.listen(8)
+        except OSError: self._sock.close(); raise
+        self._inode = os.stat(address).st_ino
+
+    def accept(self):
+        if self._sock is None: raise OSError(errno.EBADF, "instance channel closed")
+        return _SocketConnection(self._sock.accept()[0])
+
+    def close(self):
+        if self._sock is None: return # Closed already; by now the name may belong to a newer instance
+        self._sock.close(); self._sock = None
+        try:
+            if os.stat(self.address).st_ino == self._inode: os.unlink(self.address) # Not if a newer instance already took the name
+        except OSError: pass
+
+
+class _PipeChannel:
+    """One byte-mode named pipe instance, served one client at a time. FILE_FLAG_FIRST_PIPE_INSTANCE
+    and nMaxInstances=1 make creating it the single-instance lock; local clients only."""
+    PIPE_ACCESS_DUPLEX = 0x00000003
+    FILE_FLAG_FIRST_PIPE_INSTANCE = 0x00080000
+    PIPE_REJECT_REMOTE_CLIENTS = 0x00000008 # PIPE_TYPE_BYTE | PIPE_READMODE_BYTE | PIPE_WAIT are all 0
+    ERROR_PIPE_CONNECTED = 535
+    ERROR_BROKEN_PIPE = 109
+
+    def __init__(self, address):
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes; self._wintypes = wintypes
+        self._invalid_handle = ctypes.c_void_p(-1).value # INVALID_HANDLE_VALUE
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        self._CreateNamedPipeW = kernel32.CreateNamedPipeW
+        self._CreateNamedPipeW.argtypes = (wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.DWORD, wintypes.DWORD, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID)
+        self._CreateNamedPipeW.restype = wintypes.HANDLE
+        self._ConnectNamedPipe = kernel32.ConnectNamedPipe
+        self._ConnectNamedPipe.argtypes = (wintypes.HANDLE, wintypes.LPVOID); self._ConnectNamedPipe.restype = wintypes.BOOL
+        self._DisconnectNamedPipe = kernel32.DisconnectNamedPipe
+        self._DisconnectNamedPipe.argtypes = (wintypes.HANDLE,); self._DisconnectNamedPipe.restype = wintypes.BOOL
+        self._ReadFile = kernel32.ReadFile
+        self._ReadFile.argtypes = (wintypes.HANDLE, wintypes.LPVOID, wintypes.DWORD, ctypes.POINTER(wintypes.DWORD), wintypes.LPVOID); self._ReadFile.restype = wintypes.BOOL
+        self._WriteFile = kernel32.WriteFile
+        self._WriteFile.argtypes = (wintypes.HANDLE, wintypes.LPCVOID, wintypes.DWORD, ctypes.POINTER(wintypes.DWORD), wintypes.LPVOID); self._WriteFile.restype = wintypes.BOOL
+        self._FlushFileBuffers = kernel32.FlushFileBuffers
+        self._FlushFileBuffers.argtypes = (wintypes.HANDLE,); self._FlushFileBuffers.restype = wintypes.BOOL
+        self._CloseHandle = kernel32.CloseHandle
+        self._CloseHandle.argtypes = (wintypes.HANDLE,); self._CloseHandle.restype = wintypes.BOOL
+        self._handle = self._CreateNamedPipeW(address, self.PIPE_ACCESS_DUPLEX | self.FILE_FLAG_FIRST_PIPE_INSTANCE, self.PIPE_REJECT_REMOTE_CLIENTS,
+                                              1, 4096, 4096, 0, None)
+        if not self._handle or self._handle == self._invalid_handle: raise self._last_error()
+
+    def _last_error(self):
+        error = self._ctypes.get_last_error()
+        return OSError(None, self._ctypes.FormatError(error).strip(), None, error)
+
+    def accept(self):
+        if not self._ConnectNamedPipe(self._handle, None) and self._ctypes.get_last_error() != self.ERROR_PIPE_CONNECTED: raise self._last_error()
+        return _PipeConnection(self)
+
+    def read_line(self, limit): # No read timeout on a synchronous pipe: a local client that connects and stays silent holds it until it exits
+        buffer = self._ctypes.create_string_buffer(4096); read = self._wintypes.DWORD(0)
+        def read_chunk(size):
+            if not self._ReadFile(self._handle, buffer, min(size, len(buffer)), self._ctypes.byref(read), None):
+                if self._ctypes.get_last_error() == self.ERROR_BROKEN_PIPE: return b""
+                raise self._last_error()
+            return buffer.raw[:read.value]
+        return _read_line(read_chunk, limit)
+
+    def reply(self, data):
+        written = self._wintypes.DWORD(0)
+        if not self._WriteFile(self._handle, data, len(data), self._ctypes.byref(written), None): raise self._last_error()
+        self._FlushFileBuffers(self._handle) # Don't disconnect before the client has read it
+
+    def disconnect(self): # Hang up and go back to listening on the same pipe instance
+        if self._handle is not None: self._DisconnectNamedPipe(self._handle)
+
+    def close(self):
+        if self._handle is not None: handle = self._handle; self._handle = None; self._CloseHandle(handle)
+
+
+class _PipeConnection:
+    def __init__(self, channel): self._channel = channel
+    def read_line(self, limit): return self._channel.read_line(limit)
+    def reply(self, data): self._channel.reply(data)
+    def close(self): self._channel.disconnect()
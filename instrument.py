@@ -0,0 +1,152 @@
+"""Timing spans, counters and latency histograms for the hot paths, plus an optional JSON-lines trace.
+
+Switched by LINKFORGE_INSTRUMENT: "off" (default), "on" (in-memory metrics, shown by the
+diagnostics panel, Ctrl+Shift+D in the main window) or "trace" (also appends every span and event
+to a rotating trace.jsonl under HISTORY_DIR). The diagnostics panel can turn metrics on at runtime.
+
+When off, span() hands back one shared no-op object and @timed functions make a single global
+check before calling straight through, so the instrumented paths cost next to nothing.
+"""
+import bisect
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+TRACE_MAX_BYTES = 5 * 1024 * 1024   # Trace file size before it's rotated
+TRACE_BACKUPS = 2                   # Rotated trace files kept (trace.jsonl.1, .2)
+# Histogram bucket upper bounds in ms: 4 per doubling from 1 us to ~35 min (about +/-10% resolution)
+BUCKET_BOUNDS = [0.001 * 2 ** (i / 4) for i in range(124)]
+
+enabled = False
+_tracer = None
+_lock = threading.Lock()
+_histograms = {}    # name -> Histogram
+_counters = {}      # name -> int
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "total", "max")
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1); self.count = 0; self.total = 0.0; self.max = 0.0
+
+    def add(self, ms):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, ms)] += 1
+        self.count += 1; self.total += ms
+        if ms > self.max: self.max = ms
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (capped at the observed max)."""
+        if not self.count: return 0.0
+        rank = p / 100.0 * self.count; seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n: return min(BUCKET_BOUNDS[i], self.max) if i < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+
+class RotatingTrace:
+    """Appends one JSON object per line, rotating the file once it passes max_bytes."""
+    def __init__(self, path, max_bytes=TRACE_MAX_BYTES, backups=TRACE_BACKUPS):
+        self.path = path; self.max_bytes = max_bytes; self.backups = backups
+        self._file = None; self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            try:
+                if self._file is None: self._file = open(self.path, 'a', encoding='utf-8')
+                self._file.write(line)
+                if self._file.tell() >= self.max_bytes: self._rotate()
+            except OSError as e: print(f"Error writing trace {self.path}: {e}", file=sys.stderr)
+
+    def _rotate(self):
+        self._file.close(); self._file = None
+        for i in range(self.backups, 0, -1):
+            older = f"{self.path}.{i}"; newer = f"{self.path}.{i - 1}" if i > 1 else self.path
+            if os.path.exists(newer): os.replace(newer, older)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None: self._file.close(); self._file = None
+
+
+def configure(mode, trace_path=None):
+    """mode: "off", "on" or "trace" (needs trace_path)."""
+    global enabled, _tracer
+    enabled = mode in ("on", "trace")
+    if _tracer is not None: _tracer.close(); _tracer = None
+    if mode == "trace" and trace_path: _tracer = RotatingTrace(trace_path)
+
+def close():
+    global _tracer
+    if _tracer is not None: _tracer.close(); _tracer = None
+
+
+# --- Recording ---
+def record(name, ms, **fields):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None: histogram = _histograms[name] = Histogram()
+        histogram.add(ms)
+    if _tracer is not None: _tracer.write(dict(fields, t=time.time(), span=name, ms=round(ms, 3), thread=threading.current_thread().name))
+
+def count(name, n=1):
+    if not enabled: return
+    with _lock: _counters[name] = _counters.get(name, 0) + n
+
+def event(name, **fields):
+    """A point-in-time trace record (what the old DEBUG prints said), also counted."""
+    if not enabled: return
+    count(name)
+    if _tracer is not None: _tracer.write(dict(fields, t=time.time(), event=name, thread=threading.current_thread().name))
+
+
+class _Span:
+    __slots__ = ("name", "fields", "start")
+    def __init__(self, name, fields): self.name = name; self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter(); return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None: self.fields["error"] = exc_type.__name__
+        record(self.name, (time.perf_counter() - self.start) * 1000, **self.fields)
+        return False
+
+class _NoSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, exc_type, exc, tb): return False
+
+_NO_SPAN = _NoSpan()
+
+def span(name, **fields):
+    """`with span("history.save"):` times the block when instrumentation is on."""
+    return _Span(name, fields) if enabled else _NO_SPAN
+
+def timed(name):
+    """Decorator form of span() for whole functions."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def timed_fn(*args, **kwargs):
+            if not enabled: return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: record(name, (time.perf_counter() - start) * 1000)
+        return timed_fn
+    return wrap
+
+
+# --- Reading ---
+def snapshot():
+    """{"spans": {name: {count, total_ms, p50_ms, p99_ms, max_ms}}, "counters": {name: n}}"""
+    with _lock:
+        spans = {name: {"count": h.count, "total_ms": round(h.total, 3), "p50_ms": round(h.percentile(50), 3),
+                        "p99_ms": round(h.percentile(99), 3), "max_ms": round(h.max, 3)} for name, h in _histograms.items()}
+        return {"spans": spans, "counters": dict(_counters)}
+
+def reset():
+    with _lock: _histograms.clear(); _counters.clear()
@@ -0,0 +1,202 @@
+"""Link-creation backends for LinkForge.
+
+Every backend exposes create(link_path, source_path) -> LinkResult and never raises for ordinary
+failures; what went wrong is reported as one of the LINK_* codes instead of scraped error text.
+
+  * JunctionBackend - Windows, in-process: creates the folder and writes a mount-point reparse
+                      point with DeviceIoControl (no cmd.exe per link).
+  * SymlinkBackend  - POSIX os.symlink, so creation can be exercised and benchmarked on Linux.
+  * MklinkBackend   - the original `mklink /J` through cmd.exe, kept as a fallback.
+
+get_link_backend("auto") picks the native backend for the platform, falling back to mklink on
+Windows if the native call isn't usable.
+"""
+import errno
+import os
+import struct
+import subprocess
+import sys
+from collections import namedtuple
+
+import instrument
+
+LinkResult = namedtuple("LinkResult", "ok code message os_error")
+
+# --- Result Codes ---
+LINK_OK = "ok"
+LINK_EXISTS = "exists"
+LINK_ACCESS_DENIED = "access_denied"
+LINK_PRIVILEGE_REQUIRED = "privilege_required"
+LINK_NOT_FOUND = "not_found"
+LINK_INVALID_NAME = "invalid_name"
+LINK_NOT_SUPPORTED = "not_supported"   # Filesystem/platform can't do this; another backend may
+LINK_FAILED = "failed"
+
+LINK_ERROR_TEXT = {
+    LINK_EXISTS: "Path already exists.",
+    LINK_ACCESS_DENIED: "Access Denied. Run as Admin?",
+    LINK_PRIVILEGE_REQUIRED: "Missing privilege to create links. Run as Admin?",
+    LINK_NOT_FOUND: "Source or link parent path not found.",
+    LINK_INVALID_NAME: "Invalid link name or path.",
+    LINK_NOT_SUPPORTED: "Links are not supported on this volume/platform.",
+    LINK_FAILED: "Link creation failed.",
+}
+
+_WIN_ERROR_CODES = {
+    1: LINK_NOT_SUPPORTED,         # ERROR_INVALID_FUNCTION (e.g. FAT32 has no reparse points)
+    2: LINK_NOT_FOUND,             # ERROR_FILE_NOT_FOUND
+    3: LINK_NOT_FOUND,             # ERROR_PATH_NOT_FOUND
+    5: LINK_ACCESS_DENIED,         # ERROR_ACCESS_DENIED
+    50: LINK_NOT_SUPPORTED,        # ERROR_NOT_SUPPORTED
+    80: LINK_EXISTS,               # ERROR_FILE_EXISTS
+    123: LINK_INVALID_NAME,        # ERROR_INVALID_NAME
+    183: LINK_EXISTS,              # ERROR_ALREADY_EXISTS
+    1314: LINK_PRIVILEGE_REQUIRED, # ERROR_PRIVILEGE_NOT_HELD
+    4390: LINK_NOT_SUPPORTED,      # ERROR_NOT_A_REPARSE_POINT
+}
+
+_ERRNO_CODES = {
+    errno.EEXIST: LINK_EXISTS,
+    errno.EACCES: LINK_ACCESS_DENIED,
+    errno.EPERM: LINK_PRIVILEGE_REQUIRED,
+    errno.ENOENT: LINK_NOT_FOUND,
+    errno.ENOTDIR: LINK_NOT_FOUND,
+    errno.ENAMETOOLONG: LINK_INVALID_NAME,
+    errno.EINVAL: LINK_INVALID_NAME,
+    errno.EROFS: LINK_ACCESS_DENIED,
+    errno.ENOSYS: LINK_NOT_SUPPORTED,
+    errno.EOPNOTSUPP: LINK_NOT_SUPPORTED,
+}
+
+
+def _ok():
+    return LinkResult(True, LINK_OK, "Link created.", None)
+
+def _from_os_error(e):
+    code = _WIN_ERROR_CODES.get(getattr(e, 'winerror', None)) or _ERRNO_CODES.get(e.errno, LINK_FAILED)
+    return LinkResult(False, code, f"{LINK_ERROR_TEXT[code]} ({e.strerror or e})", e.winerror if getattr(e, 'winerror', None) else e.errno)
+
+
+class SymlinkBackend:
+    name = "symlink"
+
+    def create(self, link_path, source_path):
+        try: os.symlink(source_path, link_path, target_is_directory=True)
+        except OSError as e: return _from_os_error(e)
+        except (NotImplementedError, AttributeError) as e: return LinkResult(False, LINK_NOT_SUPPORTED, f"{LINK_ERROR_TEXT[LINK_NOT_SUPPORTED]} ({e})", None)
+        return _ok()
+
+
+class JunctionBackend:
+    """Creates NTFS junctions in-process: CreateDirectoryW + FSCTL_SET_REPARSE_POINT."""
+    name = "junction"
+
+    IO_REPARSE_TAG_MOUNT_POINT = 0xA0000003
+    FSCTL_SET_REPARSE_POINT = 0x000900A4
+    GENERIC_WRITE = 0x40000000
+    OPEN_EXISTING = 3
+    FILE_FLAG_OPEN_REPARSE_POINT = 0x00200000
+    FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes; self._wintypes = wintypes
+        self._invalid_handle = ctypes.c_void_p(-1).value # INVALID_HANDLE_VALUE
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True) # Raises on non-Windows
+        self._CreateDirectoryW = kernel32.CreateDirectoryW
+        self._CreateDirectoryW.argtypes = (wintypes.LPCWSTR, wintypes.LPVOID); self._CreateDirectoryW.restype = wintypes.BOOL
+        self._RemoveDirectoryW = kernel32.RemoveDirectoryW
+        self._RemoveDirectoryW.argtypes = (wintypes.LPCWSTR,); self._RemoveDirectoryW.restype = wintypes.BOOL
+        self._CreateFileW = kernel32.CreateFileW
+        self._CreateFileW.argtypes = (wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID, wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE)
+        self._CreateFileW.restype = wintypes.HANDLE
+        self._DeviceIoControl = kernel32.DeviceIoControl
+        self._DeviceIoControl.argtypes = (wintypes.HANDLE, wintypes.DWORD, wintypes.LPVOID, wintypes.DWORD, wintypes.LPVOID, wintypes.DWORD, ctypes.POINTER(wintypes.DWORD), wintypes.LPVOID)
+        self._DeviceIoControl.restype = wintypes.BOOL
+        self._CloseHandle = kernel32.CloseHandle
+        self._CloseHandle.argtypes = (wintypes.HANDLE,); self._CloseHandle.restype = wintypes.BOOL
+
+    @classmethod
+    def reparse_buffer(cls, source_path):
+        """Builds the REPARSE_DATA_BUFFER (MountPointReparseBuffer) pointing at `source_path`."""
+        source_path = os.path.abspath(source_path)
+        substitute = ("\\??\\" + source_path).encode("utf-16-le")
+        printable = source_path.encode("utf-16-le")
+        path_buffer = substitute + b"\0\0" + printable + b"\0\0"
+        header = struct.pack("<LHHHHHH", cls.IO_REPARSE_TAG_MOUNT_POINT, 8 + len(path_buffer), 0,
+                             0, len(substitute), len(substitute) + 2, len(printable))
+        return header + path_buffer
+
+    def _last_error(self):
+        error = self._ctypes.get_last_error()
+        return OSError(None, self._ctypes.FormatError(error).strip(), None, error)
+
+    def create(self, link_path, source_path):
+        if not os.path.isdir(source_path): return LinkResult(False, LINK_NOT_FOUND, f"{LINK_ERROR_TEXT[LINK_NOT_FOUND]} ({source_path})", None)
+        if not self._CreateDirectoryW(link_path, None): return _from_os_error(self._last_error())
+        buffer = self.reparse_buffer(source_path)
+        handle = self._CreateFileW(link_path, self.GENERIC_WRITE, 0, None, self.OPEN_EXISTING,
+                                   self.FILE_FLAG_OPEN_REPARSE_POINT | self.FILE_FLAG_BACKUP_SEMANTICS, None)
+        if not handle or handle == self._invalid_handle:
+            error = self._last_error(); self._RemoveDirectoryW(link_path)
+            return _from_os_error(error)
+        try:
+            returned = self._wintypes.DWORD(0)
+            raw = self._ctypes.create_string_buffer(buffer, len(buffer))
+            if not self._DeviceIoControl(handle, self.FSCTL_SET_REPARSE_POINT, raw, len(buffer), None, 0, self._ctypes.byref(returned), None):
+                error = self._last_error()
+                self._CloseHandle(handle); handle = None
+                self._RemoveDirectoryW(link_path) # Don't leave an empty folder behind
+                return _from_os_error(error)
+        finally:
+            if handle is not None: self._CloseHandle(handle)
+        return _ok()
+
+
+class MklinkBackend:
+    """The original approach: `mklink /J` in a hidden cmd.exe. Slow per link, but always available on Windows."""
+    name = "mklink"
+
+    def create(self, link_path, source_path):
+        cmd_string = f'mklink /J "{link_path}" "{source_path}"'
+        try:
+            with instrument.span("link.mklink_subprocess"):
+                result = subprocess.run(cmd_string, capture_output=True, text=True, check=False, shell=True,
+                                        creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        except OSError as e: return _from_os_error(e)
+        if result.returncode == 0 and os.path.lexists(link_path): return _ok()
+        error_details = result.stderr.strip() if result.stderr else result.stdout.strip()
+        lowered = error_details.lower()
+        # mklink only reports localized text; these English checks are best effort.
+        if "already exists" in lowered: code = LINK_EXISTS
+        elif "access is denied" in lowered: code = LINK_ACCESS_DENIED
+        elif "syntax" in lowered: code = LINK_INVALID_NAME
+        elif "cannot find" in lowered: code = LINK_NOT_FOUND
+        else: code = LINK_FAILED
+        return LinkResult(False, code, f"{LINK_ERROR_TEXT[code]} (mklink code {result.returncode}) {error_details}".strip(), result.returncode)
+
+
+class FallbackBackend:
+    """Tries backends in order, moving on only when one reports LINK_NOT_SUPPORTED."""
+    def __init__(self, backends):
+        self.backends = backends
+        self.name = "+".join(b.name for b in backends)
+
+    def create(self, link_path, source_path):
+        result = None
+        for backend in self.backends:
+            result = backend.create(link_path, source_path)
+            if result.code != LINK_NOT_SUPPORTED: return result
+        return result
+
+
+def get_link_backend(name="auto"):
+    """Returns a backend by name: "auto", "junction", "symlink" or "mklink"."""
+    if name == "mklink": return MklinkBackend()
+    if name == "symlink": return SymlinkBackend()
+    if name == "junction": return JunctionBackend()
+    if os.name == 'nt':
+        try: return FallbackBackend([JunctionBackend(), MklinkBackend()])
+        except (OSError, AttributeError) as e: print(f"Native junction backend unavailable ({e}); using mklink.", file=sys.stderr); return MklinkBackend()
+    return SymlinkBackend()
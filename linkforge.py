@@ -0,0 +1,348 @@
+"""Headless command line for LinkForge, for scripts and CI.
+
+  linkforge.py create SOURCE PARENT NAME   create one junction and record it in the history
+  linkforge.py validate [LINK ...]         check history entries (all, or just the given links)
+  linkforge.py list [--limit N] [--offset N]
+  linkforge.py export [--format json|jsonl|csv] [-o FILE] [--gzip] [--validate]
+  linkforge.py import FILE [--dry-run]     add an export's entries to the history (links already there are skipped)
+  linkforge.py batch MANIFEST              create every junction in a CSV/JSON manifest
+  linkforge.py relocate FOLDER DESTINATION move FOLDER to DESTINATION and leave a junction in its place (resumable)
+  linkforge.py sizes [--cached]            how much data each tracked source holds (incremental size index)
+  linkforge.py scan ROOT... [--import]     find junctions under ROOTs (optionally add them to the history)
+  linkforge.py monitor                     keep re-checking the history and report status changes (service loop)
+
+`main.py <command> ...` forwards here before tkinter is imported, so none of these pay for Tk.
+Every command takes --json for machine-readable output on stdout; diagnostics go to stderr.
+Exit codes: 0 success, 1 a link failed or isn't valid, 2 bad usage or unreadable input.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import core
+from history_records import to_json
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+COMMANDS = ("create", "validate", "list", "export", "import", "batch", "relocate", "sizes", "scan", "monitor")
+STATUS_NAMES = {0: "valid", 1: "link_missing", 2: "source_missing", 3: "not_a_link", 4: "error", 5: "target_mismatch"}
+CLI_WORKERS = 8 # Same default as the GUI's validation pool and batch.BATCH_WORKERS
+
+
+def is_cli_invocation(argv):
+    """True when main.py's arguments ask for a CLI command rather than the GUI."""
+    return bool(argv) and argv[0] in COMMANDS
+
+
+def _emit(args, data, lines):
+    if args.json: json.dump(data, sys.stdout, indent=2, ensure_ascii=False, default=to_json); sys.stdout.write("\n")
+    else:
+        for line in lines: print(line)
+
+def _error(message, code=EXIT_USAGE):
+    print(f"linkforge: {message}", file=sys.stderr)
+    return code
+
+
+# --- Commands ---
+def cmd_create(args):
+    import batch # Pulls in the worker pool machinery; only the commands that create links need it
+    from link_backends import get_link_backend
+    link = os.path.normpath(os.path.join(args.parent, args.name)) if args.parent and args.name else ""
+    item = batch.BatchItem(0, args.source, args.parent, args.name, link)
+    problem = batch.validate_item(item)
+    if problem:
+        code, message = problem
+        _emit(args, {"ok": False, "code": code, "message": message, "link": link, "source": args.source}, [f"Error: {message}"])
+        return EXIT_FAILED
+    try: backend = get_link_backend(args.backend)
+    except (OSError, AttributeError) as e: return _error(f"link backend '{args.backend}' unavailable: {e}")
+    result = batch.run_batch([item], backend, workers=1)[0]
+    entry = batch.history_entries([result])
+    saved = False
+    if entry:
+        core.validity_cache.invalidate(link_path=link); saved = core.append_history(entry[0])
+    data = {"ok": result.ok, "code": result.code, "message": result.message, "link": link, "source": args.source,
+            "timestamp": result.timestamp, "history_saved": saved}
+    if result.ok: lines = [f"Created: {link} -> {args.source}"] + ([] if saved else ["Warning: could not save to history."])
+    else: lines = [f"Error ({result.code}): {result.message}"]
+    _emit(args, data, lines)
+    return EXIT_OK if result.ok else EXIT_FAILED
+
+def cmd_validate(args):
+    entries = core.load_history()
+    missing = []
+    if args.links:
+        wanted = {os.path.normcase(os.path.normpath(l)): l for l in args.links}
+        entries = [e for e in entries if os.path.normcase(os.path.normpath(e.get("link", ""))) in wanted]
+        found = {os.path.normcase(os.path.normpath(e.get("link", ""))) for e in entries}
+        missing = [l for key, l in wanted.items() if key not in found]
+        for link in missing: print(f"linkforge: not in history: {link}", file=sys.stderr)
+    from concurrent.futures import ThreadPoolExecutor
+    from validity import resolve_junction
+    pairs = [(e.get("link", "N/A"), e.get("source", "N/A")) for e in entries]
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        statuses = list(executor.map(lambda pair: resolve_junction(*pair), pairs))
+    results = [{"link": link, "source": source, "target": target, "status": STATUS_NAMES.get(code, "error"), "code": code, "message": text}
+               for (link, source), ((code, text), target) in zip(pairs, statuses)]
+    invalid = sum(1 for r in results if r["code"] != 0)
+    shown = [r for r in results if r["code"] != 0] if args.only_invalid else results
+    _emit(args, {"checked": len(results), "valid": len(results) - invalid, "invalid": invalid, "not_in_history": missing, "results": shown},
+          [f"{r['message']:<26}  {r['link']} -> {r['source']}" + (f" (points to {r['target']})" if r["code"] == 5 else "") for r in shown] + [f"{len(results)} checked, {invalid} invalid."])
+    return EXIT_FAILED if invalid or missing else EXIT_OK
+
+def cmd_list(args):
+    store = core.get_history_store()
+    try: total = store.count(); entries = store.page(args.offset, args.limit)
+    except Exception as e: return _error(f"could not read history: {e}")
+    _emit(args, {"total": total, "offset": args.offset, "entries": entries},
+          [f"{e.get('timestamp', ''):<19}  {e.get('link', 'N/A')} -> {e.get('source', 'N/A')}" for e in entries])
+    return EXIT_OK
+
+def cmd_export(args):
+    import history_io
+    to_stdout = args.output in (None, "-")
+    if to_stdout: fmt, compress = args.format or "json", args.gzip
+    else:
+        try: fmt, compress = history_io.detect_format(args.output, args.format, args.gzip or None)
+        except history_io.HistoryFormatError: fmt, compress = "json", args.gzip # Unknown extension: the format this command always wrote
+    if to_stdout and compress: return _error("--gzip needs -o FILE")
+    check = None
+    if args.validate:
+        from validity import check_junction_validity
+        check = check_junction_validity
+    started = time.perf_counter()
+    try: report = history_io.export_history(core.iter_history(), sys.stdout if to_stdout else args.output, fmt, compress, check=check, workers=args.workers)
+    except OSError as e: return _error(f"could not write {'stdout' if to_stdout else args.output}: {e}")
+    if not to_stdout:
+        status = f", {report.invalid} not valid" if args.validate else ""
+        print(f"Exported {report.written} entries{status} to {args.output} ({fmt}{', gzip' if compress else ''}) in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return EXIT_OK
+
+def cmd_import(args):
+    import history_io
+    try: fmt, compress = history_io.detect_format(args.file, args.format, args.gzip or None)
+    except history_io.HistoryFormatError as e: return _error(str(e))
+    def extend(entries):
+        for entry in entries: core.validity_cache.invalidate(link_path=entry["link"])
+        return core.extend_history(entries)
+    def on_progress(r):
+        if sys.stderr.isatty(): print(f"\r{r.read} read, {r.imported} imported…", end="", file=sys.stderr, flush=True)
+    try:
+        known = (entry.get("link", "") for entry in core.iter_history())
+        report = history_io.import_history(history_io.read_history(args.file, fmt, compress), known, None if args.dry_run else extend, on_progress=on_progress)
+    except (OSError, UnicodeDecodeError, history_io.HistoryFormatError) as e: return _error(f"could not read {args.file}: {e}")
+    finally:
+        if sys.stderr.isatty(): print(file=sys.stderr)
+    summary = (f"{report.read} read, {report.imported} {'would be imported' if args.dry_run else 'imported'}, {report.duplicates} already in history, {report.skipped} skipped (no link or source)."
+               + ("" if report.saved else " Warning: could not save to history; stopped."))
+    _emit(args, {"read": report.read, "imported": 0 if args.dry_run else report.imported, "new": report.imported, "duplicates": report.duplicates, "skipped": report.skipped,
+                 "history_saved": report.saved, "dry_run": args.dry_run}, [summary])
+    return EXIT_OK if report.saved else EXIT_FAILED
+
+def cmd_batch(args):
+    import batch
+    from link_backends import get_link_backend
+    try: items = batch.load_manifest(args.manifest)
+    except (OSError, batch.ManifestError) as e: return _error(f"could not read manifest: {e}")
+    try: backend = get_link_backend(args.backend)
+    except (OSError, AttributeError) as e: return _error(f"link backend '{args.backend}' unavailable: {e}")
+    results = batch.run_batch(items, backend, workers=args.workers)
+    entries = batch.history_entries(results)
+    for entry in entries: core.validity_cache.invalidate(link_path=entry["link"])
+    saved = core.extend_history(entries)
+    failed = [r for r in results if not r.ok]
+    data = {"created": len(entries), "failed": len(failed), "history_saved": saved,
+            "results": [{"index": r.item.index, "link": r.item.link, "source": r.item.source, "ok": r.ok, "code": r.code,
+                         "message": r.message, "timestamp": r.timestamp} for r in results]}
+    lines = [f"{'OK' if r.ok else 'FAIL':<4}  {r.item.link or '(no link)'}{'' if r.ok else ': ' + r.message}" for r in results]
+    lines.append(f"{len(entries)} created, {len(failed)} failed." + ("" if saved else " Warning: could not save to history."))
+    _emit(args, data, lines)
+    return EXIT_FAILED if failed or not saved else EXIT_OK
+
+def cmd_relocate(args):
+    import signal
+    import threading
+    import relocate
+    from link_backends import get_link_backend
+    try: backend = get_link_backend(args.backend)
+    except (OSError, AttributeError) as e: return _error(f"link backend '{args.backend}' unavailable: {e}")
+    cancel = threading.Event()
+    def on_signal(signum, frame): cancel.set() # Stops at the next chunk; the checkpoint keeps what's done
+    signal.signal(signal.SIGINT, on_signal)
+    def on_progress(p):
+        if not args.json and sys.stderr.isatty(): print(f"\r{relocate.describe_progress(p)}\033[K", end="", file=sys.stderr, flush=True)
+    result = relocate.relocate(args.folder, args.destination, backend, workers=args.workers, verify=args.verify, keep_original=args.keep_original,
+                               checkpoint_dir=core.RELOCATE_DIR, on_progress=on_progress, cancel_event=cancel)
+    if not args.json and sys.stderr.isatty(): print(file=sys.stderr)
+    saved = False; link = os.path.abspath(args.folder); source = os.path.abspath(args.destination)
+    if result.ok:
+        core.validity_cache.invalidate(link_path=link)
+        saved = core.append_history({"source": source, "link": link, "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "origin": "relocate"})
+    data = dict(result._asdict(), link=link, source=source, history_saved=saved)
+    rate = result.copied_bytes / result.seconds if result.seconds else 0
+    if result.ok: lines = [result.message, f"{result.files} files, {relocate.format_bytes(result.bytes)} ({relocate.format_bytes(result.copied_bytes)} copied at {relocate.format_bytes(rate)}/s)."] + ([] if saved else ["Warning: could not save to history."])
+    else: lines = [f"Error ({result.code}): {result.message}"]
+    _emit(args, data, lines)
+    return EXIT_OK if result.ok and saved else EXIT_FAILED
+
+def cmd_sizes(args):
+    from size_index import format_size
+    index = core.get_size_index()
+    if index is None: return _error(f"could not open the size index {core.SIZE_INDEX_FILE}")
+    entries = core.load_history()
+    listed = None
+    if not args.cached:
+        def on_progress(p):
+            if not args.json and sys.stderr.isatty(): print(f"\r{p.sources_done}/{p.sources_total} sources, {p.dirs_done} folders\033[K", end="", file=sys.stderr, flush=True)
+        listed = index.refresh([e.get("source", "") for e in entries], workers=args.workers, on_progress=on_progress)
+        if not args.json and sys.stderr.isatty(): print(file=sys.stderr)
+    rows = [(e.get("link", ""), e.get("source", ""), index.get(e.get("source", ""))) for e in entries]
+    rows.sort(key=lambda r: r[2].bytes if r[2] else -1, reverse=True)
+    data = {"dirs_listed": listed, "entries": [{"link": link, "source": source, "bytes": size.bytes if size else None, "files": size.files if size else None,
+                                                "error": size.error if size else None} for link, source, size in rows]}
+    lines = [f"{format_size(size):>10}  {link} -> {source}" + (f"  ({size.error})" if size and size.error else "") for link, source, size in rows]
+    _emit(args, data, lines)
+    return EXIT_OK
+
+def cmd_scan(args):
+    import scan
+    excludes = tuple(args.exclude) if args.exclude is not None else scan.SCAN_DEFAULT_EXCLUDES
+    report = scan.scan_roots(args.roots, max_depth=args.depth, excludes=excludes, workers=args.workers)
+    for path, e in report.errors: print(f"linkforge: could not read {path}: {e}", file=sys.stderr)
+    known = [e.get("link", "") for e in core.load_history()]
+    entries = scan.history_entries(report.found, known)
+    saved = None
+    if args.import_links:
+        for entry in entries: core.validity_cache.invalidate(link_path=entry["link"])
+        saved = core.extend_history(entries)
+    new_links = {os.path.normcase(os.path.normpath(e["link"])) for e in entries}
+    data = {"dirs_scanned": report.dirs_scanned, "found": len(report.found), "new": len(entries), "imported": len(entries) if saved else 0,
+            "history_saved": saved, "errors": len(report.errors),
+            "links": [{"link": l.link, "target": l.target, "kind": l.kind, "new": os.path.normcase(os.path.normpath(l.link)) in new_links} for l in report.found]}
+    lines = [f"{'NEW' if os.path.normcase(os.path.normpath(l.link)) in new_links else '':<3}  {l.kind:<8}  {l.link} -> {l.target or '?'}" for l in report.found]
+    summary = f"{report.dirs_scanned} folders scanned, {len(report.found)} links found, {len(entries)} not in history."
+    if args.import_links: summary += f" Imported {len(entries)}." if saved else " Warning: could not save to history."
+    lines.append(summary)
+    _emit(args, data, lines)
+    return EXIT_FAILED if saved is False else EXIT_OK
+
+def cmd_monitor(args):
+    import signal
+    import threading
+    import health
+    stop = threading.Event()
+    def on_signal(signum, frame): stop.set()
+    signal.signal(signal.SIGINT, on_signal)
+    if hasattr(signal, "SIGTERM"): signal.signal(signal.SIGTERM, on_signal)
+    def report(kind, data, line):
+        if args.json: print(json.dumps(dict(data, event=kind), ensure_ascii=False), flush=True)
+        else: print(line, flush=True)
+    def on_transition(t):
+        report("transition", dict(t._asdict(), regression=health.is_regression(t)),
+               f"{t.timestamp}  {'BROKE' if health.is_regression(t) else 'CHANGED':<7}  {t.link}: {t.old_text} -> {t.new_text}")
+    monitor = core.create_health_monitor(on_transition=on_transition, log_path=None if args.no_log else (args.log or core.HEALTH_LOG_FILE),
+                                         checks_per_second=args.rate)
+    baseline_reported = False
+    while not stop.is_set():
+        started = time.monotonic()
+        try: monitor.run_once(started)
+        except Exception as e: print(f"linkforge: monitor error: {e}", file=sys.stderr)
+        if not baseline_reported and None not in monitor.status(): # Every tracked link has been looked at once
+            baseline_reported = True; broken = monitor.broken()
+            for link, source, code, text in broken: report("broken", {"link": link, "source": source, "code": code, "status": text}, f"BROKEN   {link}: {text}")
+            report("baseline", {"checked": monitor.checks_done, "broken": len(broken)}, f"{monitor.checks_done} links checked, {len(broken)} broken. Watching for changes...")
+            if args.once: return EXIT_FAILED if broken else EXIT_OK
+        stop.wait(max(0.0, monitor.tick - (time.monotonic() - started)))
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="linkforge", description="Create and check directory junctions without the GUI.")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="print machine-readable JSON on stdout")
+    sub = parser.add_subparsers(dest="command", metavar="command")
+    sub.required = True
+
+    p = sub.add_parser("create", parents=[common], help="create one junction and record it in the history")
+    p.add_argument("source", help="existing directory the link will point to")
+    p.add_argument("parent", help="directory in which the link is created")
+    p.add_argument("name", help="name of the new link folder")
+    p.add_argument("--backend", default=core.LINK_BACKEND, choices=("auto", "junction", "symlink", "mklink"))
+    p.set_defaults(func=cmd_create)
+
+    p = sub.add_parser("validate", parents=[common], help="check that history entries still point at their source")
+    p.add_argument("links", nargs="*", metavar="LINK", help="only check these links (default: the whole history)")
+    p.add_argument("--only-invalid", action="store_true", help="list only entries that are not valid")
+    p.add_argument("--workers", type=int, default=CLI_WORKERS)
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser("list", parents=[common], help="list history entries, newest first")
+    p.add_argument("--limit", type=int, default=50)
+    p.add_argument("--offset", type=int, default=0)
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("export", parents=[common], help="write the whole history as JSON, JSON Lines or CSV (streamed)")
+    p.add_argument("--format", choices=("json", "jsonl", "csv"), help="default: from the file name (.json, .jsonl, .csv, optionally .gz), else json")
+    p.add_argument("-o", "--output", help="output file (default: stdout)")
+    p.add_argument("--gzip", action="store_true", help="compress (implied by a .gz file name)")
+    p.add_argument("--validate", action="store_true", help="check every link and add status/status_code to each entry")
+    p.add_argument("--workers", type=int, default=CLI_WORKERS)
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import", parents=[common], help="add the entries of an export to the history, skipping links it already has")
+    p.add_argument("file", help="a .json, .jsonl or .csv file, optionally .gz")
+    p.add_argument("--format", choices=("json", "jsonl", "csv"), help="default: from the file name")
+    p.add_argument("--gzip", action="store_true", help="the file is gzip-compressed (implied by a .gz file name)")
+    p.add_argument("--dry-run", action="store_true", help="only report what would be imported")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("batch", parents=[common], help="create every junction listed in a CSV/JSON manifest")
+    p.add_argument("manifest")
+    p.add_argument("--backend", default=core.LINK_BACKEND, choices=("auto", "junction", "symlink", "mklink"))
+    p.add_argument("--workers", type=int, default=CLI_WORKERS)
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("relocate", parents=[common], help="move a folder elsewhere and leave a junction in its place (resumable)")
+    p.add_argument("folder", help="existing folder to move; the junction is created here")
+    p.add_argument("destination", help="where the folder's contents go (must not exist yet, or be empty)")
+    p.add_argument("--verify", choices=("size", "content"), default="size", help="check sizes and times (default) or compare every byte")
+    p.add_argument("--keep-original", action="store_true", help="keep the original folder, renamed with a .linkforge-old suffix")
+    p.add_argument("--backend", default=core.LINK_BACKEND, choices=("auto", "junction", "symlink", "mklink"))
+    p.add_argument("--workers", type=int, default=CLI_WORKERS)
+    p.set_defaults(func=cmd_relocate)
+
+    p = sub.add_parser("sizes", parents=[common], help="show how much data each tracked source holds, largest first")
+    p.add_argument("--cached", action="store_true", help="show the last computed sizes without walking any folder")
+    p.add_argument("--workers", type=int, default=CLI_WORKERS)
+    p.set_defaults(func=cmd_sizes)
+
+    p = sub.add_parser("scan", parents=[common], help="find junctions under folders and optionally import them into the history")
+    p.add_argument("roots", nargs="+", metavar="ROOT")
+    p.add_argument("--depth", type=int, default=8, help="levels below each root to list (default: 8)")
+    p.add_argument("--exclude", action="append", metavar="GLOB", help="skip folders matching GLOB (repeatable; replaces the defaults)")
+    p.add_argument("--import", dest="import_links", action="store_true", help="add links that aren't in the history yet")
+    p.add_argument("--workers", type=int, default=CLI_WORKERS)
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser("monitor", parents=[common], help="re-check the history on a schedule and report status changes until stopped")
+    p.add_argument("--rate", type=float, default=20, help="validity checks per second, at most (default: 20)")
+    p.add_argument("--log", metavar="FILE", help="append transitions to FILE as JSON lines (default: health.jsonl next to the history)")
+    p.add_argument("--no-log", action="store_true", help="don't write a transition log")
+    p.add_argument("--once", action="store_true", help="check every link once, list the broken ones and exit (1 if any)")
+    p.set_defaults(func=cmd_monitor)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv) # argparse exits with 2 on usage errors
+    try: return args.func(args)
+    finally: core.close_history_store(); core.close_size_index(); core.instrument.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
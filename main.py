@@ -1,17 +1,42 @@
+import sys
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and not sys.argv[1].startswith("-"):
+        # Subcommands run headless: hand off before tkinter (or anything Tk-related) is imported.
+        import linkforge
+        if linkforge.is_cli_invocation(sys.argv[1:]): sys.exit(linkforge.main(sys.argv[1:]))
+    # Likewise a second window launch: hand the request to the instance already open and exit.
+    import instance
+    LAUNCH = instance.parse_launch_args(sys.argv[1:])
+    FORWARDED, INSTANCE_SERVER = (False, None) if LAUNCH.new_instance else instance.forward_or_serve(LAUNCH.request)
+    if FORWARDED: sys.exit(0)
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import tkinter.font as tkFont
 import os
-import subprocess
-import sys
 import ctypes  # For admin check and elevation
 import json
-from datetime import datetime
 import time
+import subprocess
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from core import (APP_NAME, HISTORY_DIR, LINK_BACKEND, is_admin, ensure_dir_exists, resource_path, get_history_store, close_history_store,
+                  load_history, extend_history, validity_cache, start_validity_watcher,
+                  HEALTH_MONITOR, create_health_monitor, INSTRUMENT_MODE, TRACE_FILE, create_operation_queue, get_size_index, close_size_index)
+from validity import check_junction_validity
+from history_index import HistoryIndex
+from size_index import format_size
+from link_backends import get_link_backend
+from operations import OP_PENDING, OP_RUNNING, OP_DONE, OP_FAILED, OP_FINISHED, OP_CREATE, OP_RELOCATE
+import batch
+import scan
+import history_io
+import instrument
+import instance
 
 # --- Constants ---
-APP_NAME = "LinkForge"
-APP_AUTHOR = "JunctionApp" # For AppData path
 WIN_WIDTH = 750
 WIN_HEIGHT = 550
 PAD_GENERAL = 15
@@ -42,118 +67,335 @@ ICON_VALID = "✅"
 ICON_INVALID = "❌"
 ICON_DELETE = "🗑️" # Keep for potential future use? Or remove if definitely not needed.
 ICON_EDIT = "✏️"
-
-# History File
-HISTORY_DIR = os.path.join(os.path.expanduser("~"), "AppData", "Local", APP_AUTHOR, APP_NAME)
-HISTORY_FILE = os.path.join(HISTORY_DIR, "history.json")
+ICON_CHECKING = "⏳"
+ICON_BATCH = "📄"
+ICON_SCAN = "🔍"
+ICON_RELOCATE = "🚚"
+
+# Background Validation
+VALIDATION_WORKERS = 8          # Max concurrent filesystem probes
+VALIDATION_TIMEOUT_SEC = 5.0    # Per-path limit, so one hung UNC share can't stall a refresh
+VALIDATION_POLL_MS = 100        # How often finished results are pulled into the Tk thread
+VALIDATION_BATCH_SIZE = 500     # Max rows updated per poll tick
+STATUS_CHECKING = "Checking…"
+
+# History Window
+HISTORY_PAGE_SIZE = 200 # Rows fetched from the store per page in the history window
+HISTORY_CACHED_PAGES = 64 # Pages kept in HistoryModel's LRU cache
+HISTORY_OVERSCAN = 20   # Rows beyond the viewport that are prefetched and validated ahead of scrolling
+HISTORY_WHEEL_ROWS = 3  # Rows scrolled per mouse wheel notch
+HISTORY_LOAD_POLL_MS = 50 # How often startup checks whether the background history load has finished
+DIAGNOSTICS_REFRESH_MS = 1000 # Diagnostics panel redraw interval
+HEALTH_POLL_MS = 1000 # How often the main window picks up health monitor transitions
+LAUNCH_POLL_MS = 1000 # Only without a thread-enabled Tcl: otherwise the instance server wakes the Tk thread per request
+OPERATIONS_POLL_MS = 100 # How often finished/started creations are pulled into the Tk thread while any are queued
+OPERATIONS_LOG_ROWS = 3 # Visible rows in the main window's operations log
+OPERATIONS_LOG_KEEP = 50 # Finished operations kept in the log before the oldest are dropped
+HISTORY_DEFAULT_SORT = ("created", True) # (column, descending): newest first, served straight from the store's pages
+SIZE_POLL_MS = 200 # How often size results and progress are pulled into the history window while sizes are updating
+TRANSFER_POLL_MS = 200 # How often export/import progress is pulled into the history window
+
+# Tooltips
+TOOLTIP_DELAY_MS = 350  # Hover time before a tooltip appears (clicks show it at once)
 
 # --- Tooltip Texts ---
 TOOLTIP_SOURCE = "The EXISTING directory that the link will point TO."
 TOOLTIP_PARENT = "The directory WHERE the new link folder will be CREATED."
 TOOLTIP_NAME = "The NAME of the new link folder to be created."
 TOOLTIP_COPY = "Copy the 'mklink' command below to the clipboard."
+TOOLTIP_COPY_DISABLED = "Fill fields to enable copy."
 TOOLTIP_HISTORY = "View, manage, and validate previously created junctions."
 TOOLTIP_CREATE_DISABLED = "Run as Administrator to enable creating links."
 TOOLTIP_CREATE_ENABLED = "Click to create the junction link."
+TOOLTIP_CREATE_QUEUED = "This link is already queued or being created; see the operations log."
 TOOLTIP_EDIT = "Load selected entry into main window for editing."
 TOOLTIP_VIEW_FOLDER = "Open the selected link's location or its source target in File Explorer." # New
+TOOLTIP_EXPORT = "Save the history as JSON Lines, CSV or JSON (add .gz to compress), optionally with each link's current status. Click again to stop."
+TOOLTIP_IMPORT = "Add the entries of an exported history file. Links already in the history are skipped. Click again to stop."
+TOOLTIP_SIZES = "Work out how much data each source holds. Only folders that changed since the last update are listed again; click again to stop."
+TOOLTIP_FILTER = "Type words from a link or source path; each word matches the start of a folder name (Ctrl+F, Esc clears)."
+TOOLTIP_SCAN = "Find junctions made outside LinkForge (e.g. with plain mklink) and import them into the history."
+TOOLTIP_BATCH = "Create many junctions from a CSV/JSON manifest of source, parent, name."
+TOOLTIP_RELOCATE = "Move the existing folder at Link Parent\\Link Name to the Source path (new or empty), then leave a junction in its place. An interrupted move resumes where it stopped."
+TOOLTIP_OP_CANCEL = "Cancel the selected operation (while it's waiting in the queue, or while a relocation is copying)."
 # Removed delete tooltips
 
 # --- Helper Functions ---
-# is_admin, relaunch_as_admin, ensure_dir_exists, load_history, save_history, check_junction_validity
-# remain the same as the previous correct version.
-def is_admin():
-    try:
-        return ctypes.windll.shell32.IsUserAnAdmin() != 0
-    except Exception:
-        return False
-
-def relaunch_as_admin():
+# is_admin, ensure_dir_exists and the history/validity helpers live in core.py (shared with the CLI).
+def relaunch_as_admin(parent=None):
     try:
         script_path = os.path.abspath(sys.argv[0])
-        params = f'"{script_path}"'
+        params = subprocess.list2cmdline([script_path] + sys.argv[1:]) # Launch options (prefilled fields, --history) carry over
         ret = ctypes.windll.shell32.ShellExecuteW( None, "runas", sys.executable, params, None, 1)
         return ret > 32
     except Exception as e:
         print(f"Error attempting elevation: {e}")
-        root = tk.Tk(); root.withdraw()
-        messagebox.showerror("Elevation Error", f"Could not relaunch as admin:\n{e}", parent=None)
-        root.destroy()
+        messagebox.showerror("Elevation Error", f"Could not relaunch as admin:\n{e}", parent=parent)
         return False
 
-def ensure_dir_exists(dir_path):
-    if not os.path.exists(dir_path):
-        try: os.makedirs(dir_path)
-        except OSError as e: print(f"Error creating dir {dir_path}: {e}"); return False
-    return True
+def status_display(status_code, status_text):
+    """Maps a check_junction_validity result to the (status column text, row tag) shown in the history tree."""
+    if status_code == 0: return (f"{ICON_VALID} {status_text}", "Valid")
+    if status_code in [1, 2, 3, 5]: return (f"{ICON_INVALID} {status_text}", "Invalid")
+    return (f"{ICON_INVALID} {status_text}", "Error")
+
+def pick_font_family(root, candidates):
+    """First of `candidates` that Tk can load. Asks Font.actual() per candidate rather than scanning
+    tkFont.families(), which enumerates every installed font."""
+    for family in candidates:
+        if tkFont.Font(root=root, family=family, size=FONT_SIZE_MONO).actual("family").lower() == family.lower(): return family
+    return candidates[-1]
+
+def format_command_preview(source, link_parent, link_name):
+    """The `mklink /J` command shown in the preview box, with placeholders for empty fields."""
+    source = source.strip(); link_parent = link_parent.strip(); link_name = link_name.strip()
+    display_source = f'"{source}"' if source else "<Source Path>"
+    if link_parent and link_name: display_full_link = f'"{os.path.normpath(os.path.join(link_parent, link_name))}"'
+    else: display_full_link = f'"{os.path.join(link_parent or "<Parent Dir>", link_name or "<Link Name>")}"'
+    return f'mklink /J {display_full_link} {display_source}'
+
+# --- Background Validation Pool ---
+class ValidationPool:
+    """Runs check_junction_validity on a bounded thread pool.
+
+    Workers only ever touch the filesystem; results are queued and pulled into the Tk thread
+    with drain(), so no widget is accessed off the main thread. start() and cancel() bump a
+    generation counter, which makes results from a superseded refresh drop out silently.
+    """
+    def __init__(self, max_workers=VALIDATION_WORKERS, timeout=VALIDATION_TIMEOUT_SEC, check=None):
+        self.timeout = timeout
+        self.check = check # Defaults to check_junction_validity (looked up at call time)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="LinkForgeValidate")
+        self.results = queue.Queue()
+        self.generation = 0
+        self.pending = {}   # key -> Future, for the current generation only
+        self.submitted = {} # key -> monotonic submit time, alongside pending
+        self.started = {}   # (generation, key) -> monotonic start time, written by the worker when it picks the job up
+        self.last_start = 0.0 # When a worker last picked up any job; stops moving once every worker is stuck
+
+    def start(self, jobs):
+        """Queues (key, link_path, source_path) jobs, cancelling anything still in flight."""
+        self.cancel()
+        self.submit(jobs)
+
+    def submit(self, jobs):
+        """Queues more jobs as part of the current generation (e.g. the next page of history rows)."""
+        generation = self.generation
+        for key, link_path, source_path in jobs:
+            if key in self.pending: continue
+            self.submitted[key] = time.monotonic()
+            self.pending[key] = self.executor.submit(self._run, generation, key, link_path, source_path)
+
+    def _run(self, generation, key, link_path, source_path):
+        if generation != self.generation: return
+        self.started[(generation, key)] = self.last_start = time.monotonic()
+        result = (self.check or check_junction_validity)(link_path, source_path)
+        self.results.put((generation, key, result))
+
+    def retain(self, keys):
+        """Drops queued (not yet running) jobs whose key isn't in `keys`, e.g. rows scrolled far out of view."""
+        for key, future in list(self.pending.items()):
+            if key not in keys and future.cancel(): del self.pending[key]; self.submitted.pop(key, None)
+
+    def cancel(self):
+        self.generation += 1
+        for future in self.pending.values(): future.cancel()
+        self.pending.clear(); self.submitted.clear(); self.started.clear()
+        while True:
+            try: self.results.get_nowait()
+            except queue.Empty: break
+
+    def busy(self):
+        return bool(self.pending)
+
+    def drain(self, limit=VALIDATION_BATCH_SIZE):
+        """Returns up to `limit` finished (key, (status_code, status_text)) pairs, including timeouts."""
+        finished = []
+        while len(finished) < limit:
+            try: generation, key, result = self.results.get_nowait()
+            except queue.Empty: break
+            if generation != self.generation or key not in self.pending: continue
+            del self.pending[key]; self.submitted.pop(key, None); self.started.pop((generation, key), None)
+            finished.append((key, result))
+        # A worker stuck in the OS (e.g. an unreachable network share) can't be interrupted,
+        # so report it as timed out and ignore whatever it returns later.
+        now = time.monotonic(); timed_out = (4, f"Timed Out (>{self.timeout:g}s)")
+        for (generation, key), start_time in list(self.started.items()):
+            if len(finished) >= limit: break
+            if generation != self.generation: self.started.pop((generation, key), None); continue
+            if now - start_time > self.timeout and key in self.pending:
+                del self.pending[key]; del self.started[(generation, key)]; self.submitted.pop(key, None)
+                finished.append((key, timed_out))
+        # Once every worker is stuck nothing starts any more, so jobs still queued would wait forever.
+        # They time out too, but only when no job has started for a whole timeout: a merely busy pool keeps
+        # starting jobs, and its queue just drains late.
+        if now - self.last_start > self.timeout:
+            for key, submit_time in list(self.submitted.items()):
+                if len(finished) >= limit: break
+                if now - submit_time > self.timeout and (self.generation, key) not in self.started:
+                    self.pending.pop(key).cancel(); del self.submitted[key]
+                    finished.append((key, timed_out))
+        return finished
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# --- History Model (backs the virtualized history tree) ---
+class HistoryModel:
+    """Python-side view of the history, newest first.
+
+    Rows are fetched from the history store a page at a time and kept in a small LRU cache, so
+    the history window only ever holds the pages around what's on screen.
+    """
+    def __init__(self, store, page_size=HISTORY_PAGE_SIZE, max_pages=HISTORY_CACHED_PAGES):
+        self.store = store; self.page_size = page_size; self.max_pages = max_pages
+        self.total = 0; self.pages = OrderedDict()
+
+    def refresh(self):
+        self.pages.clear()
+        self.total = self.store.count()
+        return self.total
+
+    def __len__(self):
+        return self.total
+
+    def row(self, index):
+        if not 0 <= index < self.total: return None
+        page_no, offset = divmod(index, self.page_size)
+        page = self.pages.get(page_no)
+        if page is None:
+            page = self.pages[page_no] = self.store.page(page_no * self.page_size, self.page_size)
+            if len(self.pages) > self.max_pages: self.pages.popitem(last=False)
+        else: self.pages.move_to_end(page_no)
+        return page[offset] if offset < len(page) else None
+
+class IndexedHistoryModel:
+    """The history as seen through the filter box and column sort: rows are entry ids of a HistoryIndex view."""
+    def __init__(self, index, ids):
+        self.index = index; self.ids = ids
+
+    def refresh(self):
+        return len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, index):
+        return self.index.entries[self.ids[index]] if 0 <= index < len(self.ids) else None
+
+# --- Tooltips ---
+class TooltipManager:
+    """One tooltip window, reused for every widget.
+
+    create_tooltip() only records the text in a lookup table and adds the TAG bindtag to the
+    widget; the tag's <Enter>/<Leave>/<Button-1>/<Destroy> handlers are bound once. Hovering moves
+    and deiconifies the same hidden Toplevel after TOOLTIP_DELAY_MS instead of building a new one.
+    A text can also be a function of the event, for widgets whose tip depends on what's under the pointer.
+    """
+    TAG = "LinkForgeTooltip"
+
+    def __init__(self, root, delay_ms=TOOLTIP_DELAY_MS):
+        self.root = root; self.delay_ms = delay_ms
+        self.texts = {} # Widget path -> tooltip text
+        self.disabled_texts = {} # Widget path -> text shown instead while the widget is disabled (otherwise none)
+        self.window = None; self.label = None; self.font = None
+        self.visible = False; self._job = None; self._text = None # Text showing or about to
+        root.bind_class(self.TAG, "<Enter>", self._on_enter)
+        root.bind_class(self.TAG, "<Motion>", self._on_motion)
+        root.bind_class(self.TAG, "<Leave>", self.hide)
+        root.bind_class(self.TAG, "<Button-1>", self._on_click)
+        root.bind_class(self.TAG, "<Destroy>", self._forget)
+
+    def register(self, widget, text, disabled_text=None):
+        self.texts[str(widget)] = text
+        if disabled_text: self.disabled_texts[str(widget)] = disabled_text
+        else: self.disabled_texts.pop(str(widget), None)
+        tags = widget.bindtags()
+        if self.TAG not in tags: widget.bindtags(tags + (self.TAG,))
+
+    def _text_for(self, event):
+        try:
+            if str(event.widget.cget('state')) == tk.DISABLED: return self.disabled_texts.get(str(event.widget))
+        except (tk.TclError, AttributeError): pass
+        text = self.texts.get(str(event.widget))
+        return text(event) if callable(text) else text
 
-def load_history():
-    if not os.path.exists(HISTORY_FILE): return []
-    try:
-        with open(HISTORY_FILE, 'r', encoding='utf-8') as f: history = json.load(f)
-        return history if isinstance(history, list) else []
-    except Exception as e: print(f"Error loading history: {e}"); return []
+    def _forget(self, event):
+        self.texts.pop(str(event.widget), None); self.disabled_texts.pop(str(event.widget), None)
 
-def save_history(history_list):
-    if not ensure_dir_exists(HISTORY_DIR): return False
-    try:
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f: json.dump(history_list, f, indent=4)
-        return True
-    except Exception as e: print(f"Error saving history: {e}"); return False
+    def _on_enter(self, event):
+        self._cancel(); text = self._text = self._text_for(event)
+        if text: self._job = self.root.after(self.delay_ms, self.show, text, event.x_root + 20, event.y_root + 10)
 
-def check_junction_validity(link_path, source_path):
-    try:
-        if not os.path.lexists(link_path): return (1, "Link Missing")
-        is_link_type = False
-        try:
-            link_stat = os.lstat(link_path)
-            if hasattr(link_stat, 'st_file_attributes'):
-                FILE_ATTRIBUTE_REPARSE_POINT = 0x0400
-                if link_stat.st_file_attributes & FILE_ATTRIBUTE_REPARSE_POINT: is_link_type = True
-            elif os.path.islink(link_path): is_link_type = True
-        except OSError: pass
-        except AttributeError:
-             if os.path.islink(link_path): is_link_type = True
-        if not is_link_type: return (3, "Exists, Not Link/Junction")
-        if not os.path.isdir(source_path): return (2, "Source Missing/Invalid")
-        return (0, "Valid")
-    except Exception as e:
-        print(f"Error validating junction {link_path}: {e}")
-        return (4, f"Validation Error ({type(e).__name__})")
+    def _on_motion(self, event):
+        if not callable(self.texts.get(str(event.widget))): return # Fixed texts don't change on the way across
+        text = self._text_for(event)
+        if text != self._text: self.hide(); self._on_enter(event)
 
-def resource_path(relative_path):
-    """ Get absolute path to resource, works for dev and for PyInstaller """
-    try:
-        # PyInstaller creates a temp folder and stores path in _MEIPASS
-        base_path = sys._MEIPASS
-    except Exception:
-        # _MEIPASS not defined, running in normal Python environment
-        base_path = os.path.abspath(".") # Or os.path.dirname(__file__)
+    def _on_click(self, event):
+        if self.visible: return # A click on a showing tooltip keeps it (the old "sticky" behaviour)
+        self._cancel(); text = self._text_for(event)
+        if text: self.show(text, event.x_root + 20, event.y_root + 10)
+
+    def _cancel(self):
+        if self._job: self.root.after_cancel(self._job); self._job = None
+
+    def _build(self):
+        self.window = tk.Toplevel(self.root); self.window.withdraw()
+        self.window.wm_overrideredirect(True); self.window.wm_attributes("-topmost", True)
+        self.font = tkFont.Font(family='Segoe UI', size=FONT_SIZE_BASE - 1)
+        self.label = tk.Label(self.window, justify=tk.LEFT, background=COLOR_TOOLTIP_BG, foreground=COLOR_TOOLTIP_FG, relief=tk.SOLID, borderwidth=1, font=self.font, wraplength=WIN_WIDTH * 0.5, padx=PAD_SMALL, pady=PAD_SMALL); self.label.pack(ipadx=1)
+
+    def show(self, text, x, y):
+        self._job = None
+        if self.window is None: self._build() # First hover, not startup, pays for the window
+        if self.label.cget('text') != text: self.label.config(text=text)
+        self.window.wm_geometry(f"+{x}+{y}")
+        if not self.visible: self.window.deiconify(); self.window.lift(); self.visible = True
+
+    def hide(self, event=None):
+        self._cancel(); self._text = None
+        if self.visible: self.window.withdraw(); self.visible = False
+
+    def destroy(self):
+        self._cancel()
+        if self.window is not None: self.window.destroy(); self.window = None; self.visible = False
 
-    return os.path.join(base_path, relative_path)
 
 # --- Main Application Class ---
 class JunctionApp(tk.Tk):
     # __init__, setup_window, setup_styles, _configure_widget_styles, setup_variables,
     # _create_widgets (main part), _create_input_row, _add_info_icon, setup_bindings,
-    # create_tooltip, _show_tooltip, _hide_tooltip, _browse_source, _browse_link_parent,
+    # create_tooltip, _hide_tooltip, _browse_source, _browse_link_parent,
     # _copy_command, _update_status, _update_command_preview, _create_junction,
     # populate_fields_from_history, _open_history_window, on_closing
     # remain the same as the previous correct version, EXCEPT for _check_admin_status
-    def __init__(self, running_as_admin):
+    def __init__(self, running_as_admin, instance_server=None, launch_request=None):
         super().__init__()
         self.running_as_admin = running_as_admin
-        print(f"JunctionApp initialized with running_as_admin = {self.running_as_admin}") # DEBUG
-        self.history_data = load_history()
+        instrument.event("app.init", running_as_admin=self.running_as_admin)
+        self.history_store = None # Opened in the background by _start_history_load, after the first paint
+        self.validity_watcher = start_validity_watcher()
         self.history_window = None
-        self.tooltip_window = None
+        self.batch_window = None
+        self.scan_window = None
+        self.diagnostics_window = None
+        self.tooltips = TooltipManager(self)
+        self._preview_job = None; self._preview_command = None; self._preview_complete = None
+        self._history_load_job = None
+        self.health_monitor = None; self._health_events = queue.Queue(); self._health_job = None
+        self.operations = None; self._operation_events = queue.Queue(); self._operations_job = None; self.operations_tree = None # Log is built with the first operation
+        self.instance_server = instance_server; self._launch_requests = instance_server.requests if instance_server else queue.Queue()
+        self._launch_job = None; self._history_on_load = False # A launch asked for the history before the store was open
+        if launch_request: self._launch_requests.put(launch_request) # Applied like a forwarded one, once the window is up
 
         self.setup_window()
         self.setup_styles()
+        self._configure_widget_styles() # Before any widget exists, so nothing has to be restyled afterwards
         self.setup_variables()
         self._create_widgets()
         self.setup_bindings()
-        self._configure_widget_styles()
 
         initial_status = f"Ready. {ICON_INFO} for help."
         initial_color = COLOR_INFO
@@ -163,6 +405,12 @@ class JunctionApp(tk.Tk):
         self._update_status(initial_status, initial_color)
         self._check_admin_status()
         self._update_command_preview()
+        self._start_history_load()
+        # A thread-enabled Tcl (the python.org builds) lets the instance server thread wake Tk for each request;
+        # the first drain also picks up the launch's own request and anything forwarded before mainloop started.
+        self._launch_polling = not self.tk.getboolean(self.tk.call("info", "exists", "tcl_platform(threaded)"))
+        if self.instance_server and not self._launch_polling: self.instance_server.on_request = self._wake_for_launch_request
+        self._launch_job = self.after_idle(self._poll_launch_requests)
 
     def setup_window(self):
         self.title(f"{APP_NAME}{' (Admin)' if self.running_as_admin else ''}")
@@ -170,7 +418,7 @@ class JunctionApp(tk.Tk):
             # Use the helper function to find the icon
             icon_path = resource_path("icon.ico")
             self.iconbitmap(icon_path) # Use self.iconbitmap() for window icon
-            print(f"DEBUG: Attempting to load icon from: {icon_path}") # Optional debug print
+            instrument.event("app.icon_loaded", path=icon_path)
         except tk.TclError as e:
             print(f"Warning: Could not load window icon 'icon.ico': {e}", file=sys.stderr)
         except FileNotFoundError:
@@ -200,13 +448,12 @@ class JunctionApp(tk.Tk):
 
     def _configure_widget_styles(self):
         base_font_family = 'Segoe UI'
-        mono_font_family = "Consolas" if "Consolas" in tkFont.families(self) else ("Courier New" if "Courier New" in tkFont.families(self) else "Courier")
+        mono_font_family = pick_font_family(self, ("Consolas", "Courier New", "Courier"))
         self.base_font = tkFont.Font(family=base_font_family, size=FONT_SIZE_BASE)
         self.large_font = tkFont.Font(family=base_font_family, size=FONT_SIZE_LARGE, weight='bold')
         self.mono_font = tkFont.Font(family=mono_font_family, size=FONT_SIZE_MONO)
         self.icon_font = tkFont.Font(family=base_font_family, size=FONT_SIZE_BASE + 2)
-        self.tree_heading_font = tkFont.Font(family=base_font_family, size=FONT_SIZE_BASE, weight='bold')
-        self.tooltip_font = tkFont.Font(family=base_font_family, size=FONT_SIZE_BASE - 1)
+        self._tree_styles_ready = False # Tree fonts/styles wait for ensure_tree_styles(); the tooltip font for the first hover
 
         self.style.configure('.', font=self.base_font)
         self.style.configure('TLabel', padding=PAD_SMALL)
@@ -215,8 +462,6 @@ class JunctionApp(tk.Tk):
         self.style.configure('Accent.TButton', font=self.large_font, padding=(PAD_GENERAL, PAD_SMALL * 1.5))
         self.style.configure("InfoIcon.TLabel", foreground=COLOR_INFO, font=self.icon_font)
         self.style.configure('TLabelframe.Label', font=self.base_font, padding=(0, PAD_SMALL // 2))
-        self.style.configure('Treeview', rowheight=int(FONT_SIZE_BASE * 2.2))
-        self.style.configure('Treeview.Heading', font=self.tree_heading_font)
 
         self.style.map("Accent.TButton", foreground=[('active', 'white'), ('!disabled', self.style.lookup('TButton', 'foreground'))], background=[('active', COLOR_INFO), ('!disabled', self.style.lookup('TButton', 'background'))], relief=[('pressed', tk.SUNKEN), ('!pressed', tk.RAISED)])
         try: theme_active_bg = self.style.map('TButton', 'background')[1][1]; hover_color = theme_active_bg if theme_active_bg else "#e0e0e0"
@@ -234,11 +479,18 @@ class JunctionApp(tk.Tk):
         self.style.configure("Warn.Status.TLabel", foreground=COLOR_WARN, background=label_bg)
         self.style.configure("Default.Status.TLabel", foreground=default_fg, background=label_bg)
 
+        if hasattr(self, 'command_preview_text'): self.command_preview_text.config(font=self.mono_font)
+
+    def ensure_tree_styles(self):
+        """Treeview fonts and styles, configured the first time a window with a tree opens."""
+        if self._tree_styles_ready: return
+        self.tree_heading_font = tkFont.Font(family='Segoe UI', size=FONT_SIZE_BASE, weight='bold')
+        self.style.configure('Treeview', rowheight=int(FONT_SIZE_BASE * 2.2))
+        self.style.configure('Treeview.Heading', font=self.tree_heading_font)
         self.style.configure("Valid.Treeview", foreground=COLOR_VALID)
         self.style.configure("Invalid.Treeview", foreground=COLOR_INVALID)
         self.style.configure("Error.Treeview", foreground=COLOR_WARN)
-
-        if hasattr(self, 'command_preview_text'): self.command_preview_text.config(font=self.mono_font)
+        self._tree_styles_ready = True
 
     def setup_variables(self):
         self.source_dir_var = tk.StringVar()
@@ -261,11 +513,15 @@ class JunctionApp(tk.Tk):
         try: lf_bg = self.style.lookup('TLabelframe', 'background'); self.command_preview_text.config(background=lf_bg)
         except tk.TclError: pass
         self.command_preview_text.grid(row=0, column=0, sticky=tk.EW, padx=(PAD_SMALL, 0), pady=PAD_SMALL)
-        self.copy_btn = ttk.Button(preview_frame, text=ICON_COPY, command=self._copy_command, style='Toolbutton.TButton', width=3); self.copy_btn.grid(row=0, column=1, sticky=tk.NE, padx=PAD_SMALL, pady=PAD_SMALL); self.create_tooltip(self.copy_btn, TOOLTIP_COPY); row_index += 1
+        self.copy_btn = ttk.Button(preview_frame, text=ICON_COPY, command=self._copy_command, style='Toolbutton.TButton', width=3); self.copy_btn.grid(row=0, column=1, sticky=tk.NE, padx=PAD_SMALL, pady=PAD_SMALL); self.create_tooltip(self.copy_btn, TOOLTIP_COPY, TOOLTIP_COPY_DISABLED); row_index += 1
         action_frame = ttk.Frame(main_frame); action_frame.grid(row=row_index, column=0, columnspan=4, pady=(PAD_GENERAL, PAD_GENERAL * 1.5)); action_frame.columnconfigure(0, weight=1); action_frame.columnconfigure(2, weight=1)
+        tools_frame = ttk.Frame(action_frame); tools_frame.grid(row=0, column=0, sticky=tk.W, padx=(0, PAD_GENERAL))
+        self.batch_button = ttk.Button(tools_frame, text=f"Batch {ICON_BATCH}", command=self._open_batch_window); self.batch_button.pack(side=tk.LEFT); self.create_tooltip(self.batch_button, TOOLTIP_BATCH)
+        self.scan_button = ttk.Button(tools_frame, text=f"Scan {ICON_SCAN}", command=self._open_scan_window); self.scan_button.pack(side=tk.LEFT, padx=(PAD_SMALL, 0)); self.create_tooltip(self.scan_button, TOOLTIP_SCAN)
+        self.relocate_button = ttk.Button(tools_frame, text=f"Relocate {ICON_RELOCATE}", command=self._relocate_folder); self.relocate_button.pack(side=tk.LEFT, padx=(PAD_SMALL, 0)); self.create_tooltip(self.relocate_button, TOOLTIP_RELOCATE)
         self.create_button = ttk.Button(action_frame, text="Create Junction Link", command=self._create_junction, style="Accent.TButton"); self.create_button.grid(row=0, column=1, padx=PAD_SMALL)
-        history_button_text = f"View History {ICON_HISTORY} ({len(self.history_data)})"
-        self.history_button = ttk.Button(action_frame, text=history_button_text, command=self._open_history_window); self.history_button.grid(row=0, column=2, sticky=tk.E, padx=(PAD_GENERAL, 0)); self.create_tooltip(self.history_button, TOOLTIP_HISTORY); row_index += 1
+        self.history_button = ttk.Button(action_frame, text=f"View History {ICON_HISTORY} (…)", command=self._open_history_window); self.history_button.grid(row=0, column=2, sticky=tk.E, padx=(PAD_GENERAL, 0)); self.create_tooltip(self.history_button, TOOLTIP_HISTORY); row_index += 1
+        self._main_frame = main_frame; self._operations_row = row_index # _create_operations_log() fills this row on first use
         self.status_bar = ttk.Label(self, textvariable=self.status_var, relief=tk.SUNKEN, style="Default.Status.TLabel"); self.status_bar.pack(side=tk.BOTTOM, fill=tk.X, pady=(PAD_SMALL, 0))
 
     def _create_input_row(self, parent, row, label_text, var, browse_cmd, tooltip_text):
@@ -278,27 +534,19 @@ class JunctionApp(tk.Tk):
 
     def _add_info_icon(self, parent, row, column, text):
         info_label = ttk.Label(parent, text=ICON_INFO, style="InfoIcon.TLabel", cursor="question_arrow"); info_label.grid(row=row, column=column, sticky=tk.W, padx=(0, PAD_SMALL))
-        info_label.bind("<Enter>", lambda event, t=text: self._show_tooltip(event, t)); info_label.bind("<Leave>", self._hide_tooltip); info_label.bind("<Button-1>", lambda event, t=text: self._show_tooltip(event, t, sticky=True))
+        self.create_tooltip(info_label, text)
 
     def setup_bindings(self):
-        self.source_dir_var.trace_add("write", self._update_command_preview); self.link_parent_dir_var.trace_add("write", self._update_command_preview); self.link_name_var.trace_add("write", self._update_command_preview)
+        self.source_dir_var.trace_add("write", self._schedule_command_preview); self.link_parent_dir_var.trace_add("write", self._schedule_command_preview); self.link_name_var.trace_add("write", self._schedule_command_preview)
         self.bind_all("<Escape>", self._hide_tooltip)
+        self.bind("<<LaunchRequest>>", lambda e: self._poll_launch_requests())
+        self.bind("<Control-Shift-D>", self._open_diagnostics_window); self.bind("<Control-Shift-d>", self._open_diagnostics_window) # Hidden diagnostics panel
 
-    def create_tooltip(self, widget, text):
-         widget.bind("<Enter>", lambda event, t=text: self._show_tooltip(event, t)); widget.bind("<Leave>", self._hide_tooltip); widget.bind("<Button-1>", lambda event, t=text: self._show_tooltip(event, t, sticky=True))
-
-    def _show_tooltip(self, event, text, sticky=False):
-        try:
-            if hasattr(event.widget, 'cget') and event.widget.cget('state') == tk.DISABLED: return
-        except tk.TclError: pass
-        if self.tooltip_window and sticky: return
-        self._hide_tooltip(); x = event.x_root + 20; y = event.y_root + 10
-        self.tooltip_window = tk.Toplevel(self); self.tooltip_window.wm_overrideredirect(True); self.tooltip_window.wm_geometry(f"+{x}+{y}"); self.tooltip_window.wm_attributes("-topmost", True)
-        tooltip_font = self.tooltip_font if hasattr(self, 'tooltip_font') else ('Segoe UI', FONT_SIZE_BASE - 1)
-        label = tk.Label(self.tooltip_window, text=text, justify=tk.LEFT, background=COLOR_TOOLTIP_BG, foreground=COLOR_TOOLTIP_FG, relief=tk.SOLID, borderwidth=1, font=tooltip_font, wraplength=WIN_WIDTH * 0.5, padx=PAD_SMALL, pady=PAD_SMALL); label.pack(ipadx=1)
+    def create_tooltip(self, widget, text, disabled_text=None):
+        self.tooltips.register(widget, text, disabled_text) # Just updates the lookup table when called again for the same widget
 
     def _hide_tooltip(self, event=None):
-        if self.tooltip_window: self.tooltip_window.destroy(); self.tooltip_window = None
+        self.tooltips.hide()
 
     def _browse_source(self):
         dir_path = filedialog.askdirectory(title="Select Source Directory", parent=self)
@@ -325,103 +573,331 @@ class JunctionApp(tk.Tk):
 
     # --- Modified _check_admin_status ---
     def _check_admin_status(self):
-         print(f"Running _check_admin_status. self.running_as_admin = {self.running_as_admin}") # DEBUG
+         instrument.event("app.check_admin_status", running_as_admin=self.running_as_admin)
          is_currently_admin = self.running_as_admin
 
          # Update Main Create Button
          if not is_currently_admin:
-             self.create_button.config(state=tk.DISABLED)
+             self.create_button.config(state=tk.DISABLED); self.relocate_button.config(state=tk.DISABLED)
              self.create_tooltip(self.create_button, TOOLTIP_CREATE_DISABLED)
          else:
-             self.create_button.config(state=tk.NORMAL)
+             self.create_button.config(state=tk.NORMAL); self.relocate_button.config(state=tk.NORMAL)
              self.create_tooltip(self.create_button, TOOLTIP_CREATE_ENABLED)
 
          # No longer need to manage history delete button state here
          # Its functionality is now tied to the View Folder button which doesn't need admin
 
+    def _schedule_command_preview(self, *args):
+        # Trace writes arrive in bursts (typing, pasting, populate_fields_from_history); render once they settle.
+        if self._preview_job is None: self._preview_job = self.after_idle(self._update_command_preview)
+
     def _update_command_preview(self, *args):
-        source = self.source_dir_var.get().strip(); link_parent = self.link_parent_dir_var.get().strip(); link_name = self.link_name_var.get().strip()
-        display_source = f'"{source}"' if source else "<Source Path>"
-        display_link_name = link_name if link_name else "<Link Name>"
-        display_link_parent = link_parent if link_parent else "<Parent Dir>"
-        if link_parent and link_name: full_link_path = os.path.normpath(os.path.join(link_parent, link_name)); display_full_link = f'"{full_link_path}"'
-        else: mock_path = os.path.join(display_link_parent, display_link_name); display_full_link = f'"{mock_path}"'
-        command = f'mklink /J {display_full_link} {display_source}'
+        self._preview_job = None
+        command = format_command_preview(self.source_dir_var.get(), self.link_parent_dir_var.get(), self.link_name_var.get())
+        if command == self._preview_command: return
+        self._preview_command = command
         self.command_preview_text.config(state=tk.NORMAL); self.command_preview_text.delete("1.0", tk.END); self.command_preview_text.insert("1.0", command); self.command_preview_text.config(state=tk.DISABLED)
-        if "<" in command or ">" in command: self.copy_btn.config(state=tk.DISABLED); self.copy_btn.bind("<Enter>", lambda e: self._show_tooltip(e, "Fill fields to enable copy."))
-        else: self.copy_btn.config(state=tk.NORMAL); self.create_tooltip(self.copy_btn, TOOLTIP_COPY)
+        complete = "<" not in command and ">" not in command
+        if complete != self._preview_complete: # The copy tooltip is bound once in _create_widgets; only the state changes here
+            self._preview_complete = complete; self.copy_btn.config(state=tk.NORMAL if complete else tk.DISABLED)
+        if self.operations: self._update_create_button()
 
-    def _create_junction(self):
+    def _field_link_path(self):
+        link_parent_dir = self.link_parent_dir_var.get().strip(); link_name = self.link_name_var.get().strip()
+        return os.path.normpath(os.path.join(link_parent_dir, link_name)) if link_parent_dir and link_name else ""
+
+    def _read_fields(self):
+        """The field values after the cheap checks; the filesystem ones run on the operation worker. None if they fail."""
         source_dir = self.source_dir_var.get().strip(); link_parent_dir = self.link_parent_dir_var.get().strip(); link_name = self.link_name_var.get().strip()
-        if not all([source_dir, link_parent_dir, link_name]): self._update_status("Error: All fields required.", COLOR_ERROR); return
-        if not os.path.isdir(source_dir): self._update_status(f"Error: Source not found: {source_dir}", COLOR_ERROR); return
-        if not os.path.isdir(link_parent_dir): self._update_status(f"Error: Link parent not found: {link_parent_dir}", COLOR_ERROR); return
-        invalid_chars = '<>:"/\\|?*';
-        if any(c in invalid_chars for c in link_name) or link_name in (".", ".."): self._update_status(f"Error: Link name invalid.", COLOR_ERROR); return
-        full_link_path = os.path.normpath(os.path.join(link_parent_dir, link_name))
-        if os.path.lexists(full_link_path): self._update_status(f"Error: Path exists: {full_link_path}", COLOR_ERROR); messagebox.showerror("Creation Error", f"Path exists:\n{full_link_path}", parent=self); return
-        if not self.running_as_admin: self._update_status("Error: Admin required.", COLOR_ERROR); messagebox.showerror("Permission Error", "Admin required.", parent=self); return
-        cmd_string = f'mklink /J "{full_link_path}" "{source_dir}"'
-        self._update_status(f"Executing...", COLOR_INFO); self.update_idletasks()
-        try:
-            result = subprocess.run(cmd_string, capture_output=True, text=True, check=False, shell=True, creationflags=subprocess.CREATE_NO_WINDOW)
-            if result.returncode == 0 and os.path.lexists(full_link_path):
-                success_msg = f"Success: '{link_name}' -> '{source_dir}'"
-                self._update_status(success_msg, COLOR_SUCCESS)
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                self.history_data.append({"source": source_dir, "link": full_link_path, "timestamp": timestamp})
-                save_history(self.history_data)
-                self.history_button.config(text=f"View History {ICON_HISTORY} ({len(self.history_data)})")
-                if self.history_window and self.history_window.winfo_exists(): self.history_window.refresh_list()
-                messagebox.showinfo("Success", success_msg, parent=self)
-            else:
-                error_details = result.stderr.strip() if result.stderr else result.stdout.strip()
-                if not error_details: error_details = f"mklink failed (code {result.returncode}). Check paths/permissions or run as admin."
-                elif "syntax error" in error_details.lower() or "syntax of the command is incorrect" in error_details.lower(): error_details = f"Syntax error (code {result.returncode}). Check paths.\n{error_details}"
-                elif "already exists" in error_details.lower(): error_details = f"Path already exists (code {result.returncode}).\n{full_link_path}"
-                elif "access is denied" in error_details.lower(): error_details = f"Access Denied (code {result.returncode}). Run as Admin?\n{error_details}"
-                self._update_status(f"Error: {error_details}", COLOR_ERROR)
-                messagebox.showerror("Command Error", f"Failed.\n\nCmd:\n{cmd_string}\n\nError:\n{error_details}", parent=self)
-        except Exception as e: self._update_status(f"Error executing command: {e}", COLOR_ERROR); messagebox.showerror("Unexpected Error", f"Error during command execution:\n{e}", parent=self)
-
-    def populate_fields_from_history(self, source, link):
+        if not all([source_dir, link_parent_dir, link_name]): self._update_status("Error: All fields required.", COLOR_ERROR); return None
+        if any(c in batch.INVALID_NAME_CHARS for c in link_name) or link_name in (".", ".."): self._update_status(f"Error: Link name invalid.", COLOR_ERROR); return None
+        if not self.running_as_admin: self._update_status("Error: Admin required.", COLOR_ERROR); messagebox.showerror("Permission Error", "Admin required.", parent=self); return None
+        return source_dir, link_parent_dir, link_name
+
+    def _submit_operation(self, source_dir, link_parent_dir, link_name, kind):
+        if self.operations is None: self.operations = create_operation_queue(on_event=self._operation_events.put) # put() is thread-safe; Tk is only touched in _poll_operations
+        op = self.operations.submit(source_dir, link_parent_dir, link_name, kind=kind)
+        if op is None: self._update_status(f"Already queued: {self._field_link_path()}", COLOR_WARN); return
+        self._update_create_button()
+        if self._operations_job is None: self._operations_job = self.after(OPERATIONS_POLL_MS, self._poll_operations)
+
+    def _create_junction(self):
+        fields = self._read_fields()
+        if fields: self._submit_operation(*fields, OP_CREATE)
+
+    def _relocate_folder(self):
+        fields = self._read_fields()
+        if not fields: return
+        source_dir, link_parent_dir, link_name = fields; folder = os.path.normpath(os.path.join(link_parent_dir, link_name))
+        if not messagebox.askyesno("Relocate and Link", f"Move the folder\n{folder}\n\nto\n{source_dir}\n\nand leave a junction in its place?", icon='warning', parent=self): return
+        self._submit_operation(source_dir, link_parent_dir, link_name, OP_RELOCATE)
+
+    # --- Operations Log ---
+    def _create_operations_log(self):
+        self.ensure_tree_styles()
+        log_frame = ttk.LabelFrame(self._main_frame, text="Operations", padding=PAD_SMALL); log_frame.grid(row=self._operations_row, column=0, columnspan=4, sticky=tk.NSEW); log_frame.columnconfigure(0, weight=1); log_frame.rowconfigure(0, weight=1)
+        self._main_frame.rowconfigure(self._operations_row, weight=1)
+        self.operations_tree = ttk.Treeview(log_frame, columns=("state", "link", "message", "kind"), displaycolumns=("state", "link", "message"), show="headings", selectmode="browse", height=OPERATIONS_LOG_ROWS)
+        self.operations_tree.heading("state", text="State"); self.operations_tree.heading("link", text="Junction Link Path"); self.operations_tree.heading("message", text="Result")
+        self.operations_tree.column("state", width=90, stretch=tk.NO); self.operations_tree.column("link", width=300, stretch=tk.YES); self.operations_tree.column("message", width=260, stretch=tk.YES)
+        vsb = ttk.Scrollbar(log_frame, orient="vertical", command=self.operations_tree.yview); self.operations_tree.configure(yscrollcommand=vsb.set)
+        self.operations_tree.grid(row=0, column=0, sticky='nsew'); vsb.grid(row=0, column=1, sticky='ns')
+        self.operations_tree.tag_configure("Valid", foreground=COLOR_VALID); self.operations_tree.tag_configure("Invalid", foreground=COLOR_INVALID); self.operations_tree.tag_configure("Checking", foreground=COLOR_DISABLED_FG)
+        self.operations_tree.bind("<<TreeviewSelect>>", self._on_operation_select)
+        button_frame = ttk.Frame(log_frame); button_frame.grid(row=1, column=0, columnspan=2, sticky=tk.EW, pady=(PAD_SMALL, 0))
+        ttk.Button(button_frame, text="Clear Finished", command=self._clear_finished_operations).pack(side=tk.RIGHT)
+        self.cancel_op_button = ttk.Button(button_frame, text="Cancel", command=self._cancel_operation, state=tk.DISABLED); self.cancel_op_button.pack(side=tk.RIGHT, padx=(0, PAD_SMALL)); self.create_tooltip(self.cancel_op_button, TOOLTIP_OP_CANCEL)
+        self.update_idletasks() # Grow the window if the log doesn't fit below the buttons
+        if self.winfo_height() < self.winfo_reqheight(): self.geometry(f"{self.winfo_width()}x{self.winfo_reqheight()}")
+
+    def _show_operation(self, event):
+        if self.operations_tree is None: self._create_operations_log()
+        iid = f"op{event.id}"; tag = {OP_DONE: "Valid", OP_FAILED: "Invalid"}.get(event.state, "Checking")
+        values = (event.state.capitalize(), event.link or "-", event.message, event.kind)
+        if self.operations_tree.exists(iid): self.operations_tree.item(iid, values=values, tags=(tag,))
+        else: self.operations_tree.insert("", tk.END, iid=iid, values=values, tags=(tag,)); self.operations_tree.see(iid)
+        finished = [i for i in self.operations_tree.get_children() if self.operations_tree.set(i, "state").lower() in OP_FINISHED]
+        for old in finished[:max(0, len(finished) - OPERATIONS_LOG_KEEP)]: self.operations_tree.delete(old)
+
+    def _poll_operations(self):
+        self._operations_job = None; last = None
+        while True:
+            try: event = self._operation_events.get_nowait()
+            except queue.Empty: break
+            self._show_operation(event)
+            if event.state == OP_DONE:
+                if event.entry is None: self._update_status(f"Created {event.message}", COLOR_WARN)
+                else:
+                    self._update_status(f"Success: {event.message}", COLOR_SUCCESS); self._update_history_button()
+                    if self.health_monitor: self.health_monitor.request_reload()
+                    if self.history_window and self.history_window.winfo_exists(): self.history_window.entry_added(event.entry)
+            elif event.state == OP_FAILED: self._update_status(f"Error: {event.message}", COLOR_ERROR); self.bell()
+            elif event.state == OP_RUNNING: self._update_status(f"Relocating {event.link}: {event.message}" if event.kind == OP_RELOCATE else f"Creating link: {event.link}", COLOR_INFO)
+            last = event
+        if last is not None: self._update_create_button(); self._on_operation_select()
+        if self.operations.busy() or not self._operation_events.empty(): self._operations_job = self.after(OPERATIONS_POLL_MS, self._poll_operations)
+
+    def _update_create_button(self):
+        if not self.running_as_admin: return # _check_admin_status keeps it disabled
+        link = self._field_link_path(); queued = bool(link) and self.operations.in_flight(link)
+        self.create_button.config(state=tk.DISABLED if queued else tk.NORMAL); self.relocate_button.config(state=tk.DISABLED if queued else tk.NORMAL)
+        self.create_tooltip(self.create_button, TOOLTIP_CREATE_QUEUED if queued else TOOLTIP_CREATE_ENABLED)
+
+    def _selected_operation(self):
+        selection = self.operations_tree.selection() if self.operations_tree else ()
+        return selection[0] if selection else None
+
+    def _on_operation_select(self, event=None):
+        iid = self._selected_operation()
+        state = self.operations_tree.set(iid, "state").lower() if iid is not None else None
+        cancellable = state == OP_PENDING or (state == OP_RUNNING and self.operations_tree.set(iid, "kind") == OP_RELOCATE)
+        self.cancel_op_button.config(state=tk.NORMAL if cancellable else tk.DISABLED)
+
+    def _cancel_operation(self):
+        iid = self._selected_operation()
+        if iid is None: return
+        if not self.operations.cancel(int(iid[2:])): self._update_status("Already started; a running link can't be cancelled.", COLOR_WARN)
+        elif self.operations_tree.set(iid, "state").lower() == OP_RUNNING: self._update_status("Stopping the relocation; running it again resumes from here.", COLOR_WARN)
+
+    def _clear_finished_operations(self):
+        for iid in self.operations_tree.get_children():
+            if self.operations_tree.set(iid, "state").lower() in OP_FINISHED: self.operations_tree.delete(iid)
+        self._on_operation_select()
+
+    def populate_fields_from_history(self, source, link, origin="history"):
         try:
             parent_dir = os.path.dirname(link); link_name = os.path.basename(link)
             self.source_dir_var.set(source); self.link_parent_dir_var.set(parent_dir); self.link_name_var.set(link_name)
-            self._update_status(f"Populated fields from history: {link_name}", COLOR_INFO)
+            self._update_status(f"Populated fields from {origin}: {link_name}", COLOR_INFO)
             self.lift(); self.focus_force(); self.link_name_entry.focus()
         except Exception as e: self._update_status(f"Error populating fields: {e}", COLOR_ERROR); messagebox.showerror("Error", f"Could not populate fields:\n{e}", parent=self)
 
     def _open_history_window(self):
         if self.history_window and self.history_window.winfo_exists(): self.history_window.lift(); self.history_window.focus()
-        else: self.history_window = HistoryWindow(self, self.history_data)
+        else:
+            if self.history_store is None: self.history_store = get_history_store() # Waits for the startup load if it's still running
+            self.history_window = HistoryWindow(self, self.history_store)
+
+    # --- Single Instance ---
+    def _poll_launch_requests(self):
+        # Requests from later launches arrive on instance.py's server thread; only this touches Tk.
+        while True:
+            try: request = self._launch_requests.get_nowait()
+            except queue.Empty: break
+            self._apply_launch_request(request)
+        self._launch_job = self.after(LAUNCH_POLL_MS, self._poll_launch_requests) if self._launch_polling else None
+
+    def _wake_for_launch_request(self):
+        # Runs on the instance server thread; Tcl hands the event over to the Tk thread.
+        try: self.event_generate("<<LaunchRequest>>", when="tail")
+        except (RuntimeError, tk.TclError): pass # Before mainloop (the startup drain gets it) or while closing
+
+    def _apply_launch_request(self, request):
+        instrument.event("app.launch_request", history=request.get("history"), fields=bool(request.get("source") or request.get("link")))
+        if request.get("source") or request.get("link"):
+            link = request.get("link") or os.path.join(self.link_parent_dir_var.get(), self.link_name_var.get())
+            self.populate_fields_from_history(request.get("source") or self.source_dir_var.get(), link, origin="launch")
+        else: self._bring_to_front()
+        if request.get("history"):
+            if self.history_store is None: self._history_on_load = True; self._update_status("Opening history once it has loaded…", COLOR_INFO)
+            else: self._open_history_window()
+
+    def _reclaim_instance(self):
+        on_request = None if self._launch_polling else self._wake_for_launch_request
+        try: self.instance_server = instance.InstanceServer(requests=self._launch_requests, on_request=on_request).start()
+        except OSError as e: print(f"Single-instance channel not reclaimed: {e}", file=sys.stderr)
+
+    def _bring_to_front(self):
+        if self.state() == "iconic": self.deiconify()
+        self.lift(); self.focus_force()
+
+    def _open_batch_window(self):
+        if self.batch_window and self.batch_window.winfo_exists(): self.batch_window.lift(); self.batch_window.focus()
+        else: self.batch_window = BatchWindow(self)
+
+    def _open_diagnostics_window(self, event=None):
+        if self.diagnostics_window and self.diagnostics_window.winfo_exists(): self.diagnostics_window.lift(); self.diagnostics_window.focus()
+        else: self.diagnostics_window = DiagnosticsWindow(self)
+
+    def _open_scan_window(self):
+        if self.scan_window and self.scan_window.winfo_exists(): self.scan_window.lift(); self.scan_window.focus()
+        else: self.scan_window = ScanWindow(self)
+
+    def on_history_changed(self):
+        self._update_history_button()
+        if self.health_monitor: self.health_monitor.request_reload()
+        if self.history_window and self.history_window.winfo_exists(): self.history_window.refresh_list()
+
+    def _history_count(self):
+        if self.history_store is None: return None # Still loading
+        try: return self.history_store.count()
+        except Exception as e: print(f"Error counting history: {e}"); return 0
+
+    def _update_history_button(self, count=None):
+        if count is None: count = self._history_count()
+        self.history_button.config(text=f"View History {ICON_HISTORY} ({'…' if count is None else count})")
+
+    def _start_history_load(self):
+        # Opening the store parses the whole history, so it runs off the Tk thread; the button only needs the count.
+        self._history_load = queue.Queue()
+        def load():
+            dir_ok = ensure_dir_exists(HISTORY_DIR); store = get_history_store()
+            try: count = store.count()
+            except Exception as e: print(f"Error counting history: {e}"); count = 0
+            self._history_load.put((dir_ok, store, count))
+        threading.Thread(target=load, name="LinkForgeHistoryLoad", daemon=True).start()
+        self._history_load_job = self.after(HISTORY_LOAD_POLL_MS, self._poll_history_load)
+
+    def _poll_history_load(self):
+        try: dir_ok, store, count = self._history_load.get_nowait()
+        except queue.Empty: self._history_load_job = self.after(HISTORY_LOAD_POLL_MS, self._poll_history_load); return
+        self._history_load_job = None
+        self.history_store = store; self._update_history_button(count)
+        if self._history_on_load: self._history_on_load = False; self._open_history_window()
+        if HEALTH_MONITOR: self._start_health_monitor()
+        if not dir_ok: messagebox.showwarning("Startup Warning", f"Could not access history folder:\n{HISTORY_DIR}\nHistory may not work.", parent=self)
+
+    # --- Health Monitor ---
+    def _start_health_monitor(self):
+        if self.health_monitor: return
+        self.health_monitor = create_health_monitor(on_transition=self._health_events.put).start() # put() is thread-safe; Tk is only touched in _poll_health
+        self._health_job = self.after(HEALTH_POLL_MS, self._poll_health)
+
+    def _poll_health(self):
+        self._health_job = None; regressions = []; recoveries = []
+        while True:
+            try: transition = self._health_events.get_nowait()
+            except queue.Empty: break
+            if transition.old_code == 0: regressions.append(transition)
+            elif transition.new_code == 0: recoveries.append(transition)
+        if regressions: # Regressions win the status bar over recoveries
+            first = regressions[0]; more = f" (+{len(regressions) - 1} more)" if len(regressions) > 1 else ""
+            self._update_status(f"{ICON_INVALID} Junction broke: {first.link} - {first.new_text}{more}", COLOR_ERROR); self.bell()
+        elif recoveries:
+            first = recoveries[0]; more = f" (+{len(recoveries) - 1} more)" if len(recoveries) > 1 else ""
+            self._update_status(f"{ICON_VALID} Junction valid again: {first.link}{more}", COLOR_SUCCESS)
+        if (regressions or recoveries) and self.history_window and self.history_window.winfo_exists(): self.history_window.refresh_list()
+        self._health_job = self.after(HEALTH_POLL_MS, self._poll_health)
+
+    def run_startup_checks(self):
+        """Platform and admin prompts, shown over the already painted main window (no extra Tk roots)."""
+        if os.name != 'nt':
+            messagebox.showerror("Compatibility Error", "Requires Windows.", parent=self); self.on_closing(); return
+        if self.running_as_admin: return
+        message = ("Admin privileges needed to create links.\n\n" # Removed delete mention
+                   "Without them, you can only view/copy the command.\n\n"
+                   "Relaunch as Administrator?")
+        if messagebox.askyesno("Admin Required", message, icon='warning', parent=self):
+            print("Attempting relaunch as admin...")
+            released = self.instance_server is not None
+            if released: self.instance_server.close(); self.instance_server = None # Let the elevated process become the instance
+            if relaunch_as_admin(parent=self): print("Relaunch success. Exiting old process."); self.on_closing(); return
+            else:
+                print("Relaunch failed/cancelled.")
+                if released: self._reclaim_instance()
+                messagebox.showinfo("Relaunch Failed", "Could not relaunch as admin.\nContinuing with limited features.", parent=self)
+        else: print("Continuing without admin."); messagebox.showinfo("Limited Features", "Running without admin rights.", parent=self)
 
     def on_closing(self):
-        if self.history_window and self.history_window.winfo_exists(): self.history_window.destroy()
+        if self.history_window and self.history_window.winfo_exists(): self.history_window.on_close()
+        if self.batch_window and self.batch_window.winfo_exists(): self.batch_window.on_close()
+        if self.scan_window and self.scan_window.winfo_exists(): self.scan_window.on_close()
+        if self.diagnostics_window and self.diagnostics_window.winfo_exists(): self.diagnostics_window.on_close()
+        if self._preview_job: self.after_cancel(self._preview_job); self._preview_job = None
+        self.tooltips.destroy()
+        if self._history_load_job: self.after_cancel(self._history_load_job); self._history_load_job = None
+        if self._operations_job: self.after_cancel(self._operations_job); self._operations_job = None
+        if self._launch_job: self.after_cancel(self._launch_job); self._launch_job = None
+        if self.instance_server: self.instance_server.close(); self.instance_server = None
+        if self.operations: self.operations.shutdown() # Records links that were already made; queued ones are dropped
+        close_history_store(); close_size_index()
+        if self.validity_watcher: self.validity_watcher.stop()
+        if self._health_job: self.after_cancel(self._health_job); self._health_job = None
+        if self.health_monitor: self.health_monitor.stop()
+        instrument.close()
         self.destroy()
 
 
 # --- History Window Class ---
 class HistoryWindow(tk.Toplevel):
-    def __init__(self, parent, history_data):
+    def __init__(self, parent, history_store):
         super().__init__(parent)
-        self.parent_app = parent; self.history_data = history_data
-        self.title(f"{APP_NAME} - History"); self.geometry("800x500"); self.minsize(600, 300) # Adjusted width
+        parent.ensure_tree_styles()
+        self.parent_app = parent; self.history_store = history_store
+        self.paged_model = HistoryModel(history_store)
+        self.model = self.paged_model # Swapped for an IndexedHistoryModel while a filter or non-default sort is active
+        self.index = None; self._index_loading = False; self._index_generation = 0; self._index_queue = queue.Queue(); self._index_job = None
+        self.sort_column, self.sort_descending = HISTORY_DEFAULT_SORT
+        self.filter_var = tk.StringVar(self); self._filter_job = None
+        self.top_index = 0; self.visible_rows = 0 # Virtualized view: model rows [top_index, top_index + visible_rows) are on screen
+        self.selected = set() # Selected model indices (survives scrolling, unlike Treeview selection)
+        self.cursor = None    # Model index of the keyboard cursor
+        self.statuses = {}    # (link, source) -> (status_epoch, (status_code, status_text))
+        self.status_epoch = 0 # Bumped by refresh_list; older statuses stay on screen until re-checked
+        self.pool = []        # Recycled tree item iids, in display order
+        self._rendered = {}   # iid -> (values, tag) last written to that item, so unchanged rows are skipped
+        self._next_iid = 0; self.placeholder = None
+        self.sizes = None; self._sizes_opened = False; self._size_queue = queue.Queue(); self._size_job = None; self._size_cancel = None # Size index opens in the background
+        self._transfer_queue = queue.Queue(); self._transfer_job = None; self._transfer_cancel = None; self._transfer_button = None; self._transfer_text = None # Export/import
+        self.title(f"{APP_NAME} - History"); self.geometry("880x500"); self.minsize(600, 300) # Adjusted width
         try:
             # Use the helper function to find the icon
             icon_path = resource_path("icon.ico")
             self.iconbitmap(icon_path) # Use self.iconbitmap() for window icon
-            print(f"DEBUG: Attempting to load icon from: {icon_path}") # Optional debug print
+            instrument.event("history.icon_loaded", path=icon_path)
         except tk.TclError as e:
             print(f"Warning: Could not load window icon 'icon.ico': {e}", file=sys.stderr)
         except FileNotFoundError:
              print(f"Warning: Icon file 'icon.ico' not found at expected path: {icon_path}", file=sys.stderr)
-        parent_x=parent.winfo_x();parent_y=parent.winfo_y();parent_w=parent.winfo_width();parent_h=parent.winfo_height(); w=800;h=500;x=parent_x+(parent_w//2)-(w//2);y=parent_y+(parent_h//2)-(h//2); self.geometry(f"{w}x{h}+{x}+{y}")
+        parent_x=parent.winfo_x();parent_y=parent.winfo_y();parent_w=parent.winfo_width();parent_h=parent.winfo_height(); w=880;h=500;x=parent_x+(parent_w//2)-(w//2);y=parent_y+(parent_h//2)-(h//2); self.geometry(f"{w}x{h}+{x}+{y}")
         self.protocol("WM_DELETE_WINDOW", self.on_close); self.transient(parent); self.grab_set()
 
+        self.validator = ValidationPool(check=validity_cache.check); self._poll_job = None
         self._create_view_options_menu() # Create menu before widgets that use it
         self._create_history_widgets()
+        self.filter_var.trace_add("write", self._schedule_filter)
         self.refresh_list()
+        self._start_sizes(refresh=False)
         # No need to call _check_admin_status here as View Folder doesn't need admin
 
     # --- NEW: Create the pop-up menu ---
@@ -433,19 +909,33 @@ class HistoryWindow(tk.Toplevel):
 
     def _create_history_widgets(self):
         main_frame = ttk.Frame(self, padding=PAD_GENERAL); main_frame.pack(expand=True, fill=tk.BOTH)
+        filter_frame = ttk.Frame(main_frame); filter_frame.pack(fill=tk.X, pady=(0, PAD_SMALL))
+        filter_label = ttk.Label(filter_frame, text="Filter:"); filter_label.pack(side=tk.LEFT); self.parent_app.create_tooltip(filter_label, TOOLTIP_FILTER)
+        self.filter_entry = ttk.Entry(filter_frame, textvariable=self.filter_var); self.filter_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=PAD_SMALL)
+        self.filter_entry.bind("<Escape>", lambda event: self.filter_var.set("")); self.bind("<Control-f>", lambda event: self.filter_entry.focus_set())
+        self.match_label = ttk.Label(filter_frame, text=""); self.match_label.pack(side=tk.RIGHT)
         tree_frame = ttk.Frame(main_frame); tree_frame.pack(expand=True, fill=tk.BOTH, pady=(0, PAD_GENERAL)); tree_frame.rowconfigure(0, weight=1); tree_frame.columnconfigure(0, weight=1)
-        columns = ("status", "link", "source", "created")
+        columns = ("status", "link", "source", "size", "created")
         self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings", selectmode="extended")
-        self.tree.heading("status", text="Status", anchor=tk.CENTER); self.tree.heading("link", text="Junction Link Path"); self.tree.heading("source", text="Target Source Path"); self.tree.heading("created", text="Date Created", anchor=tk.W)
+        self.heading_text = {"status": "Status", "link": "Junction Link Path", "source": "Target Source Path", "size": "Size", "created": "Date Created"}
+        self.tree.heading("status", text="Status", anchor=tk.CENTER); self.tree.heading("link", text="Junction Link Path"); self.tree.heading("source", text="Target Source Path"); self.tree.heading("size", text="Size", anchor=tk.E); self.tree.heading("created", text="Date Created", anchor=tk.W)
+        for column in columns: self.tree.heading(column, command=lambda c=column: self._sort_by(c))
         # Adjusted Column Widths
         self.tree.column("status", width=110, stretch=tk.NO, anchor=tk.CENTER)
         self.tree.column("link", width=280, stretch=tk.YES)
         self.tree.column("source", width=280, stretch=tk.YES)
+        self.tree.column("size", width=80, stretch=tk.NO, anchor=tk.E)
         self.tree.column("created", width=130, stretch=tk.NO, anchor=tk.W)
-        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview); hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-        self.tree.grid(row=0, column=0, sticky='nsew'); vsb.grid(row=0, column=1, sticky='ns'); hsb.grid(row=1, column=0, sticky='ew')
-        self.tree.tag_configure("Valid", foreground=COLOR_VALID); self.tree.tag_configure("Invalid", foreground=COLOR_INVALID); self.tree.tag_configure("Error", foreground=COLOR_WARN)
+        # The tree never scrolls itself: it holds one recycled item per visible row, and the scrollbar moves the model window instead.
+        self.vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self._on_scrollbar); hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=hsb.set)
+        self.tree.grid(row=0, column=0, sticky='nsew'); self.vsb.grid(row=0, column=1, sticky='ns'); hsb.grid(row=1, column=0, sticky='ew')
+        self.tree.bind("<Configure>", self._on_tree_configure); self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<ButtonPress-1>", self._on_tree_click, add="+"); self._click_replaces_selection = False
+        self.tree.bind("<MouseWheel>", self._on_mousewheel); self.tree.bind("<Button-4>", self._on_mousewheel); self.tree.bind("<Button-5>", self._on_mousewheel)
+        for key in ("<Up>", "<Down>", "<Prior>", "<Next>", "<Home>", "<End>"): self.tree.bind(key, self._on_tree_key)
+        self.parent_app.create_tooltip(self.tree, self._row_tooltip)
+        self.tree.tag_configure("Valid", foreground=COLOR_VALID); self.tree.tag_configure("Invalid", foreground=COLOR_INVALID); self.tree.tag_configure("Error", foreground=COLOR_WARN); self.tree.tag_configure("Checking", foreground=COLOR_DISABLED_FG)
 
         # --- Modified Button Frame ---
         button_frame = ttk.Frame(main_frame); button_frame.pack(fill=tk.X)
@@ -457,43 +947,377 @@ class HistoryWindow(tk.Toplevel):
         self.view_folder_button.pack(side=tk.LEFT, padx=(0, PAD_GENERAL))
         self.parent_app.create_tooltip(self.view_folder_button, TOOLTIP_VIEW_FOLDER)
         # ---
+        self.sizes_button = ttk.Button(button_frame, text="Update Sizes", command=self._toggle_sizes); self.sizes_button.pack(side=tk.LEFT, padx=(0, PAD_GENERAL)); self.parent_app.create_tooltip(self.sizes_button, TOOLTIP_SIZES)
+        self.export_button = ttk.Button(button_frame, text="Export…", command=self._toggle_export); self.export_button.pack(side=tk.LEFT, padx=(0, PAD_SMALL)); self.parent_app.create_tooltip(self.export_button, TOOLTIP_EXPORT)
+        self.import_button = ttk.Button(button_frame, text="Import…", command=self._toggle_import); self.import_button.pack(side=tk.LEFT, padx=(0, PAD_GENERAL)); self.parent_app.create_tooltip(self.import_button, TOOLTIP_IMPORT)
 
         # --- Removed Delete Button(s) ---
 
         self.close_button = ttk.Button(button_frame, text="Close", command=self.on_close); self.close_button.pack(side=tk.RIGHT)
         # ---
 
+    @instrument.timed("history.refresh")
     def refresh_list(self):
-        # ... (refresh list logic remains the same) ...
-        for item in self.tree.get_children(): self.tree.delete(item)
-        if not self.history_data: self.tree.insert("", tk.END, values=("", "No history found.", "", "")); return
-        sorted_history = sorted(self.history_data, key=lambda x: x.get("timestamp", ""), reverse=True)
-        for entry in sorted_history:
-            link = entry.get("link", "N/A"); source = entry.get("source", "N/A"); created = entry.get("timestamp", "N/A")
-            if link == "N/A" or source == "N/A": status_icon = ICON_INVALID; status_text = "Data Error"; tag = "Error"
+        # Incremental: the model is re-read and the visible rows are diffed against what's already rendered, so
+        # unchanged rows cost no Tk calls. Statuses are kept (shown until re-checked) and only changed ones repaint.
+        self._stop_validation()
+        self.status_epoch += 1 # Everything validated before now is due for a re-check
+        if not self.parent_app.validity_watcher: validity_cache.expire() # Without a watcher, re-check fingerprints rather than trusting the TTL
+        try: self.paged_model.refresh()
+        except Exception as e: print(f"Error reading history: {e}"); self.paged_model.total = 0
+        if self.index is not None and len(self.index) != len(self.paged_model): self._drop_index() # History changed underneath the filter
+        if self._view_active() and self.index is None: self._load_index() # The current view stays up until the new index is ready
+        total = len(self.model)
+        self.selected = {i for i in self.selected if i < total}
+        if self.cursor is not None and self.cursor >= total: self.cursor = None
+        self._render()
+        self._update_status(f"History refreshed. {total} items.")
+
+    def entry_added(self, entry):
+        """Shows one newly created entry: O(1) Tk operations and a single validity check."""
+        try: self.paged_model.refresh()
+        except Exception as e: print(f"Error reading history: {e}"); return
+        self.statuses.pop((entry.get("link"), entry.get("source")), None)
+        if self.model is not self.paged_model: # Filtered/sorted: the entry may land anywhere (or nowhere), so rebuild the view
+            if self.index is not None: self.index.add(entry); self._apply_view()
+            else: self._drop_index(); self._load_index()
+            return
+        # The new entry is the newest, so it lands at model index 0 and every existing row shifts down by one.
+        self.selected = {i + 1 for i in self.selected}
+        if self.cursor is not None: self.cursor += 1
+        if self.top_index > 0: self.top_index += 1 # Scrolled away from the top: keep the same rows on screen
+        elif self.pool and len(self.pool) == min(self.visible_rows or 1, len(self.model)):
+            last = self.pool.pop(); self.pool.insert(0, last); self.tree.move(last, "", 0) # Recycle the bottom row as the new top row
+        elif self.pool:
+            self._next_iid += 1; iid = f"row{self._next_iid}" # Viewport not full yet: one new item at the top
+            self.tree.insert("", 0, iid=iid); self.pool.insert(0, iid)
+        self._render()
+        self._update_status(f"History updated. {len(self.model)} items.")
+
+    # --- Filter and sort ---
+    def _view_active(self):
+        return bool(self.filter_var.get().strip()) or (self.sort_column, self.sort_descending) != HISTORY_DEFAULT_SORT
+
+    def _schedule_filter(self, *args):
+        if self._filter_job is None: self._filter_job = self.after_idle(self._apply_view)
+
+    def _sort_by(self, column):
+        if column == self.sort_column: self.sort_descending = not self.sort_descending
+        else: self.sort_column = column; self.sort_descending = column in ("created", "size") # Dates newest first, sizes largest first, text A-Z
+        self._apply_view()
+
+    def _status_sort_key(self, entry_id):
+        # Only statuses already known are sorted on; rows still "Checking…" go last. Sorting again picks up newer results.
+        entry = self.index.entries[entry_id]
+        status = self.statuses.get((entry.get("link"), entry.get("source")))
+        return status[1][0] if status else 99
+
+    def _size_sort_key(self, entry_id):
+        # Sizes not computed yet sort as the smallest; sorting again after "Update Sizes" picks up new totals.
+        size = self.sizes.get(self.index.entries[entry_id].get("source", "")) if self.sizes else None
+        return size.bytes if size else -1
+
+    def _apply_view(self):
+        """Points the tree at the paged store (default view) or at a filtered/sorted index view."""
+        self._filter_job = None
+        if not self._view_active(): self.model = self.paged_model
+        elif self.index is None: self._load_index(); return # Applied again once the index is built
+        else:
+            key = {"status": self._status_sort_key, "size": self._size_sort_key}.get(self.sort_column)
+            column = "created" if key else self.sort_column
+            self.model = IndexedHistoryModel(self.index, self.index.view(self.filter_var.get(), column, self.sort_descending, key=key))
+        self.selected = set(); self.cursor = None; self.top_index = 0 # Model indices mean different rows now
+        for column, text in self.heading_text.items():
+            arrow = (" ▼" if self.sort_descending else " ▲") if column == self.sort_column else ""
+            self.tree.heading(column, text=text + arrow)
+        self.match_label.config(text=f"{len(self.model)} of {len(self.paged_model)}" if self.filter_var.get().strip() else "")
+        self._render()
+
+    def _drop_index(self):
+        self.index = None; self._index_generation += 1; self._index_loading = False
+
+    def _load_index(self):
+        # Building the index reads the whole history, so it happens on a worker thread; a refresh
+        # in the meantime bumps the generation and the stale result is thrown away.
+        if self._index_loading: return
+        self._index_loading = True; self.match_label.config(text="Indexing…")
+        generation = self._index_generation; store = self.history_store; results = self._index_queue
+        def build():
+            try: results.put((generation, HistoryIndex(store.load())))
+            except Exception as e: print(f"Error indexing history: {e}"); results.put((generation, None))
+        threading.Thread(target=build, name="LinkForgeHistoryIndex", daemon=True).start()
+        if not self._index_job: self._index_job = self.after(HISTORY_LOAD_POLL_MS, self._poll_index)
+
+    def _poll_index(self):
+        self._index_job = None
+        try: generation, index = self._index_queue.get_nowait()
+        except queue.Empty: self._index_job = self.after(HISTORY_LOAD_POLL_MS, self._poll_index); return
+        if generation != self._index_generation: # Stale; a newer build is (or will be) on its way
+            if self._index_loading: self._index_job = self.after(HISTORY_LOAD_POLL_MS, self._poll_index)
+            return
+        self._index_loading = False
+        if index is None: self.match_label.config(text=""); self._update_status("Error indexing history.", COLOR_ERROR); return
+        self.index = index; self._apply_view()
+
+    # --- Virtualized rendering ---
+    def _row_height(self):
+        try: return int(self.parent_app.style.lookup('Treeview', 'rowheight')) or int(FONT_SIZE_BASE * 2.2)
+        except (tk.TclError, ValueError): return int(FONT_SIZE_BASE * 2.2)
+
+    def _on_tree_configure(self, event=None):
+        row_height = self._row_height()
+        visible = max(1, (self.tree.winfo_height() - row_height) // row_height) # One row's worth is taken by the headings
+        if visible != self.visible_rows: self.visible_rows = visible; self._render()
+
+    def _row_values(self, entry):
+        link = entry.get("link", "N/A"); source = entry.get("source", "N/A"); created = entry.get("timestamp", "N/A")
+        if link == "N/A" or source == "N/A": return ((f"{ICON_INVALID} Data Error", link, source, "", created), "Error")
+        size = format_size(self.sizes.get(source)) if self.sizes else "…"
+        status = self.statuses.get((link, source))
+        if status is None: return ((f"{ICON_CHECKING} {STATUS_CHECKING}", link, source, size, created), "Checking")
+        status_value, tag = status_display(*status[1])
+        return ((status_value, link, source, size, created), tag)
+
+    def _sync_pool(self, shown):
+        """Grows or shrinks the recycled item pool to `shown` items, touching only the difference."""
+        if self.placeholder: self.tree.delete(self.placeholder); self.placeholder = None
+        while len(self.pool) > shown:
+            iid = self.pool.pop(); self.tree.delete(iid); self._rendered.pop(iid, None)
+        while len(self.pool) < shown:
+            self._next_iid += 1; iid = f"row{self._next_iid}"
+            self.tree.insert("", tk.END, iid=iid); self.pool.append(iid)
+
+    @instrument.timed("history.render")
+    def _render(self):
+        """Shows model rows from top_index on the recycled item pool, updating only items whose content changed."""
+        total = len(self.model)
+        shown = min(self.visible_rows or 1, total)
+        self.top_index = max(0, min(self.top_index, total - shown))
+        if not total:
+            self._sync_pool(0)
+            if not self.placeholder: self.placeholder = self.tree.insert("", tk.END, values=("", "No history found.", "", "", ""))
+            self.vsb.set(0, 1); return
+        self._sync_pool(shown)
+        visible_selection = []
+        for position, iid in enumerate(self.pool):
+            index = self.top_index + position
+            row = self._row_values(self.model.row(index) or {})
+            if self._rendered.get(iid) != row: self.tree.item(iid, values=row[0], tags=(row[1],)); self._rendered[iid] = row
+            if index in self.selected: visible_selection.append(iid)
+        if tuple(visible_selection) != self.tree.selection(): self.tree.selection_set(visible_selection)
+        if self.cursor is not None and self.top_index <= self.cursor < self.top_index + shown: self.tree.focus(self.pool[self.cursor - self.top_index])
+        self.tree.yview_moveto(0) # Keep the item pool pinned; scrolling happens in the model
+        self.vsb.set(self.top_index / total, (self.top_index + shown) / total)
+        self._queue_validation(max(0, self.top_index - HISTORY_OVERSCAN), min(total, self.top_index + shown + HISTORY_OVERSCAN))
+
+    def _scroll_to(self, top_index):
+        top_index = max(0, min(top_index, len(self.model) - min(self.visible_rows or 1, len(self.model))))
+        delta = top_index - self.top_index
+        if not delta: return
+        # Small scrolls rotate the pool so rows that stay on screen keep their item (and need no update).
+        if 0 < abs(delta) < len(self.pool):
+            if delta > 0:
+                moved, self.pool = self.pool[:delta], self.pool[delta:] + self.pool[:delta]
+                for iid in moved: self.tree.move(iid, "", tk.END)
             else:
-                status_code, status_text = check_junction_validity(link, source)
-                if status_code == 0: status_icon = ICON_VALID; tag = "Valid"
-                elif status_code in [1, 2, 3]: status_icon = ICON_INVALID; tag = "Invalid"
-                else: status_icon = ICON_INVALID; tag = "Error"
-            values = (f"{status_icon} {status_text}", link, source, created); iid = link
-            try: self.tree.insert("", tk.END, iid=iid, values=values, tags=(tag,))
-            except tk.TclError:
-                try: self.tree.insert("", tk.END, values=values, tags=(tag,))
-                except Exception as insert_e: print(f"Error inserting item even with default iid: {values}, {insert_e}")
-        self._update_status(f"History refreshed. {len(sorted_history)} items.")
-
+                moved, self.pool = self.pool[delta:], self.pool[delta:] + self.pool[:delta]
+                for iid in reversed(moved): self.tree.move(iid, "", 0)
+        self.top_index = top_index; self._render()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto": self._scroll_to(int(float(amount) * len(self.model)))
+        elif action == "scroll": self._scroll_to(self.top_index + int(amount) * (self.visible_rows if unit == "pages" else 1))
+
+    def _on_mousewheel(self, event):
+        if event.num == 4 or getattr(event, 'delta', 0) > 0: self._scroll_to(self.top_index - HISTORY_WHEEL_ROWS)
+        else: self._scroll_to(self.top_index + HISTORY_WHEEL_ROWS)
+        return "break"
+
+    def _on_tree_key(self, event):
+        total = len(self.model)
+        if not total: return "break"
+        cursor = self.cursor if self.cursor is not None else self.top_index
+        step = {"Up": -1, "Down": 1, "Prior": -self.visible_rows, "Next": self.visible_rows}.get(event.keysym)
+        if step is not None: cursor += step
+        elif event.keysym == "Home": cursor = 0
+        elif event.keysym == "End": cursor = total - 1
+        self.cursor = max(0, min(cursor, total - 1)); self.selected = {self.cursor}
+        if self.cursor < self.top_index: self._scroll_to(self.cursor)
+        elif self.cursor >= self.top_index + self.visible_rows: self._scroll_to(self.cursor - self.visible_rows + 1)
+        self._render()
+        return "break"
+
+    def _on_tree_click(self, event):
+        # A plain click replaces the whole selection; Shift/Ctrl-click extends it (off-screen picks are kept).
+        self._click_replaces_selection = not (event.state & (0x0001 | 0x0004))
+
+    def _on_tree_select(self, event=None):
+        # Merge the on-screen Treeview selection into the model selection.
+        if not self.pool: return
+        positions = {iid: position for position, iid in enumerate(self.pool)}
+        shown = range(self.top_index, self.top_index + len(self.pool))
+        visible_selection = {self.top_index + positions[iid] for iid in self.tree.selection() if iid in positions}
+        if self._click_replaces_selection: self.selected = visible_selection; self._click_replaces_selection = False
+        else: self.selected = {i for i in self.selected if i not in shown} | visible_selection
+        focus = self.tree.focus()
+        if focus in positions: self.cursor = self.top_index + positions[focus]
+
+    def _row_tooltip(self, event):
+        # Where a mismatched link really points; the status column is too narrow to hold a path.
+        iid = self.tree.identify_row(event.y)
+        if iid not in self.pool: return None
+        entry = self.model.row(self.top_index + self.pool.index(iid)) or {}
+        link = entry.get("link", "N/A"); source = entry.get("source", "N/A")
+        status = self.statuses.get((link, source))
+        if status is None or status[1][0] != 5: return None
+        target = validity_cache.target(link, source)
+        return f"Points to {target}" if target else None
+
+    def selected_entries(self):
+        return [entry for entry in (self.model.row(i) for i in sorted(self.selected)) if entry]
+
+    # --- Background validation ---
+    def _queue_validation(self, start, stop):
+        due = []
+        for index in range(start, stop):
+            entry = self.model.row(index)
+            if not entry: continue
+            link = entry.get("link", "N/A"); source = entry.get("source", "N/A")
+            if link == "N/A" or source == "N/A": continue
+            status = self.statuses.get((link, source))
+            if status is None or status[0] < self.status_epoch: due.append((link, source))
+        # Rows the cache still vouches for are filled in right away in one batch; only the rest go to the pool.
+        jobs = []
+        for key, result in zip(due, validity_cache.lookup_many(due)):
+            if result is None: jobs.append((key, key[0], key[1]))
+            else: self.statuses[key] = (self.status_epoch, result)
+        self.validator.retain({key for key, _, _ in jobs})
+        self.validator.submit(jobs)
+        if self.validator.busy() and not self._poll_job: self._poll_job = self.after(VALIDATION_POLL_MS, self._poll_validation)
+        if len(jobs) < len(due): self._render() # Shows the cached rows; they're current now, so this doesn't come back here with them
+
+    def _poll_validation(self):
+        self._poll_job = None
+        finished = self.validator.drain()
+        for key, result in finished: self.statuses[key] = (self.status_epoch, result)
+        if finished: self._render()
+        if self.validator.busy(): self._poll_job = self.after(VALIDATION_POLL_MS, self._poll_validation)
+
+    def _stop_validation(self):
+        if self._poll_job: self.after_cancel(self._poll_job); self._poll_job = None
+        self.validator.cancel()
+
+    # --- Sizes ---
+    def _start_sizes(self, refresh=True):
+        """Opens the size index (cached totals show at once) and, with refresh, brings every source's total up to date."""
+        self._size_cancel = cancel = threading.Event() if refresh else None; results = self._size_queue; store = self.history_store
+        def run():
+            index = get_size_index(); results.put(("index", index))
+            if not refresh or index is None: return
+            try:
+                sources = [entry.get("source", "") for entry in store.load()]
+                index.refresh(sources, on_result=lambda source, size: results.put(("size", source)), on_progress=lambda p: results.put(("progress", p)), cancel_event=cancel)
+            except Exception as e: print(f"Error updating sizes: {e}", file=sys.stderr)
+            results.put(("done", cancel.is_set()))
+        threading.Thread(target=run, name="LinkForgeSizes", daemon=True).start()
+        if refresh: self.sizes_button.config(text="Stop Sizes")
+        if not self._size_job: self._size_job = self.after(SIZE_POLL_MS, self._poll_sizes)
+
+    def _toggle_sizes(self):
+        if self._size_cancel is not None: self._size_cancel.set(); self._update_status("Stopping size update…", COLOR_WARN)
+        else: self._start_sizes()
+
+    def _poll_sizes(self):
+        self._size_job = None; changed = False; progress = None; finished = None
+        while True:
+            try: kind, value = self._size_queue.get_nowait()
+            except queue.Empty: break
+            if kind == "index": self.sizes = value; self._sizes_opened = True; changed = True
+            elif kind == "size": changed = True
+            elif kind == "progress": progress = value # Only the latest one is shown
+            elif kind == "done": finished = value
+        if changed: self._render()
+        if progress: self._update_status(f"Sizes: {progress.sources_done} of {progress.sources_total} sources, {progress.dirs_done} folders checked ({progress.dirs_listed} listed)…", COLOR_INFO)
+        if finished is not None:
+            self._size_cancel = None; self.sizes_button.config(text="Update Sizes")
+            self._update_status("Size update stopped; finished sources are kept." if finished else "Sizes up to date.", COLOR_WARN if finished else COLOR_SUCCESS)
+        elif self._size_cancel is not None or not self._sizes_opened: self._size_job = self.after(SIZE_POLL_MS, self._poll_sizes)
+
+    # --- Export / Import ---
+    def _toggle_export(self):
+        if self._transfer_cancel is not None: self._transfer_cancel.set(); self._update_status("Stopping export…", COLOR_WARN); return
+        path = filedialog.asksaveasfilename(title="Export History", parent=self, defaultextension=".jsonl",
+                                            filetypes=[("JSON Lines", "*.jsonl *.jsonl.gz"), ("CSV", "*.csv *.csv.gz"), ("JSON", "*.json *.json.gz"), ("All files", "*.*")])
+        if not path: return
+        try: fmt, compress = history_io.detect_format(path)
+        except history_io.HistoryFormatError as e: self._update_status(f"Export: {e}", COLOR_ERROR); return
+        check = check_junction_validity if messagebox.askyesno("Export History", "Also check every link and include its status in the file?", parent=self) else None
+        store = self.history_store
+        def run(cancel, post):
+            report = history_io.export_history(store.iter_entries(), path, fmt, compress, check=check, cancel_event=cancel,
+                                               on_progress=lambda written: post(("progress", f"Exporting… {written} entries written")))
+            if report.cancelled: return ("Export stopped; no file was written.", COLOR_WARN, False)
+            status = f", {report.invalid} not valid" if check else ""
+            return (f"Exported {report.written} entries{status} to {os.path.basename(path)}.", COLOR_SUCCESS, False)
+        self._start_transfer(self.export_button, "Stop Export", run)
+
+    def _toggle_import(self):
+        if self._transfer_cancel is not None: self._transfer_cancel.set(); self._update_status("Stopping import…", COLOR_WARN); return
+        path = filedialog.askopenfilename(title="Import History", parent=self,
+                                          filetypes=[("History exports", "*.jsonl *.ndjson *.csv *.json *.gz"), ("All files", "*.*")])
+        if not path: return
+        try: fmt, compress = history_io.detect_format(path)
+        except history_io.HistoryFormatError as e: self._update_status(f"Import: {e}", COLOR_ERROR); return
+        store = self.history_store
+        def run(cancel, post):
+            def extend(entries):
+                for entry in entries: validity_cache.invalidate(link_path=entry["link"])
+                return extend_history(entries) # One store update per batch
+            known = (entry.get("link", "") for entry in store.iter_entries())
+            report = history_io.import_history(history_io.read_history(path, fmt, compress), known, extend, cancel_event=cancel,
+                                               on_progress=lambda r: post(("progress", f"Importing… {r.read} read, {r.imported} added")))
+            message = f"Imported {report.imported} of {report.read} entries ({report.duplicates} already in history, {report.skipped} unusable)."
+            if not report.saved: return (message + " Stopped: the history could not be saved.", COLOR_ERROR, report.imported > 0)
+            if report.cancelled: return (message + " Stopped early.", COLOR_WARN, report.imported > 0)
+            return (message, COLOR_SUCCESS, report.imported > 0)
+        self._start_transfer(self.import_button, "Stop Import", run)
+
+    def _start_transfer(self, button, stop_text, run):
+        """Runs an export or import off the Tk thread. run(cancel_event, post) returns (message, color, history_changed)
+        and may post(("progress", text)); only _poll_transfer touches Tk."""
+        self._transfer_cancel = cancel = threading.Event(); results = self._transfer_queue
+        def work():
+            try: outcome = run(cancel, results.put)
+            except Exception as e: outcome = (f"{'Export' if button is self.export_button else 'Import'} failed: {e}", COLOR_ERROR, False)
+            results.put(("done", outcome))
+        threading.Thread(target=work, name="LinkForgeTransfer", daemon=True).start()
+        self._transfer_button = button; self._transfer_text = button.cget("text"); button.config(text=stop_text)
+        for other in (self.export_button, self.import_button):
+            if other is not button: other.config(state=tk.DISABLED)
+        self._transfer_job = self.after(TRANSFER_POLL_MS, self._poll_transfer)
+
+    def _poll_transfer(self):
+        self._transfer_job = None; progress = None; outcome = None
+        while True:
+            try: kind, value = self._transfer_queue.get_nowait()
+            except queue.Empty: break
+            if kind == "progress": progress = value # Only the latest one is shown
+            elif kind == "done": outcome = value
+        if outcome is None:
+            if progress: self._update_status(progress, COLOR_INFO)
+            self._transfer_job = self.after(TRANSFER_POLL_MS, self._poll_transfer); return
+        message, color, changed = outcome
+        self._transfer_cancel = None; self._transfer_button.config(text=self._transfer_text)
+        self.export_button.config(state=tk.NORMAL); self.import_button.config(state=tk.NORMAL)
+        if changed: self.parent_app.on_history_changed() # Refreshes this list too
+        self._update_status(message, color)
 
     def _edit_selected(self):
-        # ... (edit selected logic remains the same) ...
-        selected_iids = self.tree.selection()
-        if not selected_iids: self._update_status("No item selected to edit.", COLOR_WARN); return
-        if len(selected_iids) > 1: self._update_status("Please select only one item to edit.", COLOR_WARN); return
-        selected_iid = selected_iids[0]
+        selected = self.selected_entries()
+        if not selected: self._update_status("No item selected to edit.", COLOR_WARN); return
+        if len(selected) > 1: self._update_status("Please select only one item to edit.", COLOR_WARN); return
         try:
-            item_data = self.tree.item(selected_iid); values = item_data.get('values')
-            if not values or len(values) < 3: self._update_status("Could not retrieve data.", COLOR_ERROR); return
-            link_path = values[1]; source_path = values[2]
+            link_path = selected[0].get("link", "N/A"); source_path = selected[0].get("source", "N/A")
             if link_path == "N/A" or source_path == "N/A" or not link_path or not source_path: self._update_status("Selected item has incomplete data.", COLOR_WARN); return
             self.parent_app.populate_fields_from_history(source_path, link_path)
             self.on_close()
@@ -503,11 +1327,11 @@ class HistoryWindow(tk.Toplevel):
 
     # --- NEW: Show View Options Menu ---
     def _show_view_options(self):
-        selected_iids = self.tree.selection()
-        if not selected_iids:
+        selected = self.selected_entries()
+        if not selected:
             self._update_status("No item selected to view.", COLOR_WARN)
             return
-        if len(selected_iids) > 1:
+        if len(selected) > 1:
             self._update_status("Please select only one item to view.", COLOR_WARN)
             return
 
@@ -524,22 +1348,16 @@ class HistoryWindow(tk.Toplevel):
     # --- NEW: Open Explorer Method ---
     def _open_explorer(self, location_type):
         """Opens File Explorer selecting the selected item's link path or source path."""
-        selected_iids = self.tree.selection()
-        if not selected_iids:
+        selected = self.selected_entries()
+        if not selected:
             self._update_status("No item selected to view.", COLOR_WARN)
             return
 
-        selected_iid = selected_iids[0]
         path_to_select = None
         path_description = ""
 
         try:
-            item_data = self.tree.item(selected_iid)
-            values = item_data.get('values')
-            if not values or len(values) < 3:
-                self._update_status("Could not retrieve path data for selection.", COLOR_ERROR); return
-
-            link_path = values[1]; source_path = values[2]
+            link_path = selected[0].get("link", "N/A"); source_path = selected[0].get("source", "N/A")
 
             if location_type == 'link':
                 path_to_select = link_path; path_description = "Link Folder"
@@ -581,37 +1399,327 @@ class HistoryWindow(tk.Toplevel):
         except Exception as e: messagebox.showerror("Error", f"An unexpected error occurred opening File Explorer:\n{e}", parent=self); self._update_status(f"Error opening explorer: {e}", COLOR_ERROR)
 
     def _update_status(self, message, color=None):
-        print(f"History Status: {message}")
+        instrument.event("history.status", message=message)
         self.parent_app._update_status(message, color)
 
     def on_close(self):
+        self._stop_validation(); self.validator.shutdown()
+        if self._filter_job: self.after_cancel(self._filter_job); self._filter_job = None
+        if self._index_job: self.after_cancel(self._index_job); self._index_job = None
+        if self._size_cancel is not None: self._size_cancel.set() # Finished sources are already saved
+        if self._size_job: self.after_cancel(self._size_job); self._size_job = None
+        if self._transfer_cancel is not None: self._transfer_cancel.set() # An export leaves no file; imported batches are kept
+        if self._transfer_job: self.after_cancel(self._transfer_job); self._transfer_job = None
         self.parent_app.history_window = None
         self.grab_release(); self.destroy()
 
-# --- Main Execution ---
-if __name__ == "__main__":
-    if os.name != 'nt':
-        root = tk.Tk(); root.withdraw(); messagebox.showerror("Compatibility Error", "Requires Windows."); sys.exit(1)
+# --- Batch Window Class ---
+class BatchWindow(tk.Toplevel):
+    """Creates junctions from a manifest on a worker pool. Progress and per-item results go to the
+    window itself (no modal dialogs); results are handed over from the workers through a queue."""
+    def __init__(self, parent):
+        super().__init__(parent)
+        parent.ensure_tree_styles()
+        self.parent_app = parent
+        self.title(f"{APP_NAME} - Batch Create"); self.minsize(600, 300)
+        try: self.iconbitmap(resource_path("icon.ico"))
+        except tk.TclError: pass
+        w = 800; h = 480; x = parent.winfo_x() + (parent.winfo_width() // 2) - (w // 2); y = parent.winfo_y() + (parent.winfo_height() // 2) - (h // 2); self.geometry(f"{w}x{h}+{x}+{y}")
+        self.protocol("WM_DELETE_WINDOW", self.on_close); self.transient(parent)
+        self.items = []; self.results = queue.Queue(); self.cancel_event = None; self.worker = None; self._poll_job = None
+        self.manifest_var = tk.StringVar(); self.progress_var = tk.StringVar(value="No manifest loaded.")
+        self._create_batch_widgets()
 
-    print(f"Initial check: is_admin() = {is_admin()}") # DEBUG
-    HAS_ADMIN = is_admin()
+    def _create_batch_widgets(self):
+        main_frame = ttk.Frame(self, padding=PAD_GENERAL); main_frame.pack(expand=True, fill=tk.BOTH)
+        file_frame = ttk.Frame(main_frame); file_frame.pack(fill=tk.X, pady=(0, PAD_SMALL)); file_frame.columnconfigure(1, weight=1)
+        ttk.Label(file_frame, text="Manifest (CSV/JSON):").grid(row=0, column=0, sticky=tk.W)
+        ttk.Entry(file_frame, textvariable=self.manifest_var).grid(row=0, column=1, sticky=tk.EW, padx=PAD_SMALL)
+        ttk.Button(file_frame, text=ICON_BROWSE, command=self._browse_manifest, style='Toolbutton.TButton', width=3).grid(row=0, column=2)
+        ttk.Button(file_frame, text="Load", command=self._load_manifest).grid(row=0, column=3, padx=(PAD_SMALL, 0))
+        tree_frame = ttk.Frame(main_frame); tree_frame.pack(expand=True, fill=tk.BOTH, pady=(0, PAD_SMALL)); tree_frame.rowconfigure(0, weight=1); tree_frame.columnconfigure(0, weight=1)
+        self.tree = ttk.Treeview(tree_frame, columns=("result", "link", "source"), show="headings", selectmode="browse")
+        self.tree.heading("result", text="Result"); self.tree.heading("link", text="Junction Link Path"); self.tree.heading("source", text="Target Source Path")
+        self.tree.column("result", width=200, stretch=tk.NO); self.tree.column("link", width=280, stretch=tk.YES); self.tree.column("source", width=280, stretch=tk.YES)
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview); self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.grid(row=0, column=0, sticky='nsew'); vsb.grid(row=0, column=1, sticky='ns')
+        self.tree.tag_configure("Valid", foreground=COLOR_VALID); self.tree.tag_configure("Invalid", foreground=COLOR_INVALID); self.tree.tag_configure("Checking", foreground=COLOR_DISABLED_FG)
+        self.progress = ttk.Progressbar(main_frame, mode="determinate"); self.progress.pack(fill=tk.X, pady=(0, PAD_SMALL))
+        button_frame = ttk.Frame(main_frame); button_frame.pack(fill=tk.X)
+        ttk.Label(button_frame, textvariable=self.progress_var).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="Close", command=self.on_close).pack(side=tk.RIGHT)
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self._cancel, state=tk.DISABLED); self.cancel_button.pack(side=tk.RIGHT, padx=(0, PAD_SMALL))
+        self.start_button = ttk.Button(button_frame, text="Create All", command=self._start, state=tk.DISABLED); self.start_button.pack(side=tk.RIGHT, padx=(0, PAD_SMALL))
+
+    def _browse_manifest(self):
+        path = filedialog.askopenfilename(title="Select Manifest", parent=self, filetypes=[("Manifests", "*.csv *.json"), ("All files", "*.*")])
+        if path: self.manifest_var.set(os.path.normpath(path)); self._load_manifest()
+
+    def _load_manifest(self):
+        path = self.manifest_var.get().strip()
+        if not path or self.worker: return
+        try: self.items = batch.load_manifest(path)
+        except (OSError, batch.ManifestError) as e: self.progress_var.set(f"Could not load manifest: {e}"); self.items = []; return
+        self.tree.delete(*self.tree.get_children())
+        for item in self.items: self.tree.insert("", tk.END, iid=str(item.index), values=(f"{ICON_CHECKING} Validating…", item.link or "N/A", item.source or "N/A"), tags=("Checking",))
+        self.progress.configure(maximum=max(1, len(self.items)), value=0)
+        self.progress_var.set(f"Validating {len(self.items)} items…"); self.start_button.config(state=tk.DISABLED)
+        # Up-front validation touches the filesystem, so it runs off the Tk thread too.
+        items = self.items
+        self.worker = threading.Thread(target=lambda: self.results.put(("validated", batch.validate_manifest(items))), name="LinkForgeBatchValidate", daemon=True); self.worker.start()
+        self._schedule_poll()
+
+    def _start(self):
+        if not self.items or self.worker: return
+        if not self.parent_app.running_as_admin: self.progress_var.set("Admin required to create links."); return
+        backend = get_link_backend(LINK_BACKEND); self.cancel_event = threading.Event(); items = self.items
+        self.progress.configure(value=0); self.start_button.config(state=tk.DISABLED); self.cancel_button.config(state=tk.NORMAL)
+        self.progress_var.set(f"Creating {len(items)} links ({backend.name})…")
+        def run():
+            results = batch.run_batch(items, backend, on_result=lambda result, done, total: self.results.put(("result", result)), cancel_event=self.cancel_event)
+            # Persisted here rather than in _finish so the history is written even if the window is closed mid-batch.
+            entries = batch.history_entries(results)
+            for entry in entries: validity_cache.invalidate(link_path=entry["link"])
+            saved = extend_history(entries) # One store update for the whole batch
+            self.results.put(("finished", (results, entries, saved)))
+        self.worker = threading.Thread(target=run, name="LinkForgeBatchRunner", daemon=True); self.worker.start()
+        self._schedule_poll()
+
+    def _cancel(self):
+        if self.cancel_event and self.worker: self.cancel_event.set(); self.progress_var.set("Cancelling… (links already in progress will finish)")
+
+    def _schedule_poll(self):
+        if not self._poll_job: self._poll_job = self.after(VALIDATION_POLL_MS, self._poll)
+
+    def _poll(self):
+        self._poll_job = None
+        for _ in range(VALIDATION_BATCH_SIZE):
+            try: kind, payload = self.results.get_nowait()
+            except queue.Empty: break
+            if kind == "validated": self._show_validation(payload)
+            elif kind == "result": self._show_result(payload)
+            elif kind == "finished": self._finish(payload)
+        if self.worker or not self.results.empty(): self._schedule_poll()
+
+    def _show_validation(self, problems):
+        self.worker = None
+        for item in self.items:
+            if item.index in problems: self.tree.item(str(item.index), values=(f"{ICON_INVALID} {problems[item.index][1]}", item.link or "N/A", item.source or "N/A"), tags=("Invalid",))
+            else: self.tree.item(str(item.index), values=("Ready", item.link, item.source), tags=())
+        ready = len(self.items) - len(problems)
+        self.progress_var.set(f"{ready} of {len(self.items)} items ready; {len(problems)} will be skipped.")
+        if ready: self.start_button.config(state=tk.NORMAL if self.parent_app.running_as_admin else tk.DISABLED)
+
+    def _show_result(self, result):
+        icon, tag = (ICON_VALID, "Valid") if result.ok else (ICON_INVALID, "Invalid")
+        self.tree.item(str(result.item.index), values=(f"{icon} {'Created' if result.ok else result.message}", result.item.link or "N/A", result.item.source or "N/A"), tags=(tag,))
+        self.progress.step(1)
+        self.progress_var.set(f"{int(self.progress['value'])} / {len(self.items)} done")
+
+    def _finish(self, outcome):
+        results, entries, saved = outcome
+        self.worker = None; self.cancel_button.config(state=tk.DISABLED)
+        self.parent_app.on_history_changed()
+        failed = sum(1 for r in results if not r.ok)
+        summary = f"Batch finished: {len(entries)} created, {failed} failed or skipped." + ("" if saved else " (History could not be saved!)")
+        self.progress_var.set(summary); self.parent_app._update_status(summary, COLOR_SUCCESS if not failed else COLOR_WARN)
 
-    if not HAS_ADMIN:
-        root = tk.Tk(); root.withdraw()
-        message = ("Admin privileges needed to create links.\n\n" # Removed delete mention
-                   "Without them, you can only view/copy the command.\n\n"
-                   "Relaunch as Administrator?")
-        if messagebox.askyesno("Admin Required", message, icon='warning'):
-            print("Attempting relaunch as admin...")
-            if relaunch_as_admin(): print("Relaunch success. Exiting old process."); sys.exit(0)
-            else: print("Relaunch failed/cancelled."); messagebox.showinfo("Relaunch Failed", "Could not relaunch as admin.\nContinuing with limited features.", parent=None)
-        else: print("Continuing without admin."); messagebox.showinfo("Limited Features", "Running without admin rights.", parent=None)
-        root.destroy()
+    def on_close(self):
+        self._cancel()
+        if self._poll_job: self.after_cancel(self._poll_job); self._poll_job = None
+        self.parent_app.batch_window = None
+        self.destroy()
+
+
+# --- Scan Window Class ---
+class ScanWindow(tk.Toplevel):
+    """Finds junctions made outside LinkForge under chosen roots and imports them into the history.
+    The walk runs on scan.scan_roots' worker pool; finds and progress come back through a queue."""
+    def __init__(self, parent):
+        super().__init__(parent)
+        parent.ensure_tree_styles()
+        self.parent_app = parent
+        self.title(f"{APP_NAME} - Scan for Junctions"); self.minsize(600, 300)
+        try: self.iconbitmap(resource_path("icon.ico"))
+        except tk.TclError: pass
+        w = 820; h = 500; x = parent.winfo_x() + (parent.winfo_width() // 2) - (w // 2); y = parent.winfo_y() + (parent.winfo_height() // 2) - (h // 2); self.geometry(f"{w}x{h}+{x}+{y}")
+        self.protocol("WM_DELETE_WINDOW", self.on_close); self.transient(parent)
+        self.found = []; self.known = set(); self.imported = set(); self.results = queue.Queue(); self.cancel_event = None; self.worker = None; self._poll_job = None
+        self.roots_var = tk.StringVar(); self.depth_var = tk.StringVar(value=str(scan.SCAN_MAX_DEPTH))
+        self.exclude_var = tk.StringVar(value="; ".join(scan.SCAN_DEFAULT_EXCLUDES)); self.progress_var = tk.StringVar(value="Choose one or more folders to scan.")
+        self._create_scan_widgets()
+
+    def _create_scan_widgets(self):
+        main_frame = ttk.Frame(self, padding=PAD_GENERAL); main_frame.pack(expand=True, fill=tk.BOTH)
+        options = ttk.Frame(main_frame); options.pack(fill=tk.X, pady=(0, PAD_SMALL)); options.columnconfigure(1, weight=1)
+        ttk.Label(options, text="Roots (; separated):").grid(row=0, column=0, sticky=tk.W)
+        ttk.Entry(options, textvariable=self.roots_var).grid(row=0, column=1, columnspan=3, sticky=tk.EW, padx=PAD_SMALL)
+        ttk.Button(options, text=ICON_BROWSE, command=self._browse_root, style='Toolbutton.TButton', width=3).grid(row=0, column=4)
+        ttk.Label(options, text="Exclude globs:").grid(row=1, column=0, sticky=tk.W)
+        ttk.Entry(options, textvariable=self.exclude_var).grid(row=1, column=1, sticky=tk.EW, padx=PAD_SMALL)
+        ttk.Label(options, text="Max depth:").grid(row=1, column=2, sticky=tk.E)
+        ttk.Spinbox(options, from_=0, to=64, textvariable=self.depth_var, width=4).grid(row=1, column=3, columnspan=2, sticky=tk.W, padx=(PAD_SMALL, 0))
+        tree_frame = ttk.Frame(main_frame); tree_frame.pack(expand=True, fill=tk.BOTH, pady=(0, PAD_SMALL)); tree_frame.rowconfigure(0, weight=1); tree_frame.columnconfigure(0, weight=1)
+        self.tree = ttk.Treeview(tree_frame, columns=("state", "link", "target", "kind"), show="headings", selectmode="extended")
+        self.tree.heading("state", text="History"); self.tree.heading("link", text="Link Path"); self.tree.heading("target", text="Points To"); self.tree.heading("kind", text="Type")
+        self.tree.column("state", width=110, stretch=tk.NO); self.tree.column("link", width=280, stretch=tk.YES); self.tree.column("target", width=280, stretch=tk.YES); self.tree.column("kind", width=80, stretch=tk.NO)
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview); self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.grid(row=0, column=0, sticky='nsew'); vsb.grid(row=0, column=1, sticky='ns')
+        self.tree.tag_configure("Valid", foreground=COLOR_VALID); self.tree.tag_configure("Invalid", foreground=COLOR_INVALID); self.tree.tag_configure("Checking", foreground=COLOR_DISABLED_FG)
+        button_frame = ttk.Frame(main_frame); button_frame.pack(fill=tk.X)
+        ttk.Label(button_frame, textvariable=self.progress_var).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="Close", command=self.on_close).pack(side=tk.RIGHT)
+        self.import_button = ttk.Button(button_frame, text="Import", command=self._import, state=tk.DISABLED); self.import_button.pack(side=tk.RIGHT, padx=(0, PAD_SMALL))
+        self.parent_app.create_tooltip(self.import_button, "Add the selected links (or all new ones if none are selected) to the history.")
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self._cancel, state=tk.DISABLED); self.cancel_button.pack(side=tk.RIGHT, padx=(0, PAD_SMALL))
+        self.start_button = ttk.Button(button_frame, text="Scan", command=self._start); self.start_button.pack(side=tk.RIGHT, padx=(0, PAD_SMALL))
+
+    def _browse_root(self):
+        path = filedialog.askdirectory(title="Select Folder to Scan", parent=self)
+        if path: roots = [r for r in self._split(self.roots_var.get()) if r]; roots.append(os.path.normpath(path)); self.roots_var.set("; ".join(roots))
+
+    @staticmethod
+    def _split(text):
+        return [part.strip() for part in text.split(";") if part.strip()]
+
+    def _start(self):
+        if self.worker: return
+        roots = self._split(self.roots_var.get())
+        if not roots: self.progress_var.set("Enter at least one folder to scan."); return
+        try: max_depth = int(self.depth_var.get())
+        except ValueError: self.progress_var.set("Max depth must be a number."); return
+        excludes = tuple(self._split(self.exclude_var.get()))
+        self.tree.delete(*self.tree.get_children()); self.found = []; self.imported = set()
+        self.cancel_event = threading.Event(); self.start_button.config(state=tk.DISABLED); self.cancel_button.config(state=tk.NORMAL); self.import_button.config(state=tk.DISABLED)
+        self.progress_var.set("Scanning…")
+        def run():
+            known = {os.path.normcase(os.path.normpath(e.get("link", ""))) for e in load_history()} # Read here, not on the Tk thread
+            self.results.put(("known", known))
+            report = scan.scan_roots(roots, max_depth=max_depth, excludes=excludes, cancel_event=self.cancel_event,
+                                     on_found=lambda link: self.results.put(("found", link)),
+                                     on_progress=lambda dirs, links, queued: self.results.put(("progress", (dirs, links, queued))))
+            self.results.put(("finished", report))
+        self.worker = threading.Thread(target=run, name="LinkForgeScanner", daemon=True); self.worker.start()
+        self._schedule_poll()
+
+    def _cancel(self):
+        if self.cancel_event and self.worker: self.cancel_event.set(); self.progress_var.set("Cancelling… (folders being listed will finish)")
+
+    def _schedule_poll(self):
+        if not self._poll_job: self._poll_job = self.after(VALIDATION_POLL_MS, self._poll)
+
+    def _poll(self):
+        self._poll_job = None; progress = None
+        for _ in range(VALIDATION_BATCH_SIZE):
+            try: kind, payload = self.results.get_nowait()
+            except queue.Empty: break
+            if kind == "known": self.known = payload
+            elif kind == "found": self._show_found(payload)
+            elif kind == "progress": progress = payload # Only the latest one is worth drawing
+            elif kind == "finished": self._finish(payload)
+        if progress and self.worker: self.progress_var.set(f"Scanning… {progress[0]} folders, {progress[1]} links found, {progress[2]} queued")
+        if self.worker or not self.results.empty(): self._schedule_poll()
+
+    def _key(self, path):
+        return os.path.normcase(os.path.normpath(path))
+
+    def _show_found(self, link):
+        iid = str(len(self.found)); self.found.append(link)
+        if self._key(link.link) in self.known: state, tag = "In history", ()
+        elif link.target is None: state, tag = f"{ICON_INVALID} Unreadable", ("Invalid",)
+        else: state, tag = "New", ("Valid",)
+        self.tree.insert("", tk.END, iid=iid, values=(state, link.link, link.target or "?", link.kind), tags=tag)
+
+    def _finish(self, report):
+        self.worker = None; self.start_button.config(state=tk.NORMAL); self.cancel_button.config(state=tk.DISABLED)
+        new = len(scan.history_entries(report.found, self.known))
+        summary = f"{'Scan cancelled' if report.cancelled else 'Scan finished'}: {report.dirs_scanned} folders, {len(report.found)} links, {new} not in history." + (f" {len(report.errors)} folders unreadable." if report.errors else "")
+        self.progress_var.set(summary); self.import_button.config(state=tk.NORMAL if new else tk.DISABLED)
+
+    def _import(self):
+        if self.worker: return
+        chosen = [int(iid) for iid in self.tree.selection()] or range(len(self.found))
+        links = [self.found[i] for i in chosen if i not in self.imported]
+        entries = scan.history_entries(links, self.known)
+        if not entries: self.progress_var.set("Nothing new to import."); return
+        if not extend_history(entries): self.progress_var.set("Import failed: history could not be saved."); return # One store update for all of them
+        imported = {self._key(e["link"]) for e in entries}; self.known |= imported
+        for i in chosen:
+            if self._key(self.found[i].link) in imported: self.imported.add(i); self.tree.item(str(i), values=("Imported",) + tuple(self.tree.item(str(i), "values"))[1:], tags=())
+        self.parent_app.on_history_changed()
+        message = f"Imported {len(entries)} scanned links into the history."
+        self.progress_var.set(message); self.parent_app._update_status(message, COLOR_SUCCESS)
+
+    def on_close(self):
+        self._cancel()
+        if self._poll_job: self.after_cancel(self._poll_job); self._poll_job = None
+        self.parent_app.scan_window = None
+        self.destroy()
 
-    if not ensure_dir_exists(HISTORY_DIR):
-        root = tk.Tk(); root.withdraw(); messagebox.showwarning("Startup Warning", f"Could not access history folder:\n{HISTORY_DIR}\nHistory may not work."); root.destroy()
 
-    current_admin_status = is_admin()
-    print(f"Status before creating JunctionApp: is_admin() = {current_admin_status}") # DEBUG
-    app = JunctionApp(running_as_admin=current_admin_status)
+# --- Diagnostics Window Class ---
+class DiagnosticsWindow(tk.Toplevel):
+    """Hidden panel (Ctrl+Shift+D) listing the instrument.py timings: p50/p99 per operation and the counters."""
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent_app = parent; self._refresh_job = None
+        self.title(f"{APP_NAME} - Diagnostics"); self.geometry("640x360"); self.minsize(480, 240)
+        self.protocol("WM_DELETE_WINDOW", self.on_close); self.transient(parent)
+        main_frame = ttk.Frame(self, padding=PAD_GENERAL); main_frame.pack(expand=True, fill=tk.BOTH)
+        self.mode_label = ttk.Label(main_frame); self.mode_label.pack(fill=tk.X, pady=(0, PAD_SMALL))
+        tree_frame = ttk.Frame(main_frame); tree_frame.pack(expand=True, fill=tk.BOTH, pady=(0, PAD_SMALL)); tree_frame.rowconfigure(0, weight=1); tree_frame.columnconfigure(0, weight=1)
+        columns = ("count", "p50", "p99", "max", "total")
+        self.tree = ttk.Treeview(tree_frame, columns=columns, show="tree headings", selectmode="browse")
+        self.tree.heading("#0", text="Operation"); self.tree.column("#0", width=200, stretch=tk.YES)
+        for column, text in zip(columns, ("Count", "p50 ms", "p99 ms", "Max ms", "Total ms")):
+            self.tree.heading(column, text=text); self.tree.column(column, width=80, anchor=tk.E, stretch=tk.NO)
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview); self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.grid(row=0, column=0, sticky='nsew'); vsb.grid(row=0, column=1, sticky='ns')
+        button_frame = ttk.Frame(main_frame); button_frame.pack(fill=tk.X)
+        ttk.Button(button_frame, text="Close", command=self.on_close).pack(side=tk.RIGHT)
+        ttk.Button(button_frame, text="Copy JSON", command=self._copy).pack(side=tk.RIGHT, padx=(0, PAD_SMALL))
+        ttk.Button(button_frame, text="Reset", command=lambda: (instrument.reset(), self._refresh())).pack(side=tk.RIGHT, padx=(0, PAD_SMALL))
+        self.toggle_button = ttk.Button(button_frame, command=self._toggle); self.toggle_button.pack(side=tk.LEFT)
+        self._refresh()
+
+    def _toggle(self):
+        instrument.configure("off" if instrument.enabled else ("trace" if INSTRUMENT_MODE == "trace" else "on"), TRACE_FILE)
+        self._refresh()
+
+    def _copy(self):
+        data = dict(instrument.snapshot(), validity_cache={"hits": validity_cache.hits, "revalidated": validity_cache.revalidated, "misses": validity_cache.misses, "size": len(validity_cache)})
+        self.clipboard_clear(); self.clipboard_append(json.dumps(data, indent=2)); self.parent_app._update_status("Diagnostics copied to clipboard.", COLOR_SUCCESS)
+
+    def _set_row(self, iid, text, values):
+        if self.tree.exists(iid):
+            if tuple(self.tree.item(iid, "values")) != tuple(str(v) for v in values): self.tree.item(iid, values=values)
+        else: self.tree.insert("", tk.END, iid=iid, text=text, values=values)
+
+    def _refresh(self):
+        self._refresh_job = None
+        mode = ("tracing to " + TRACE_FILE) if instrument.enabled and INSTRUMENT_MODE == "trace" else ("on" if instrument.enabled else "off")
+        self.mode_label.config(text=f"Instrumentation: {mode}"); self.toggle_button.config(text="Disable" if instrument.enabled else "Enable")
+        snapshot = instrument.snapshot()
+        for name, s in sorted(snapshot["spans"].items()):
+            self._set_row(f"span:{name}", name, (s["count"], f"{s['p50_ms']:.2f}", f"{s['p99_ms']:.2f}", f"{s['max_ms']:.2f}", f"{s['total_ms']:.1f}"))
+        for name, n in sorted(snapshot["counters"].items()): self._set_row(f"count:{name}", name, (n, "", "", "", ""))
+        cache_stats = {"hits": validity_cache.hits, "revalidated": validity_cache.revalidated, "misses": validity_cache.misses} # Kept by the cache whether or not instrumentation is on
+        for name, n in cache_stats.items(): self._set_row(f"cache:{name}", f"validity cache {name}", (n, "", "", "", ""))
+        live = {f"span:{name}" for name in snapshot["spans"]} | {f"count:{name}" for name in snapshot["counters"]} | {f"cache:{name}" for name in cache_stats}
+        stale = [iid for iid in self.tree.get_children() if iid not in live] # After a reset
+        if stale: self.tree.delete(*stale)
+        self._refresh_job = self.after(DIAGNOSTICS_REFRESH_MS, self._refresh)
+
+    def on_close(self):
+        if self._refresh_job: self.after_cancel(self._refresh_job); self._refresh_job = None
+        self.parent_app.diagnostics_window = None
+        self.destroy()
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    HAS_ADMIN = is_admin() # Probed once; nothing below can change it
+    instrument.event("app.is_admin", is_admin=HAS_ADMIN)
+    app = JunctionApp(running_as_admin=HAS_ADMIN, instance_server=INSTANCE_SERVER, launch_request=LAUNCH.request if any(LAUNCH.request.values()) else None)
+    app.after_idle(app.run_startup_checks) # Queued behind the first paint
     app.mainloop()
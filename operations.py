@@ -0,0 +1,169 @@
+"""Background queue for single junction creations (the main window's Create and Relocate buttons).
+
+Creating a link can block for a long time (mklink against a slow or network volume), so the Tk
+thread only submits an Operation and goes back to painting. One worker thread runs operations in
+submission order: the filesystem checks, then backend.create. A successful link is handed to a
+second, single-thread finisher that verifies it and records it in the history, so persistence
+overlaps with the next queued creation while history writes keep their order.
+
+A relocate operation (OP_RELOCATE) first moves the folder at the link path to the source path with
+relocate.relocate(), reporting copy progress as OP_RUNNING events, then is recorded like a creation.
+
+Every state change is reported as an OperationEvent through on_event, called from the worker or
+finisher thread; GUI callers pass queue.Queue.put and pick the events up with after().
+Pending operations can be cancelled, and so can a running relocation (it resumes from its checkpoint
+next time); a running mklink can't be interrupted and always finishes.
+"""
+import os
+import sys
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import count
+
+import instrument
+import relocate
+from batch import BatchItem, validate_item
+from link_backends import LINK_OK, LINK_FAILED, LINK_INVALID_NAME
+
+OP_PENDING = "pending"
+OP_RUNNING = "running"
+OP_DONE = "done"
+OP_FAILED = "failed"
+OP_CANCELLED = "cancelled"
+OP_FINISHED = (OP_DONE, OP_FAILED, OP_CANCELLED)
+
+OP_CREATE = "create"     # Link to an existing source
+OP_RELOCATE = "relocate" # Move the folder at the link path to the source path, then link
+
+# A snapshot of one operation after a state change; entry is the history record for OP_DONE, else None
+OperationEvent = namedtuple("OperationEvent", "id kind state source link code message entry")
+
+
+class Operation:
+    __slots__ = ("id", "kind", "item", "state", "code", "message", "entry", "cancel_event")
+    def __init__(self, op_id, kind, item):
+        self.id = op_id; self.kind = kind; self.item = item; self.state = OP_PENDING; self.code = None; self.message = "Queued."; self.entry = None
+        self.cancel_event = threading.Event()
+
+    def event(self):
+        return OperationEvent(self.id, self.kind, self.state, self.item.source, self.item.link, self.code, self.message, self.entry)
+
+
+class OperationQueue:
+    """submit() from any thread; backend creates links, record(entry) persists a finished one (False = not saved)."""
+    def __init__(self, backend, record=None, on_event=None, invalidate=None, checkpoint_dir=None):
+        self.backend = backend; self.record = record; self.on_event = on_event; self.invalidate = invalidate; self.checkpoint_dir = checkpoint_dir
+        self._pending = deque(); self._active = {} # normcase(link) -> Operation, until it's finished
+        self._ids = count(1); self._lock = threading.Lock(); self._wake = threading.Condition(self._lock)
+        self._stopped = False; self._worker = None
+        self._finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="LinkForgeOpFinish")
+
+    # --- Submitting ---
+    def submit(self, source, parent, name, kind=OP_CREATE):
+        """Queues one link; returns its Operation, or None if the same link is already queued or running."""
+        link = os.path.normpath(os.path.join(parent, name)) if parent and name else ""
+        key = os.path.normcase(link)
+        with self._lock:
+            if self._stopped: raise RuntimeError("Operation queue is shut down.")
+            if link and key in self._active: return None
+            op = Operation(next(self._ids), kind, BatchItem(0, source, parent, name, link))
+            if link: self._active[key] = op
+            self._pending.append(op)
+            if self._worker is None: # Started with the first operation, so an idle app has no extra thread
+                self._worker = threading.Thread(target=self._run, name="LinkForgeOperations", daemon=True); self._worker.start()
+            self._wake.notify()
+        self._emit(op)
+        return op
+
+    def cancel(self, op_id):
+        """Cancels a pending operation or asks a running relocation to stop. Returns False if neither applies."""
+        with self._lock:
+            op = next((op for op in self._pending if op.id == op_id), None)
+            if op is None:
+                running = next((op for op in self._active.values() if op.id == op_id and op.state == OP_RUNNING and op.kind == OP_RELOCATE), None)
+                if running is None: return False
+                running.cancel_event.set(); return True # The relocation reports OP_CANCELLED once its workers have stopped
+            self._pending.remove(op); self._finish(op, OP_CANCELLED, None, "Cancelled.")
+        self._emit(op)
+        return True
+
+    def in_flight(self, link):
+        """True while an operation for this link path is pending, running or being recorded."""
+        with self._lock: return os.path.normcase(os.path.normpath(link)) in self._active
+
+    def busy(self):
+        with self._lock: return bool(self._active)
+
+    def shutdown(self, wait=True):
+        """Cancels what hasn't started and waits for finished links to be recorded (not for a running mklink)."""
+        with self._lock:
+            self._stopped = True; cancelled = list(self._pending); self._pending.clear()
+            for op in cancelled: self._finish(op, OP_CANCELLED, None, "Cancelled.")
+            for op in self._active.values(): op.cancel_event.set() # A relocation stops at its next checkpoint
+            self._wake.notify()
+        for op in cancelled: self._emit(op)
+        self._finisher.shutdown(wait=wait)
+
+    # --- Worker side ---
+    def _emit(self, op):
+        if self.on_event:
+            try: self.on_event(op.event())
+            except Exception as e: print(f"Error reporting operation {op.id}: {e}", file=sys.stderr)
+
+    def _finish(self, op, state, code, message): # Caller holds the lock
+        op.state = state; op.code = code; op.message = message
+        key = os.path.normcase(op.item.link)
+        if self._active.get(key) is op: del self._active[key]
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._stopped: self._wake.wait()
+                if not self._pending: return
+                op = self._pending.popleft(); op.state = OP_RUNNING; op.message = "Creating…"
+            self._emit(op)
+            try: self._relocate(op) if op.kind == OP_RELOCATE else self._create(op)
+            except Exception as e: self._fail(op, LINK_FAILED, f"{type(e).__name__}: {e}")
+
+    def _create(self, op):
+        item = op.item
+        problem = validate_item(item) # The filesystem checks the Create button used to make on the Tk thread
+        if problem: self._fail(op, *problem); return
+        with instrument.span("link.create", backend=self.backend.name): result = self.backend.create(item.link, item.source)
+        if not result.ok: self._fail(op, result.code, result.message); return
+        self._hand_off(op, f"'{item.name}' -> '{item.source}'")
+
+    def _relocate(self, op):
+        item = op.item
+        if not all([item.source, item.parent, item.name]): self._fail(op, LINK_INVALID_NAME, "All fields required."); return
+        def progress(p):
+            op.message = relocate.describe_progress(p); self._emit(op)
+        result = relocate.relocate(item.link, item.source, self.backend, checkpoint_dir=self.checkpoint_dir, on_progress=progress, cancel_event=op.cancel_event)
+        if result.ok: self._hand_off(op, result.message); return
+        if result.code != relocate.RELOCATE_CANCELLED: self._fail(op, result.code, result.message); return
+        with self._lock: self._finish(op, OP_CANCELLED, result.code, result.message)
+        self._emit(op)
+
+    def _hand_off(self, op, message):
+        try: self._finisher.submit(self._record, op, message)
+        except RuntimeError: self._record(op, message) # Shut down while mklink ran: record it here instead
+
+    def _record(self, op, message):
+        item = op.item
+        if not os.path.lexists(item.link): self._fail(op, LINK_FAILED, f"{self.backend.name} reported success but the link is missing: {item.link}"); return
+        entry = {"source": item.source, "link": item.link, "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        if op.kind == OP_RELOCATE: entry["origin"] = OP_RELOCATE
+        if self.invalidate: self.invalidate(link_path=item.link)
+        if self.record:
+            try: saved = self.record(entry) is not False # core.append_history reports failure by returning False
+            except Exception as e: print(f"Error saving history for {item.link}: {e}", file=sys.stderr); saved = False
+            if not saved: message += " (not saved to history)"; entry = None
+        op.entry = entry
+        with self._lock: self._finish(op, OP_DONE, LINK_OK, message)
+        self._emit(op)
+
+    def _fail(self, op, code, message):
+        with self._lock: self._finish(op, OP_FAILED, code, message)
+        self._emit(op)
@@ -0,0 +1,370 @@
+"""Relocate and link: move a folder to another place (usually another drive) and leave a junction behind.
+
+relocate(folder, destination, backend):
+  1. walks `folder` into a plan of directories, files and nested links,
+  2. creates the directory tree under `destination` and copies the files on a thread pool: big files
+     one per task in RELOCATE_CHUNK slices (copy_file_range / sendfile where the OS has them, a reused
+     readinto buffer elsewhere), small files grouped so thousands of them don't mean thousands of tasks,
+  3. fsyncs every finished file, then appends it to a (likewise fsynced) checkpoint journal, so a
+     cancelled or crashed move resumes by copying only what's missing or has changed since; the copy's
+     directories are fsynced too before the original is touched,
+  4. verifies the copy (sizes and mtimes by default, or full content),
+  5. swaps: renames `folder` aside, creates the link at its old path and deletes the original; if the
+     link can't be made the original is renamed back, so the folder is never left missing.
+
+Progress is reported through on_progress(RelocateProgress) from worker threads, at most every
+RELOCATE_PROGRESS_INTERVAL seconds. Nothing here touches the history; callers record the link.
+"""
+import errno
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import instrument
+from link_backends import LINK_OK, LINK_EXISTS, LINK_NOT_FOUND, LINK_INVALID_NAME, LINK_FAILED
+from validity import is_link_stat, read_link_target
+
+RELOCATE_WORKERS = 8                    # Files copied at once
+RELOCATE_CHUNK = 8 * 1024 * 1024        # Bytes per copy call for big files (and per progress step)
+RELOCATE_BUFFER = 1024 * 1024           # readinto buffer when there's no in-kernel copy
+RELOCATE_SMALL_FILE = 1024 * 1024       # Files below this are copied in groups...
+RELOCATE_GROUP_FILES = 256              # ...of at most this many files
+RELOCATE_GROUP_BYTES = 32 * 1024 * 1024 # ...or this many bytes
+RELOCATE_PROGRESS_INTERVAL = 0.2        # Seconds between progress reports
+RELOCATE_ASIDE_SUFFIX = ".linkforge-old" # The original folder's name while the link replaces it
+
+RELOCATE_CANCELLED = "cancelled"
+RELOCATE_VERIFY_FAILED = "verify_failed"
+
+PHASE_SCAN = "scan"
+PHASE_COPY = "copy"
+PHASE_VERIFY = "verify"
+PHASE_SWAP = "swap"
+
+RelocateProgress = namedtuple("RelocateProgress", "phase bytes_done bytes_total files_done files_total")
+RelocateResult = namedtuple("RelocateResult", "ok code message files bytes copied_bytes seconds")
+RelocatePlan = namedtuple("RelocatePlan", "dirs files links bytes") # files: (rel, size, mtime_ns); links: (rel, target, is_dir)
+
+
+class RelocateError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message); self.code = code
+
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB": return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+def describe_progress(progress):
+    """One line for a status bar or log row."""
+    if progress.phase == PHASE_SCAN: return f"Scanning… {progress.files_total} files"
+    if progress.phase == PHASE_SWAP: return "Replacing the folder with a link…"
+    verb = "Verifying" if progress.phase == PHASE_VERIFY else "Copying"
+    percent = 100 * progress.bytes_done / progress.bytes_total if progress.bytes_total else 100
+    return f"{verb} {percent:.0f}% ({format_bytes(progress.bytes_done)} of {format_bytes(progress.bytes_total)}, {progress.files_done}/{progress.files_total} files)"
+
+
+# --- Planning ---
+def check_paths(folder, destination):
+    """The checks relocate() makes before touching anything. Returns (code, message) or None."""
+    if not os.path.isdir(folder): return (LINK_NOT_FOUND, f"Folder to move not found: {folder}")
+    if is_link_stat(os.lstat(folder)): return (LINK_EXISTS, f"Already a link: {folder}")
+    a = os.path.normcase(os.path.abspath(folder)); b = os.path.normcase(os.path.abspath(destination))
+    if a == b or b.startswith(a.rstrip(os.sep) + os.sep) or a.startswith(b.rstrip(os.sep) + os.sep):
+        return (LINK_INVALID_NAME, "The destination can't be the folder itself or inside it (or the other way round).")
+    if not os.path.isdir(os.path.dirname(os.path.abspath(destination))): return (LINK_NOT_FOUND, f"Destination parent not found: {os.path.dirname(destination)}")
+    return None
+
+def plan_tree(folder, on_progress=None, cancel_event=None):
+    """Lists everything under `folder`. Nested links are recorded, not followed."""
+    dirs = []; files = []; links = []; total = 0; stack = [""]; last = time.monotonic()
+    while stack:
+        rel = stack.pop()
+        if cancel_event is not None and cancel_event.is_set(): raise RelocateError(RELOCATE_CANCELLED, "Cancelled.")
+        with os.scandir(os.path.join(folder, rel) if rel else folder) as it:
+            for entry in it:
+                child = os.path.join(rel, entry.name) if rel else entry.name
+                st = entry.stat(follow_symlinks=False)
+                if is_link_stat(st):
+                    target = read_link_target(entry.path)
+                    if target is None: raise RelocateError(LINK_FAILED, f"Can't read the link target of {entry.path}")
+                    links.append((child, target, entry.is_dir()))
+                elif entry.is_dir(follow_symlinks=False): dirs.append(child); stack.append(child)
+                else: files.append((child, st.st_size, st.st_mtime_ns)); total += st.st_size
+        if on_progress and time.monotonic() - last >= RELOCATE_PROGRESS_INTERVAL:
+            last = time.monotonic(); on_progress(RelocateProgress(PHASE_SCAN, 0, total, 0, len(files)))
+    return RelocatePlan(dirs, files, links, total)
+
+
+# --- Checkpoints ---
+def checkpoint_path(checkpoint_dir, folder, destination):
+    key = os.path.normcase(os.path.abspath(folder)) + "\0" + os.path.normcase(os.path.abspath(destination))
+    return os.path.join(checkpoint_dir, hashlib.sha1(key.encode("utf-8")).hexdigest()[:16] + ".jsonl")
+
+def read_checkpoint(path, folder, destination):
+    """{rel: (size, mtime_ns)} of files a previous run finished copying, or None if there's no usable checkpoint."""
+    done = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("folder") != os.path.abspath(folder) or header.get("destination") != os.path.abspath(destination): return None
+            for line in f:
+                try: rel, size, mtime_ns = json.loads(line)
+                except ValueError: continue # A line cut short by the interruption; that file is simply copied again
+                done[rel] = (size, mtime_ns)
+    except FileNotFoundError: return None
+    except (OSError, ValueError) as e: print(f"Error reading relocate checkpoint {path}: {e}", file=sys.stderr); return None
+    return done
+
+
+class _Checkpoint:
+    """Append-only journal of finished files; written by the copy workers."""
+    def __init__(self, path, folder, destination, resume):
+        self.path = path; self._lock = threading.Lock(); self._file = None
+        if path is None: return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+        if resume: self._file.write("\n") # Ends a line the interruption may have cut short
+        else:
+            self._file.write(json.dumps({"folder": os.path.abspath(folder), "destination": os.path.abspath(destination)}) + "\n")
+            self._file.flush(); os.fsync(self._file.fileno()); _fsync_dir(os.path.dirname(path))
+
+    def add(self, finished):
+        if self._file is None or not finished: return
+        text = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in finished)
+        with self._lock: self._file.write(text); self._file.flush(); os.fsync(self._file.fileno()) # Per group: a crash loses at most the group in flight
+
+    def close(self, remove=False):
+        if self._file is not None: self._file.close(); self._file = None
+        if remove and self.path:
+            try: os.remove(self.path)
+            except OSError: pass
+
+
+# --- Copying ---
+_fast_copy = "copy_file_range" if hasattr(os, "copy_file_range") else "sendfile" if sys.platform.startswith("linux") else None
+_FAST_COPY_UNSUPPORTED = (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF)
+_buffers = threading.local()
+
+def _fsync_dir(dir_path):
+    # Makes the names in a directory durable. Not possible (or needed) on Windows, where NTFS journals them.
+    if os.name == 'nt': return
+    fd = os.open(dir_path, os.O_RDONLY)
+    try: os.fsync(fd)
+    finally: os.close(fd)
+
+def _fsync_file(path):
+    fd = os.open(path, os.O_RDWR if os.name == 'nt' else os.O_RDONLY) # Windows only flushes handles opened for writing
+    try: os.fsync(fd)
+    finally: os.close(fd)
+
+def copy_file(src, dst, size, on_bytes=None, cancel_event=None):
+    """Copies one file's data (then its timestamps and mode) and fsyncs it, so it's on disk before the
+    checkpoint says so. on_bytes(n) is called as data lands."""
+    global _fast_copy
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        copied = 0; method = _fast_copy
+        while copied < size:
+            if cancel_event is not None and cancel_event.is_set(): raise RelocateError(RELOCATE_CANCELLED, "Cancelled.")
+            count = min(RELOCATE_CHUNK, size - copied)
+            if method is not None:
+                try:
+                    if method == "copy_file_range": n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), count)
+                    else: n = os.sendfile(fdst.fileno(), fsrc.fileno(), None, count)
+                except OSError as e:
+                    if e.errno not in _FAST_COPY_UNSUPPORTED or copied: raise
+                    method = None # This pair of filesystems can't; use the buffer for the rest of this file
+                    if e.errno == errno.ENOSYS: _fast_copy = None # Nor can any other
+                    continue
+            else:
+                buffer = getattr(_buffers, "view", None)
+                if buffer is None: buffer = _buffers.view = memoryview(bytearray(RELOCATE_BUFFER))
+                n = fsrc.readinto(buffer[:min(count, RELOCATE_BUFFER)])
+                if n: fdst.write(buffer[:n])
+            if not n: break # The file changed since it was planned; verification will catch it
+            copied += n
+            if on_bytes: on_bytes(n)
+    shutil.copystat(src, dst)
+    _fsync_file(dst) # After copystat, so the timestamps verification relies on are durable too
+    return copied
+
+def _same_content(a, b):
+    with open(a, 'rb') as fa, open(b, 'rb') as fb:
+        while True:
+            x = fa.read(RELOCATE_BUFFER); y = fb.read(RELOCATE_BUFFER)
+            if x != y: return False
+            if not x: return True
+
+def _tasks(files):
+    """Big files one per task (largest first, so the pool doesn't end on one long copy), small ones in groups."""
+    big = sorted((f for f in files if f[1] >= RELOCATE_SMALL_FILE), key=lambda f: f[1], reverse=True)
+    tasks = [[f] for f in big]; group = []; group_bytes = 0
+    for f in files:
+        if f[1] >= RELOCATE_SMALL_FILE: continue
+        group.append(f); group_bytes += f[1]
+        if len(group) >= RELOCATE_GROUP_FILES or group_bytes >= RELOCATE_GROUP_BYTES: tasks.append(group); group = []; group_bytes = 0
+    if group: tasks.append(group)
+    return tasks
+
+
+class _Progress:
+    def __init__(self, phase, bytes_total, files_total, on_progress):
+        self.phase = phase; self.bytes_total = bytes_total; self.files_total = files_total; self.on_progress = on_progress
+        self.bytes_done = 0; self.files_done = 0; self._lock = threading.Lock(); self._last = 0.0
+
+    def add(self, n_bytes=0, n_files=0):
+        with self._lock:
+            self.bytes_done += n_bytes; self.files_done += n_files
+            now = time.monotonic()
+            if not self.on_progress or now - self._last < RELOCATE_PROGRESS_INTERVAL: return
+            self._last = now; snapshot = self.snapshot()
+        self.on_progress(snapshot)
+
+    def snapshot(self):
+        return RelocateProgress(self.phase, self.bytes_done, self.bytes_total, self.files_done, self.files_total)
+
+    def report(self):
+        if self.on_progress: self.on_progress(self.snapshot())
+
+
+def _run_pool(tasks, fn, workers, cancel_event):
+    """Runs fn(task) for every task; the first error cancels the rest and is raised."""
+    if not tasks: return
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tasks))), thread_name_prefix="LinkForgeRelocate") as executor:
+        futures = [executor.submit(fn, task) for task in tasks]
+        try:
+            for future in futures: future.result()
+        except BaseException:
+            cancel_event.set() # Queued tasks see it and return at once
+            for future in futures: future.cancel()
+            raise
+
+
+# --- Relocating ---
+@instrument.timed("relocate.run")
+def relocate(folder, destination, backend, workers=RELOCATE_WORKERS, verify="size", keep_original=False,
+             checkpoint_dir=None, on_progress=None, cancel_event=None):
+    """Moves `folder` to `destination` and creates a link from `folder` to it. Returns a RelocateResult.
+
+    verify: "size" compares sizes and mtimes of every copied file, "content" compares the bytes too.
+    With checkpoint_dir set, finished files are journaled there and a later call with the same
+    folder/destination only copies the rest; the journal is removed once the link is in place.
+    """
+    started = time.monotonic(); user_cancel = cancel_event or threading.Event(); stop = threading.Event()
+    plan = None; copied_bytes = 0
+    def result(ok, code, message):
+        return RelocateResult(ok, code, message, len(plan.files) if plan else 0, plan.bytes if plan else 0, copied_bytes, round(time.monotonic() - started, 3))
+    problem = check_paths(folder, destination)
+    if problem: return result(False, *problem)
+    folder = os.path.abspath(folder); destination = os.path.abspath(destination)
+    journal_path = checkpoint_path(checkpoint_dir, folder, destination) if checkpoint_dir else None
+    done = read_checkpoint(journal_path, folder, destination) if journal_path else None
+    if os.path.lexists(destination) and done is None:
+        if not os.path.isdir(destination) or is_link_stat(os.lstat(destination)) or os.listdir(destination):
+            return result(False, LINK_EXISTS, f"Destination already exists and isn't empty: {destination}")
+    checkpoint = None
+    try:
+        with instrument.span("relocate.plan"): plan = plan_tree(folder, on_progress, user_cancel)
+        # Copy
+        os.makedirs(destination, exist_ok=True)
+        for rel in plan.dirs: os.makedirs(os.path.join(destination, rel), exist_ok=True)
+        todo = []; skipped_bytes = 0
+        for f in plan.files:
+            rel, size, mtime_ns = f
+            if done and done.get(rel) == (size, mtime_ns):
+                try:
+                    if os.stat(os.path.join(destination, rel)).st_size == size: skipped_bytes += size; continue
+                except OSError: pass
+            todo.append(f)
+        checkpoint = _Checkpoint(journal_path, folder, destination, resume=done is not None)
+        progress = _Progress(PHASE_COPY, plan.bytes, len(plan.files), on_progress); progress.add(skipped_bytes, len(plan.files) - len(todo)); progress.report()
+        def copy_group(group):
+            nonlocal copied_bytes
+            finished = []
+            try:
+                for rel, size, mtime_ns in group:
+                    if stop.is_set() or user_cancel.is_set(): return
+                    n = copy_file(os.path.join(folder, rel), os.path.join(destination, rel), size,
+                                  on_bytes=progress.add if size >= RELOCATE_SMALL_FILE else None, cancel_event=user_cancel)
+                    if size < RELOCATE_SMALL_FILE: progress.add(n, 1)
+                    else: progress.add(0, 1)
+                    copied_bytes += n # Approximate under threads; only reported
+                    finished.append((rel, size, mtime_ns))
+            except RelocateError: raise
+            except OSError as e: raise RelocateError(LINK_FAILED, f"Copy failed: {e}")
+            finally: checkpoint.add(finished)
+        with instrument.span("relocate.copy", files=len(todo)): _run_pool(_tasks(todo), copy_group, workers, stop)
+        if user_cancel.is_set(): raise RelocateError(RELOCATE_CANCELLED, "Cancelled; run it again to resume.")
+        for rel, target, is_dir in plan.links: _copy_link(folder, destination, rel, target, is_dir, backend)
+        for rel in reversed(plan.dirs): shutil.copystat(os.path.join(folder, rel), os.path.join(destination, rel)) # Deepest first: files and subfolders are done
+        shutil.copystat(folder, destination)
+        with instrument.span("relocate.sync", dirs=len(plan.dirs)): # Files are already synced; make every name in the copy durable too
+            for rel in reversed(plan.dirs): _fsync_dir(os.path.join(destination, rel))
+            _fsync_dir(destination); _fsync_dir(os.path.dirname(destination))
+        progress.report()
+        # Verify
+        with instrument.span("relocate.verify", mode=verify): _verify(folder, destination, plan, verify, workers, on_progress, user_cancel)
+        # Swap
+        if on_progress: on_progress(RelocateProgress(PHASE_SWAP, plan.bytes, plan.bytes, len(plan.files), len(plan.files)))
+        message = _swap(folder, destination, backend, keep_original)
+        checkpoint.close(remove=True); checkpoint = None
+        return result(True, LINK_OK, message)
+    except RelocateError as e: return result(False, e.code, str(e))
+    except OSError as e: return result(False, LINK_FAILED, f"{e.strerror or e}: {e.filename or folder}")
+    finally:
+        if checkpoint is not None: checkpoint.close()
+
+def _copy_link(folder, destination, rel, target, is_dir, backend):
+    """Recreates a nested link; targets inside the moved folder are pointed at their new place."""
+    path = os.path.join(destination, rel)
+    if os.path.lexists(path): return # Made by an earlier, interrupted run
+    inside = os.path.normcase(target).startswith(os.path.normcase(folder.rstrip(os.sep) + os.sep))
+    if inside: target = os.path.join(destination, os.path.relpath(target, folder))
+    if is_dir:
+        made = backend.create(path, target)
+        if not made.ok: raise RelocateError(made.code, f"Couldn't recreate the link {path}: {made.message}")
+    else: os.symlink(target, path)
+
+def _verify(folder, destination, plan, mode, workers, on_progress, cancel_event):
+    progress = _Progress(PHASE_VERIFY, plan.bytes, len(plan.files), on_progress); stop = threading.Event()
+    def check(group):
+        for rel, size, mtime_ns in group:
+            if stop.is_set() or cancel_event.is_set(): return
+            src = os.path.join(folder, rel); dst = os.path.join(destination, rel)
+            now = os.stat(src)
+            if (now.st_size, now.st_mtime_ns) != (size, mtime_ns): raise RelocateError(RELOCATE_VERIFY_FAILED, f"Changed while it was copied: {src}. Run it again to copy the changes.")
+            try: copy = os.stat(dst)
+            except FileNotFoundError: raise RelocateError(RELOCATE_VERIFY_FAILED, f"Missing from the copy: {dst}")
+            if copy.st_size != size or abs(copy.st_mtime_ns - mtime_ns) > 2000000000: # FAT keeps times to 2 seconds
+                raise RelocateError(RELOCATE_VERIFY_FAILED, f"Copy doesn't match the original: {dst}")
+            if mode == "content" and not _same_content(src, dst): raise RelocateError(RELOCATE_VERIFY_FAILED, f"Content differs: {dst}")
+            progress.add(size, 1)
+    _run_pool(_tasks(plan.files), check, workers, stop)
+    if cancel_event.is_set(): raise RelocateError(RELOCATE_CANCELLED, "Cancelled; run it again to resume.")
+    for rel, target, is_dir in plan.links:
+        if not os.path.lexists(os.path.join(destination, rel)): raise RelocateError(RELOCATE_VERIFY_FAILED, f"Missing link in the copy: {rel}")
+    progress.report()
+
+def _swap(folder, destination, backend, keep_original):
+    """Renames the original aside, links its old path to the copy, then removes (or keeps) the original."""
+    aside = folder + RELOCATE_ASIDE_SUFFIX; n = 1
+    while os.path.lexists(aside): n += 1; aside = f"{folder}{RELOCATE_ASIDE_SUFFIX}{n}"
+    try: os.rename(folder, aside) # Same volume, so it's a rename in place; fails cleanly if something holds a file open
+    except OSError as e: raise RelocateError(LINK_FAILED, f"Couldn't move the original folder aside ({e.strerror or e}); is a file in it open? The copy is complete at {destination}.")
+    made = backend.create(folder, destination)
+    if not made.ok or not os.path.lexists(folder):
+        try: os.rename(aside, folder)
+        except OSError as e: raise RelocateError(LINK_FAILED, f"Link failed ({made.message}) and the original couldn't be restored from {aside}: {e}")
+        raise RelocateError(made.code if not made.ok else LINK_FAILED, f"Link failed, original folder left in place: {made.message}")
+    if keep_original: return f"Moved to {destination}; original kept at {aside}."
+    errors = []
+    shutil.rmtree(aside, onerror=lambda fn, path, exc: errors.append(path))
+    if errors: return f"Moved to {destination}; {len(errors)} item(s) of the original couldn't be deleted from {aside}."
+    return f"Moved to {destination}."
@@ -0,0 +1,121 @@
+"""Finding junctions that LinkForge didn't create.
+
+scan_roots() walks directory trees with os.scandir on a worker pool, one directory per task, and
+reports every junction (or, off Windows, directory symlink) it finds. Links are never followed:
+anything check_junction_validity would call a link is recorded and not descended into. Depth
+limits and exclusion globs bound the walk. Like batch.run_batch it never touches the history
+itself; history_entries() turns the finds into records for one bulk store update.
+"""
+import fnmatch
+import os
+import stat
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+from validity import is_link_stat, read_link_target
+
+SCAN_WORKERS = 8
+SCAN_MAX_DEPTH = 8      # Levels below each root that are listed (the root itself is depth 0)
+SCAN_DEFAULT_EXCLUDES = ("?:\\Windows", "$Recycle.Bin", "System Volume Information", "/proc", "/sys", "/dev", ".git", "node_modules")
+
+FILE_ATTRIBUTE_DIRECTORY = 0x0010
+IO_REPARSE_TAG_MOUNT_POINT = 0xA0000003
+IO_REPARSE_TAG_SYMLINK = 0xA000000C
+
+FoundLink = namedtuple("FoundLink", "link target kind")        # kind: "junction" or "symlink"
+ScanReport = namedtuple("ScanReport", "found dirs_scanned errors cancelled")
+
+
+def is_excluded(path, excludes):
+    """Globs with a path separator match the whole path, others just the folder name (case-insensitive on Windows)."""
+    name = os.path.basename(path)
+    for pattern in excludes:
+        if fnmatch.fnmatch(path if ("\\" in pattern or "/" in pattern) else name, pattern): return True
+    return False
+
+def _found_link(path, st):
+    """FoundLink for a directory link, or None for other reparse points (cloud placeholders, file symlinks)."""
+    tag = getattr(st, 'st_reparse_tag', None)
+    if tag is not None: # Windows
+        if tag == IO_REPARSE_TAG_MOUNT_POINT: kind = "junction"
+        elif tag == IO_REPARSE_TAG_SYMLINK and st.st_file_attributes & FILE_ATTRIBUTE_DIRECTORY: kind = "symlink"
+        else: return None
+    else:
+        try:
+            if not stat.S_ISDIR(os.stat(path).st_mode): return None # Symlink to a file
+        except OSError: pass # Dangling: still worth reporting
+        kind = "symlink"
+    return FoundLink(path, read_link_target(path), kind)
+
+def _scan_dir(path, depth, max_depth, excludes):
+    """Lists one directory. Returns (links, (subdir, depth) pairs to walk next, error or None)."""
+    links = []; subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if excludes and is_excluded(entry.path, excludes): continue
+                try:
+                    if os.name == 'nt': st = entry.stat(follow_symlinks=False); is_link = is_link_stat(st) # Free on Windows: comes with the listing
+                    else: st = None; is_link = entry.is_symlink() # d_type, no lstat per entry
+                    if is_link:
+                        found = _found_link(entry.path, st if st is not None else entry.stat(follow_symlinks=False))
+                        if found: links.append(found)
+                    elif entry.is_dir(follow_symlinks=False) and (max_depth is None or depth < max_depth): subdirs.append((entry.path, depth + 1))
+                except OSError: continue
+    except OSError as e: return links, subdirs, (path, e)
+    return links, subdirs, None
+
+
+def scan_roots(roots, max_depth=SCAN_MAX_DEPTH, excludes=SCAN_DEFAULT_EXCLUDES, workers=SCAN_WORKERS, on_found=None, on_progress=None, cancel_event=None):
+    """Walks `roots` in parallel and returns a ScanReport.
+
+    on_found(found_link) is called for each link and on_progress(dirs_scanned, links_found, dirs_queued)
+    after each directory, both from the calling thread. Setting cancel_event stops queuing new directories.
+    """
+    cancel_event = cancel_event or threading.Event()
+    found = []; errors = []; dirs_scanned = 0
+
+    def report(link):
+        found.append(link)
+        if on_found: on_found(link)
+
+    start = []
+    for root in roots:
+        root = os.path.normpath(os.path.abspath(root))
+        try: st = os.lstat(root)
+        except OSError as e: errors.append((root, e)); continue
+        if is_link_stat(st): # A root that is itself a link is reported, not entered
+            link = _found_link(root, st)
+            if link: report(link)
+        elif stat.S_ISDIR(st.st_mode): start.append(root)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="LinkForgeScan") as executor:
+        pending = {executor.submit(_scan_dir, root, 0, max_depth, excludes) for root in start}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                links, subdirs, error = future.result(); dirs_scanned += 1
+                if error: errors.append(error)
+                for link in links: report(link)
+                if not cancel_event.is_set():
+                    for subdir, depth in subdirs: pending.add(executor.submit(_scan_dir, subdir, depth, max_depth, excludes))
+            if cancel_event.is_set():
+                for future in pending: future.cancel()
+                pending = {future for future in pending if not future.cancelled()}
+            if on_progress: on_progress(dirs_scanned, len(found), len(pending))
+    return ScanReport(found, dirs_scanned, errors, cancel_event.is_set())
+
+
+def history_entries(found, known_links=()):
+    """History records for found links that have a readable target and aren't tracked yet (by normalized link path)."""
+    known = {os.path.normcase(os.path.normpath(link)) for link in known_links}
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    entries = []
+    for link in found:
+        key = os.path.normcase(os.path.normpath(link.link))
+        if link.target is None or key in known: continue
+        known.add(key)
+        entries.append({"source": link.target, "link": link.link, "timestamp": timestamp, "origin": "scan"})
+    return entries
@@ -0,0 +1,147 @@
+"""Incremental index of how much data each junction source holds.
+
+SizeIndex keeps one row per directory under the tracked sources: its mtime, the bytes and file
+count of the files directly in it, and its subdirectories. A refresh still stats every directory,
+but only lists the ones whose mtime changed (a directory's mtime moves when entries are added,
+removed or renamed in it), so an unchanged multi-GB tree costs one stat per folder instead of one
+per file. Listings older than SIZE_RELIST_AFTER are redone anyway, to pick up files that grew in
+place. Directories are walked on a worker pool across all sources at once; links inside a source
+are not followed, so nothing is counted twice and loops can't happen.
+
+Rows live in a small SQLite database next to the history; per-source totals are also kept in
+memory, so get() is a dict lookup that the Tk thread can make at any time.
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import instrument
+from validity import is_link_stat
+
+SIZE_WORKERS = 8
+SIZE_RELIST_AFTER = 7 * 24 * 3600 # Seconds before an unchanged directory is listed again anyway
+
+SourceSize = namedtuple("SourceSize", "bytes files dirs scanned_at error") # error: text if the source couldn't be read (sizes are then partial)
+SizeProgress = namedtuple("SizeProgress", "sources_done sources_total dirs_done dirs_listed")
+
+
+def size_key(path):
+    return os.path.normcase(os.path.normpath(os.path.abspath(path)))
+
+def format_size(size):
+    """Column text for a SourceSize (or None while it hasn't been computed)."""
+    if size is None: return "…"
+    if size.error and not size.dirs: return "—"
+    n = float(size.bytes)
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if n < 1024 or unit == "TB": return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def _list_dir(path, known, now):
+    """Sizes up one directory. `known` is its stored row (mtime_ns, bytes, files, children, listed_at) or None.
+    Returns (path, row, listed, error); an unchanged directory is only stat'ed."""
+    try: st = os.stat(path)
+    except OSError as e: return path, None, False, e
+    if known is not None and known[0] == st.st_mtime_ns and now - known[4] < SIZE_RELIST_AFTER: return path, known, False, None
+    size = 0; files = 0; children = []
+    try:
+        with os.scandir(path) as it: # stat() above came first: a change during the listing leaves a newer mtime for next time
+            for entry in it:
+                try:
+                    if os.name == 'nt': st_entry = entry.stat(follow_symlinks=False); is_link = is_link_stat(st_entry) # Free on Windows
+                    else: st_entry = None; is_link = entry.is_symlink()
+                    if is_link: continue
+                    if entry.is_dir(follow_symlinks=False): children.append(entry.name)
+                    else: size += (st_entry or entry.stat(follow_symlinks=False)).st_size; files += 1
+                except OSError: continue
+    except OSError as e: return path, None, True, e
+    return path, (st.st_mtime_ns, size, files, children, now), True, None
+
+
+class SizeIndex:
+    def __init__(self, path):
+        self.path = path; self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False) # Used under _lock only
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER, bytes INTEGER, files INTEGER, children TEXT, listed_at REAL);
+            CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, bytes INTEGER, files INTEGER, dirs INTEGER, scanned_at REAL, error TEXT);
+        """)
+        self.totals = {row[0]: SourceSize(*row[1:]) for row in self._conn.execute("SELECT path, bytes, files, dirs, scanned_at, error FROM sources")}
+
+    def get(self, source):
+        return self.totals.get(size_key(source))
+
+    def close(self):
+        with self._lock: self._conn.close()
+
+    def _load_rows(self, root):
+        """Stored rows for `root` and everything below it."""
+        low = root.rstrip(os.sep) + os.sep; high = low[:-1] + chr(ord(os.sep) + 1)
+        with self._lock:
+            rows = self._conn.execute("SELECT path, mtime_ns, bytes, files, children, listed_at FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                                      (root, low, high)).fetchall()
+        return {path: (mtime_ns, size, files, json.loads(children), listed_at) for path, mtime_ns, size, files, children, listed_at in rows}
+
+    def _save(self, root, stored, rows, listed, total):
+        """One transaction per source: changed listings, vanished directories, the new total."""
+        gone = [(path,) for path in stored if path not in rows]
+        changed = [(path, *row[:3], json.dumps(row[3], ensure_ascii=False), row[4]) for path, row in rows.items() if path in listed]
+        with self._lock, self._conn:
+            if gone: self._conn.executemany("DELETE FROM dirs WHERE path = ?", gone)
+            if changed: self._conn.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?)", changed)
+            self._conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?, ?)", (root, *total))
+
+    @instrument.timed("sizes.refresh")
+    def refresh(self, sources, workers=SIZE_WORKERS, on_result=None, on_progress=None, cancel_event=None):
+        """Brings the totals for `sources` up to date. on_result(source, SourceSize) is called as each source
+        finishes and on_progress(SizeProgress) after each directory, both from the calling thread.
+        Returns the number of directories that had to be listed. Cancelling keeps what's finished."""
+        cancel_event = cancel_event or threading.Event(); now = time.time()
+        roots = {}
+        for source in sources:
+            if source: roots.setdefault(size_key(source), source)
+        state = {} # root -> [stored rows, new rows, listed paths, directories still queued, first error]
+        dirs_done = 0; dirs_listed = 0; sources_done = 0
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="LinkForgeSizes") as executor:
+            pending = {}
+            for root in roots:
+                stored = self._load_rows(root); state[root] = [stored, {}, set(), 1, None]
+                pending[executor.submit(_list_dir, root, stored.get(root), now)] = root
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    root = pending.pop(future); stored, rows, listed, queued, error = st = state[root]
+                    path, row, was_listed, e = future.result(); dirs_done += 1; st[3] -= 1
+                    if e is not None and st[4] is None and (path == root or not isinstance(e, FileNotFoundError)): # A subfolder deleted mid-walk is just gone
+                        st[4] = f"{path}: {e.strerror or e}"
+                    if row is not None:
+                        rows[path] = row
+                        if was_listed: listed.add(path); dirs_listed += 1
+                        if not cancel_event.is_set():
+                            for name in row[3]:
+                                child = os.path.join(path, name)
+                                pending[executor.submit(_list_dir, child, stored.get(child), now)] = root; st[3] += 1
+                    if st[3] == 0 and not cancel_event.is_set():
+                        sources_done += 1; total = self._finish(root, st, now)
+                        if on_result: on_result(roots[root], total)
+                if cancel_event.is_set():
+                    for future in list(pending):
+                        if future.cancel(): state[pending.pop(future)][3] -= 1
+                if on_progress: on_progress(SizeProgress(sources_done, len(roots), dirs_done, dirs_listed))
+        return dirs_listed
+
+    def _finish(self, root, st, now):
+        stored, rows, listed, queued, error = st
+        size = sum(row[1] for row in rows.values()); files = sum(row[2] for row in rows.values())
+        total = SourceSize(size, files, len(rows), now, error)
+        try: self._save(root, stored, rows, listed, total)
+        except sqlite3.Error as e: print(f"Error saving sizes for {root}: {e}", file=sys.stderr)
+        self.totals[root] = total
+        return total
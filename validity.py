@@ -0,0 +1,307 @@
+"""Junction validity checks and the cache that sits in front of them.
+
+check_junction_validity() returns (status_code, status_text):
+  0 Valid, 1 Link Missing, 2 Source Missing/Invalid, 3 Exists but not a link/junction, 4 Error,
+  5 Target Mismatch (the link points somewhere other than the recorded source).
+resolve_junction() returns the same plus the link's actual target, read with os.readlink (the
+reparse data of a junction on Windows, the symlink text elsewhere).
+
+ValidityCache remembers each (link, source) result together with the stat fingerprints it was
+derived from. Within the TTL a result is served without touching the disk; after that a cheap
+fingerprint comparison decides whether the old answer still holds. An optional watcher keeps
+the cache fresh by invalidating entries whose fingerprints change, so the TTL can be long.
+"""
+import os
+import stat
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import instrument
+
+FILE_ATTRIBUTE_REPARSE_POINT = 0x0400
+
+VALIDITY_CACHE_SIZE = 20000     # Max cached (link, source) pairs (LRU beyond that)
+VALIDITY_CACHE_TTL = 30.0       # Seconds a result is trusted without any filesystem access
+VALIDITY_WATCH_INTERVAL = 5.0   # Seconds between polling watcher sweeps
+VALIDITY_WATCH_BATCH = 500      # Entries fingerprinted per polling sweep, to spread out the I/O
+
+
+def check_junction_validity(link_path, source_path):
+    return resolve_junction(link_path, source_path)[0]
+
+@instrument.timed("validity.check")
+def resolve_junction(link_path, source_path):
+    """((status_code, status_text), target): the validity result and where the link actually points
+    (None when the link is missing, isn't a link, or its target can't be read)."""
+    try:
+        try: link_st = os.lstat(link_path) # One call answers both "exists?" and "is it a link?"
+        except (FileNotFoundError, NotADirectoryError): return (1, "Link Missing"), None # Other errors (access denied, ...) go to the handler below
+        if not is_link_stat(link_st): return (3, "Exists, Not Link/Junction"), None
+        try: source_st = os.stat(source_path)
+        except OSError: source_st = None
+        if source_st is None or not stat.S_ISDIR(source_st.st_mode): return (2, "Source Missing/Invalid"), read_link_target(link_path)
+        target = read_link_target(link_path)
+        if target is not None and not same_target(target, source_path, source_st): return (5, "Target Mismatch"), target
+        return (0, "Valid"), target
+    except Exception as e:
+        print(f"Error validating junction {link_path}: {e}", file=sys.stderr)
+        return (4, f"Validation Error ({type(e).__name__})"), None
+
+def same_target(target, source_path, source_st=None):
+    """Whether a link target is the recorded source. Compares normalized paths first; only when they
+    differ (8.3 names, a source recorded through another link, subst drives) does it stat the target."""
+    if _norm(target) == _norm(source_path): return True
+    try:
+        source_st = source_st or os.stat(source_path)
+        return os.path.samestat(os.stat(target), source_st)
+    except OSError: return False
+
+
+def is_link_stat(st):
+    """The link test check_junction_validity (and the junction scanner) use on an lstat result:
+    a reparse point on Windows, a symlink elsewhere."""
+    attributes = getattr(st, 'st_file_attributes', None)
+    if attributes is not None: return bool(attributes & FILE_ATTRIBUTE_REPARSE_POINT)
+    return stat.S_ISLNK(st.st_mode)
+
+def read_link_target(link_path):
+    """Where a junction or symlink points (absolute, without the \\??\\ prefix), or None if it can't be read."""
+    try: target = os.readlink(link_path)
+    except (OSError, ValueError, NotImplementedError): return None
+    if target.startswith("\\??\\UNC\\") or target.startswith("\\\\?\\UNC\\"): target = "\\\\" + target[8:]
+    elif target.startswith("\\??\\") or target.startswith("\\\\?\\"): target = target[4:]
+    if not os.path.isabs(target): target = os.path.join(os.path.dirname(link_path), target)
+    return os.path.normpath(target)
+
+
+def _stat_fingerprint(st):
+    return (st.st_mtime_ns, st.st_ino, st.st_dev, st.st_mode, getattr(st, 'st_file_attributes', 0))
+
+def path_fingerprint(link_path, source_path):
+    """Cheap identity of what a validity result depends on: lstat of the link, stat of the source."""
+    try: link_fp = _stat_fingerprint(os.lstat(link_path))
+    except OSError: link_fp = None
+    try: source_fp = _stat_fingerprint(os.stat(source_path))
+    except OSError: source_fp = None
+    return (link_fp, source_fp)
+
+
+class ValidityCache:
+    def __init__(self, max_entries=VALIDITY_CACHE_SIZE, ttl=VALIDITY_CACHE_TTL, check=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._resolve = (lambda link, source: (check(link, source), None)) if check else resolve_junction # A plain check caches no target
+        self._clock = clock
+        self._entries = OrderedDict() # (link, source) -> [result, fingerprint, checked_at, target]
+        self._by_path = {} # Normalized link, source and every folder above them -> keys, so watchers find what an event touches
+        self._lock = threading.Lock()
+        self.hits = 0; self.revalidated = 0; self.misses = 0
+
+    def check(self, link_path, source_path):
+        """Drop-in replacement for check_junction_validity that answers from the cache when it can."""
+        key = (link_path, source_path)
+        now = self._clock()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                if now - cached[2] < self.ttl: self.hits += 1; return cached[0]
+        fingerprint = path_fingerprint(link_path, source_path)
+        if cached is not None and cached[1] == fingerprint:
+            with self._lock:
+                cached[2] = now; self.revalidated += 1
+            return cached[0]
+        result, target = self._resolve(link_path, source_path)
+        with self._lock:
+            self.misses += 1
+            if result[0] == 4: # Don't pin transient errors
+                if self._entries.pop(key, None) is not None: self._unindex(key)
+                return result
+            if key not in self._entries: self._index(key)
+            self._entries[key] = [result, fingerprint, now, target] # Retargeting a link changes its lstat, so the fingerprint covers the target too
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries: self._unindex(self._entries.popitem(last=False)[0])
+        return result
+
+    def lookup_many(self, pairs):
+        """Results still within the TTL for a batch of (link, source) pairs, under a single lock and without
+        touching the disk (None for the rest), so the history window can call it on the Tk thread."""
+        results = [None] * len(pairs); now = self._clock()
+        with self._lock:
+            for i, key in enumerate(pairs):
+                cached = self._entries.get(key)
+                if cached is not None and now - cached[2] < self.ttl: self._entries.move_to_end(key); results[i] = cached[0]
+            self.hits += sum(1 for r in results if r is not None)
+        return results
+
+    def check_many(self, pairs):
+        """check() for a batch of (link, source) pairs: lookup_many(), then only the rest are fingerprinted
+        or resolved. Returns results in `pairs` order."""
+        pairs = list(pairs); results = self.lookup_many(pairs)
+        for i, (link_path, source_path) in enumerate(pairs):
+            if results[i] is None: results[i] = self.check(link_path, source_path)
+        return results
+
+    def target(self, link_path, source_path):
+        """The link's actual target as of its cached result (None if unknown or not cached)."""
+        with self._lock:
+            cached = self._entries.get((link_path, source_path))
+            return cached[3] if cached else None
+
+    def invalidate(self, link_path=None, source_path=None):
+        """Forgets entries for a link and/or source path; with no arguments forgets everything."""
+        with self._lock:
+            if link_path is None and source_path is None: self._entries.clear(); self._by_path.clear(); return
+            norm_link = _norm(link_path) if link_path else None
+            norm_source = _norm(source_path) if source_path else None
+            candidates = self._by_path.get(norm_link, set()) | self._by_path.get(norm_source, set())
+            for key in candidates:
+                if (norm_link and _norm(key[0]) == norm_link) or (norm_source and _norm(key[1]) == norm_source):
+                    del self._entries[key]; self._unindex(key)
+
+    def expire(self):
+        """Makes every entry due for a fingerprint re-check on next access (an explicit "refresh")."""
+        with self._lock:
+            for cached in self._entries.values(): cached[2] = float("-inf")
+
+    def keys(self):
+        with self._lock: return list(self._entries)
+
+    def keys_under(self, paths):
+        """Keys whose link or source is one of `paths` or lies inside one of them."""
+        with self._lock:
+            found = set()
+            for path in paths: found.update(self._by_path.get(_norm(path), ()))
+            return list(found)
+
+    def _index(self, key):
+        for path in key:
+            for folder in _self_and_parents(_norm(path)): self._by_path.setdefault(folder, set()).add(key)
+
+    def _unindex(self, key):
+        for path in key:
+            for folder in _self_and_parents(_norm(path)):
+                keys = self._by_path.get(folder)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys: del self._by_path[folder]
+
+    def fingerprint_of(self, key):
+        with self._lock:
+            cached = self._entries.get(key)
+            return cached[1] if cached else None
+
+    def drop_if_changed(self, key, fingerprint):
+        """Used by watchers: invalidates `key` if its stored fingerprint differs from `fingerprint`."""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[1] != fingerprint: del self._entries[key]; self._unindex(key); return True
+        return False
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# --- Watchers ---
+class PollingWatcher:
+    """Re-fingerprints cached entries in small batches on a background thread and drops stale ones.
+
+    Works everywhere (including Linux, where it's what gets tested); each sweep touches at most
+    VALIDITY_WATCH_BATCH entries so a large cache never causes a burst of disk I/O.
+    """
+    def __init__(self, cache, interval=VALIDITY_WATCH_INTERVAL, batch=VALIDITY_WATCH_BATCH, on_change=None):
+        self.cache = cache; self.interval = interval; self.batch = batch; self.on_change = on_change
+        self._stop = threading.Event(); self._thread = None; self._cursor = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="LinkForgeValidityWatch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def sweep(self):
+        """One polling pass over the next batch of cached keys. Returns the keys that were invalidated."""
+        keys = self.cache.keys()
+        if not keys: return []
+        if self._cursor >= len(keys): self._cursor = 0
+        batch = keys[self._cursor:self._cursor + self.batch]; self._cursor += len(batch)
+        changed = [key for key in batch if self.cache.drop_if_changed(key, path_fingerprint(*key))]
+        if changed and self.on_change: self.on_change(changed)
+        return changed
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try: self.sweep()
+            except Exception as e: print(f"Validity watcher error: {e}", file=sys.stderr)
+
+
+class NativeWatcher:
+    """Filesystem-notification watcher built on the optional `watchdog` package.
+
+    Watches the folders that contain each cached link and each cached source (non-recursively),
+    so creating, deleting or renaming either one invalidates the matching entries right away.
+    """
+    def __init__(self, cache, interval=VALIDITY_WATCH_INTERVAL, on_change=None):
+        from watchdog.observers import Observer # Optional dependency; ImportError means "use polling"
+        self.cache = cache; self.interval = interval; self.on_change = on_change
+        self._observer = Observer(); self._watched = set(); self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        self._observer.start(); self.sync()
+        threading.Thread(target=self._sync_loop, name="LinkForgeValidityWatchSync", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set(); self._observer.stop()
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.interval):
+            try: self.sync()
+            except Exception as e: print(f"Validity watcher error: {e}", file=sys.stderr)
+
+    def sync(self):
+        """Adds watches for the folders of newly cached entries (run every `interval` seconds)."""
+        from watchdog.events import FileSystemEventHandler
+        watcher = self
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event): watcher._on_event(event.src_path, getattr(event, 'dest_path', None))
+        folders = set()
+        for link_path, source_path in self.cache.keys(): folders.add(os.path.dirname(link_path)); folders.add(os.path.dirname(source_path))
+        with self._lock:
+            for folder in folders - self._watched:
+                if os.path.isdir(folder):
+                    try: self._observer.schedule(_Handler(), folder, recursive=False); self._watched.add(folder)
+                    except OSError: pass
+
+    def _on_event(self, *paths):
+        changed = self.cache.keys_under([p for p in paths if p])
+        changed = [key for key in changed if self.cache.drop_if_changed(key, path_fingerprint(*key))]
+        if changed and self.on_change: self.on_change(changed)
+
+
+def _norm(path):
+    return os.path.normcase(os.path.normpath(path))
+
+def _self_and_parents(path):
+    """A normalized path, then each folder above it up to the root."""
+    while True:
+        yield path
+        parent = os.path.dirname(path)
+        if parent == path: return
+        path = parent
+
+
+def start_watcher(cache, mode="auto", on_change=None):
+    """Starts a cache watcher. mode: "poll", "native" or "auto" (native when watchdog is installed, else polling)."""
+    if mode in ("native", "auto"):
+        try: return NativeWatcher(cache, on_change=on_change).start()
+        except ImportError:
+            if mode == "native": print("watchdog is not installed; falling back to polling validity watcher.", file=sys.stderr)
+        except Exception as e: print(f"Native validity watcher unavailable ({e}); falling back to polling.", file=sys.stderr)
+    return PollingWatcher(cache, on_change=on_change).start()